@@ -1,12 +1,21 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
+from app.config import settings as env_settings
 
-async def is_user_chat_member(bot: Bot, chat_id: int, user_id: int) -> bool:
-    try:
-        member = await bot.get_chat_member(chat_id, user_id)
-    except Exception:
-        return False
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
 
+
+def _is_member(member: Any) -> bool:
+    if member is None:
+        return False
     status = getattr(member, "status", None)
     if status in ("left", "kicked"):
         return False
@@ -15,11 +24,91 @@ async def is_user_chat_member(bot: Bot, chat_id: int, user_id: int) -> bool:
     return True
 
 
-async def is_user_chat_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
+class ChatMemberCache:
+    """
+    LRU of get_chat_member results keyed by (chat_id, user_id), so a settings dialog does one membership
+    lookup instead of one per message. Members are kept for `ttl` seconds, non-members and "user not found"
+    answers for the shorter `negative_ttl`. chat_member/my_chat_member updates replace or drop entries.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        negative_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: OrderedDict[tuple[int, int], tuple[Any, float]] = OrderedDict()
+
+    def get(self, chat_id: int, user_id: int) -> Any:
+        """Cached ChatMember (None for a cached negative answer), or _MISSING."""
+        key = (chat_id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        member, expires_at = entry
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return member
+
+    def put(self, chat_id: int, user_id: int, member: Any) -> None:
+        ttl = self.ttl if _is_member(member) else self.negative_ttl
+        if self.max_entries <= 0 or ttl <= 0:
+            self._entries.pop((chat_id, user_id), None)
+            return
+        key = (chat_id, user_id)
+        self._entries[key] = (member, self._clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget(self, chat_id: int, user_id: int | None = None) -> None:
+        """Drops one user's entry, or every entry of the chat when user_id is None."""
+        if user_id is not None:
+            self._entries.pop((chat_id, user_id), None)
+            return
+        for key in [key for key in self._entries if key[0] == chat_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+chat_member_cache = ChatMemberCache(
+    max(0, int(env_settings.CHAT_MEMBER_CACHE_SIZE)),
+    ttl=float(env_settings.CHAT_MEMBER_CACHE_SECONDS),
+    negative_ttl=float(env_settings.CHAT_MEMBER_NEGATIVE_CACHE_SECONDS),
+)
+
+
+async def _get_chat_member(bot: Bot, chat_id: int, user_id: int) -> Any:
+    member = chat_member_cache.get(chat_id, user_id)
+    if member is not _MISSING:
+        return member
     try:
         member = await bot.get_chat_member(chat_id, user_id)
+    except (TelegramBadRequest, TelegramForbiddenError):
+        # Definite answers (user or chat not found, bot removed): remember them briefly.
+        chat_member_cache.put(chat_id, user_id, None)
+        return None
     except Exception:
-        return False
+        logger.warning("get_chat_member failed for chat_id=%s user_id=%s", chat_id, user_id, exc_info=True)
+        return None
+    chat_member_cache.put(chat_id, user_id, member)
+    return member
+
+
+async def is_user_chat_member(bot: Bot, chat_id: int, user_id: int) -> bool:
+    return _is_member(await _get_chat_member(bot, chat_id, user_id))
+
 
+async def is_user_chat_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
+    member = await _get_chat_member(bot, chat_id, user_id)
     status = getattr(member, "status", None)
     return status in ("administrator", "creator")
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError
+from aiogram.methods import GetMe
+
+from app.config import settings
+from app.services.tracing import create_untraced_task
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramCircuitBreaker(BaseRequestMiddleware):
+    """
+    Bot-wide breaker around the aiogram session. After `failure_threshold` consecutive TelegramNetworkErrors
+    (api.telegram.org or TELEGRAM_PROXY unreachable) it opens: every call except get_me fails fast, and a
+    background probe calls get_me with exponential backoff. The first answer from Telegram closes it again;
+    concurrency_limit() then ramps delivery back up instead of releasing the whole backlog at once.
+    Any Telegram reply (including API errors) counts as success: the network is up.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int | None = None,
+        backoff_seconds: float | None = None,
+        backoff_max_seconds: float | None = None,
+        ramp_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failure_threshold = max(
+            1, failure_threshold if failure_threshold is not None else settings.TELEGRAM_BREAKER_FAILURE_THRESHOLD
+        )
+        self._backoff_seconds = backoff_seconds if backoff_seconds is not None else settings.TELEGRAM_BREAKER_BACKOFF_SECONDS
+        self._backoff_max_seconds = (
+            backoff_max_seconds if backoff_max_seconds is not None else settings.TELEGRAM_BREAKER_BACKOFF_MAX_SECONDS
+        )
+        self._ramp_seconds = ramp_seconds if ramp_seconds is not None else settings.TELEGRAM_BREAKER_RAMP_SECONDS
+        self._clock = clock
+        self._failures = 0
+        self._open = False
+        self._opened_at = 0.0
+        self._recovered_at: float | None = None
+        self._closed = asyncio.Event()
+        self._closed.set()
+        self._probe_task: asyncio.Task | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    async def wait_closed(self) -> None:
+        await self._closed.wait()
+
+    def concurrency_limit(self, limit: int) -> int:
+        """How many chats may be delivered in parallel right now: 0 while open, ramping 1..limit after recovery."""
+        if self._open:
+            return 0
+        if self._recovered_at is None or self._ramp_seconds <= 0:
+            return limit
+        elapsed = self._clock() - self._recovered_at
+        if elapsed >= self._ramp_seconds:
+            self._recovered_at = None
+            return limit
+        return max(1, min(limit, math.ceil(limit * elapsed / self._ramp_seconds)))
+
+    def _record_success(self) -> None:
+        self._failures = 0
+        if self._open:
+            self._open = False
+            self._recovered_at = self._clock()
+            self._closed.set()
+            logger.info(
+                "Telegram circuit breaker closed after %.0fs; ramping delivery over %ss.",
+                self._recovered_at - self._opened_at,
+                self._ramp_seconds,
+            )
+
+    def _record_failure(self, bot) -> None:
+        self._failures += 1
+        if self._open or self._failures < self._failure_threshold:
+            return
+        self._open = True
+        self._opened_at = self._clock()
+        self._recovered_at = None
+        self._closed.clear()
+        logger.warning(
+            "Telegram circuit breaker opened after %s consecutive network errors; pausing delivery.",
+            self._failures,
+        )
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = create_untraced_task(self._probe(bot), name="telegram-breaker-probe")
+
+    async def _probe(self, bot) -> None:
+        delay = max(0.1, float(self._backoff_seconds))
+        while self._open:
+            await asyncio.sleep(delay)
+            try:
+                # Goes through __call__, which closes the breaker on any reply.
+                await bot.get_me()
+            except TelegramNetworkError as exc:
+                delay = min(max(delay, float(self._backoff_max_seconds)), delay * 2)
+                logger.info("Telegram probe failed (%s); next probe in %.0fs.", exc, delay)
+            except Exception:
+                logger.exception("Telegram probe: unexpected error.")
+
+    async def __call__(self, make_request, bot, method):
+        if self._open and not isinstance(method, GetMe):
+            raise TelegramNetworkError(method=method, message="Circuit breaker is open: Telegram API is unreachable")
+        try:
+            result = await make_request(bot, method)
+        except TelegramNetworkError:
+            self._record_failure(bot)
+            raise
+        except TelegramAPIError:
+            self._record_success()
+            raise
+        self._record_success()
+        return result
+
+
+telegram_breaker = TelegramCircuitBreaker()
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.client.session.aiohttp import AiohttpSession
@@ -13,7 +15,16 @@ from app.bot.handlers import (
     group_setup,
     start,
 )
-from app.bot.middlewares import LoggingMiddleware
+from app.bot.circuit_breaker import telegram_breaker
+from app.bot.fsm_storage import SqliteStorage
+from app.bot.middlewares import (
+    ChatTitleMiddleware,
+    HandlerNameMiddleware,
+    LoggingMiddleware,
+    TelegramTimingMiddleware,
+    TracingMiddleware,
+)
+from app.bot.rate_limiter import TelegramRateLimiter
 from app.config import settings
 
 if settings.TELEGRAM_PROXY:
@@ -21,10 +32,29 @@ if settings.TELEGRAM_PROXY:
     bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"), session=session)
 else:
     bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-storage = MemoryStorage()
+# Outermost first: timing covers breaker and rate-limit waits; while the breaker is open,
+# calls fail fast without waiting for rate-limit tokens.
+bot.session.middleware(TelegramTimingMiddleware())
+bot.session.middleware(telegram_breaker)
+bot.session.middleware(TelegramRateLimiter())
+if settings.FSM_STORAGE == "memory":
+    storage = MemoryStorage()
+else:
+    storage = SqliteStorage(
+        ttl=timedelta(days=max(0, settings.FSM_TTL_DAYS)),
+        cache_size=settings.FSM_CACHE_SIZE,
+        flush_seconds=settings.FSM_FLUSH_SECONDS,
+    )
 dp = Dispatcher(storage=storage)
 
+# Tracing goes in front of aiogram's own FSM middleware so FSM storage reads count towards the update.
+dp.update.outer_middleware.unregister(dp.fsm)
+dp.update.outer_middleware(TracingMiddleware())
+dp.update.outer_middleware(dp.fsm)
+dp.update.outer_middleware(ChatTitleMiddleware())
 dp.message.middleware(LoggingMiddleware())
+for observer in (dp.message, dp.callback_query, dp.my_chat_member, dp.chat_member):
+    observer.middleware(HandlerNameMiddleware())
 
 dp.include_router(admin_menu.router)
 dp.include_router(admin_status.router)
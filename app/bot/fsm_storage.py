@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Mapping
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app.db.connection import async_session_maker
+from app.db.repos.fsm_states_repo import FsmStatesRepo
+from app.services.tracing import create_untraced_task
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    updated_at: datetime | None = None
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+def _storage_key(key: StorageKey) -> str:
+    return ":".join(
+        (
+            str(key.bot_id),
+            str(key.chat_id),
+            str(key.user_id),
+            "" if key.thread_id is None else str(key.thread_id),
+            key.business_connection_id or "",
+            key.destiny,
+        )
+    )
+
+
+class SqliteStorage(BaseStorage):
+    """
+    FSM storage backed by the fsm_states table.
+    - Keys not written for `ttl` are treated as empty and removed by retention, so stale menus do not pile up.
+    - At most `cache_size` keys are kept in memory (LRU); keys with unsaved changes are never evicted.
+    - With `flush_seconds` > 0 writes are collected and stored in one transaction per interval
+      (a crash loses at most that interval); with 0 every write goes straight to the DB and reads
+      bypass the cache, so several bot processes can share one database.
+    """
+
+    def __init__(self, ttl: timedelta, cache_size: int = 1024, flush_seconds: float = 1):
+        self.ttl = ttl
+        self.cache_size = max(0, int(cache_size))
+        self.flush_seconds = max(0.0, float(flush_seconds))
+        self._cache: OrderedDict[str, _Record] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def write_behind(self) -> bool:
+        return self.flush_seconds > 0
+
+    def _expired(self, record: _Record, now: datetime) -> bool:
+        return (
+            self.ttl > timedelta(0)
+            and record.updated_at is not None
+            and now - record.updated_at > self.ttl
+        )
+
+    async def _read(self, key: str) -> _Record:
+        async with async_session_maker() as session:
+            row = await FsmStatesRepo(session).get(key)
+        if row is None:
+            return _Record()
+        try:
+            data = json.loads(row.data or "{}")
+        except ValueError:
+            logger.warning("FSM storage: unreadable data for key %s, starting over.", key)
+            data = {}
+        return _Record(row.state, data, datetime.fromisoformat(row.updated_at))
+
+    async def _load(self, key: str) -> _Record:
+        if not self.write_behind:
+            record = await self._read(key)
+        else:
+            record = self._cache.get(key)
+            if record is None:
+                # Another update of the same user may have cached the key while this one was reading.
+                record = self._cache.setdefault(key, await self._read(key))
+            self._cache.move_to_end(key)
+            self._evict()
+        if self._expired(record, datetime.now()):
+            record.state, record.data = None, {}
+        return record
+
+    def _evict(self) -> None:
+        excess = len(self._cache) - self.cache_size
+        if excess <= 0:
+            return
+        for key in [key for key in self._cache if key not in self._dirty][:excess]:
+            del self._cache[key]
+
+    async def _store(self, key: str, record: _Record) -> None:
+        record.updated_at = datetime.now()
+        if not self.write_behind:
+            await self._write([(key, record)])
+            return
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        self._dirty.add(key)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = create_untraced_task(self._flush_loop(), name="fsm-storage-flush")
+
+    @staticmethod
+    async def _write(items: list[tuple[str, _Record]]) -> None:
+        rows = [
+            (key, record.state, json.dumps(record.data, ensure_ascii=False, default=str), record.updated_at.isoformat())
+            for key, record in items
+            if not record.empty
+        ]
+        async with async_session_maker() as session:
+            repo = FsmStatesRepo(session)
+            await repo.upsert_many(rows)
+            await repo.delete_many([key for key, record in items if record.empty])
+            await session.commit()
+
+    async def flush(self) -> int:
+        """Writes pending changes in one transaction. Returns the number of keys written."""
+        async with self._flush_lock:
+            keys = [key for key in self._dirty if key in self._cache]
+            self._dirty.clear()
+            if not keys:
+                return 0
+            items = [(key, self._cache[key]) for key in keys]
+            try:
+                await self._write(items)
+            except BaseException:
+                self._dirty.update(keys)
+                raise
+            self._evict()
+            return len(items)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("FSM storage: flush failed, will retry.")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = _storage_key(key)
+        record = await self._load(storage_key)
+        record.state = state.state if isinstance(state, State) else state
+        await self._store(storage_key, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._load(_storage_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        storage_key = _storage_key(key)
+        record = await self._load(storage_key)
+        record.data = dict(data)
+        await self._store(storage_key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict((await self._load(_storage_key(key))).data)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
@@ -9,7 +9,7 @@ import re
 from app.bot.handlers.admin_menu import BTN_PREVIEW, BTN_TEST
 from app.bot.handlers.common import get_active_chat_id as _get_active_chat_id
 from app.config import settings as env_settings
-from app.db.connection import async_session_maker
+from app.db.connection import async_read_session_maker, async_session_maker
 from app.db.repos.schedule_repo import ScheduleRepo
 from app.db.repos.settings_repo import SettingsRepo
 from app.db.repos.sendlog_repo import SendLogRepo, is_send_success
@@ -123,7 +123,7 @@ async def _send_to_group(message: Message, date_arg: str | None, chat_id: int) -
         notify_admin_on_data_gaps=False,
     )
 
-    async with async_session_maker() as session:
+    async with async_read_session_maker() as session:
         sendlog_repo = SendLogRepo(session)
         log = await sendlog_repo.get_log(chat_id, target_date.strftime("%Y-%m-%d"), kind)
 
@@ -16,6 +16,7 @@ from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url, get_ical_
 from app.ical.fetcher import fetch_ical, IcalFetchError
 from app.ical.parser import parse_ical
 from app.services.date_service import parse_hhmm
+from app.services.response_cache import response_cache
 from app.services.scheduler_service import apply_schedule
 
 router = Router()
@@ -224,6 +225,8 @@ async def settings_set_ical(message: Message, state: FSMContext) -> None:
         await session.commit()
         db_settings = await repo.get_settings(chat_id)
 
+    # Group commands cache the chat's timezone and iCal URL.
+    response_cache.invalidate_context(chat_id)
     apply_schedule(db_settings)
 
     effective_ical = resolve_ical_url(db_settings)
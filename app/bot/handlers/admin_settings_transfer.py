@@ -17,6 +17,7 @@ from app.db.connection import async_session_maker
 from app.db.repos.settings_repo import SettingsRepo, get_ical_setting_state
 from app.db.repos.setup_tokens_repo import SetupTokenRepo
 from app.services.date_service import parse_hhmm
+from app.services.response_cache import response_cache
 from app.services.scheduler_service import apply_schedule
 
 router = Router()
@@ -289,6 +290,8 @@ async def import_settings(message: Message, state) -> None:
         await session.commit()
         db_settings = await repo.get_settings(imported.chat_id)
 
+    # Group commands cache the chat's timezone and iCal URL.
+    response_cache.invalidate_context(imported.chat_id)
     apply_schedule(db_settings)
 
     await message.answer(
@@ -4,12 +4,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from datetime import datetime
 
-from app.db.connection import async_session_maker
-from app.db.repos.schedule_repo import ScheduleRepo
-from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url, get_ical_setting_state
-from app.db.repos.uploads_repo import UploadsRepo
+from app.db.repos.settings_repo import resolve_ical_url, get_ical_setting_state
 from app.bot.handlers.admin_menu import BTN_STATUS
-from app.bot.handlers.common import get_active_chat_id as _get_active_chat_id
+from app.bot.handlers.common import get_active_chat
+from app.services.chat_health import DELIVERY_DEGRADED, DELIVERY_UNREACHABLE
+from app.services.chat_overview import load_chat_overview, read_chat_overview
+from app.services.chat_titles import refresh_missing_title
 
 router = Router()
 
@@ -17,24 +17,24 @@ router = Router()
 @router.message(Command("status"), F.chat.type == "private")
 @router.message(F.text == BTN_STATUS, F.chat.type == "private")
 async def admin_status(message: Message, state: FSMContext) -> None:
-    chat_id = await _get_active_chat_id(state, message)
-    if not chat_id:
+    # Membership check (Telegram) and the single read-only overview query (settings + last upload + coverage)
+    # run together; a missing settings row is created only after membership is confirmed.
+    active = await get_active_chat(state, message, read_chat_overview)
+    if not active:
         return
-
-    async with async_session_maker() as session:
-        settings_repo = SettingsRepo(session)
-        uploads_repo = UploadsRepo(session)
-        schedule_repo = ScheduleRepo(session)
-
-        db_settings = await settings_repo.get_settings(chat_id)
-        mode = db_settings.mode
-        morning_time = db_settings.morning_time
-        evening_time = db_settings.evening_time
-        timezone = db_settings.timezone
-        ical_url = resolve_ical_url(db_settings)
-        last_upload = await uploads_repo.get_last_upload(chat_id)
-        last_upload_uploaded_at = last_upload.uploaded_at if last_upload else None
-        coverage_min, coverage_max = await schedule_repo.get_coverage_minmax(chat_id)
+    chat_id, overview = active
+    overview = await load_chat_overview(chat_id, overview)
+    db_settings = overview.settings
+    mode = db_settings.mode
+    morning_time = db_settings.morning_time
+    evening_time = db_settings.evening_time
+    timezone = db_settings.timezone
+    ical_url = resolve_ical_url(db_settings)
+    delivery_state = db_settings.delivery_state
+    delivery_state_reason = db_settings.delivery_state_reason
+    chat_title = db_settings.chat_title
+    last_upload_uploaded_at = overview.last_upload.uploaded_at if overview.last_upload else None
+    coverage_min, coverage_max = overview.coverage_min, overview.coverage_max
 
     last_upload_text = "-"
     if last_upload_uploaded_at:
@@ -50,12 +50,8 @@ async def admin_status(message: Message, state: FSMContext) -> None:
         right = coverage_max or "-"
         coverage_text = f"{left} .. {right}"
 
-    chat_title = None
-    try:
-        chat = await message.bot.get_chat(chat_id)
-        chat_title = chat.title or chat.full_name
-    except Exception:
-        chat_title = None
+    if not chat_title:
+        refresh_missing_title(message.bot, chat_id)
 
     active_chat_label = "\u0410\u043a\u0442\u0438\u0432\u043d\u044b\u0439 \u0447\u0430\u0442: "
     if chat_title:
@@ -71,6 +67,13 @@ async def admin_status(message: Message, state: FSMContext) -> None:
     else:
         ical_status = "\u0437\u0430\u0434\u0430\u043d" if ical_url else "\u043d\u0435 \u0437\u0430\u0434\u0430\u043d"
 
+    if delivery_state == DELIVERY_UNREACHABLE:
+        delivery_text = f"\u0447\u0430\u0442 \u043d\u0435\u0434\u043e\u0441\u0442\u0443\u043f\u0435\u043d, \u0440\u0430\u0441\u0441\u044b\u043b\u043a\u0430 \u043f\u0440\u0438\u043e\u0441\u0442\u0430\u043d\u043e\u0432\u043b\u0435\u043d\u0430 ({delivery_state_reason or '-'})"
+    elif delivery_state == DELIVERY_DEGRADED:
+        delivery_text = f"\u0435\u0441\u0442\u044c \u0441\u0431\u043e\u0438 ({delivery_state_reason or '-'})"
+    else:
+        delivery_text = "\u0432 \u043f\u043e\u0440\u044f\u0434\u043a\u0435"
+
     response = (
         "\u0421\u0442\u0430\u0442\u0443\u0441 \u043d\u0430\u0441\u0442\u0440\u043e\u0435\u043a\n"
         f"{active_chat_label}{active_chat_text}\n"
@@ -79,6 +82,7 @@ async def admin_status(message: Message, state: FSMContext) -> None:
         f"\u0412\u0435\u0447\u0435\u0440: {evening_time or '-'}\n"
         f"\u0427\u0430\u0441\u043e\u0432\u043e\u0439 \u043f\u043e\u044f\u0441: {timezone}\n"
         f"iCal: {ical_status}\n"
+        f"\u0414\u043e\u0441\u0442\u0430\u0432\u043a\u0430: {delivery_text}\n"
         f"\u041f\u043e\u0441\u043b\u0435\u0434\u043d\u044f\u044f \u0441\u0438\u043d\u0445\u0440\u043e\u043d\u0438\u0437\u0430\u0446\u0438\u044f: {last_upload_text}\n"
         f"\u041f\u043e\u043a\u0440\u044b\u0442\u0438\u0435 \u0440\u0430\u0441\u043f\u0438\u0441\u0430\u043d\u0438\u044f: {coverage_text}"
     )
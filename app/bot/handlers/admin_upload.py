@@ -6,11 +6,9 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
 from app.bot.handlers.admin_menu import BTN_UPLOAD
-from app.bot.handlers.common import get_active_chat_id as _get_active_chat_id
-from app.db.connection import async_session_maker
-from app.db.repos.schedule_repo import ScheduleRepo
-from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url
-from app.db.repos.uploads_repo import UploadsRepo
+from app.bot.handlers.common import get_active_chat
+from app.db.repos.settings_repo import resolve_ical_url
+from app.services.chat_overview import load_chat_overview, read_chat_overview
 from app.services.ical_sync_service import sync_ical_schedule
 
 router = Router()
@@ -20,14 +18,12 @@ logger = logging.getLogger(__name__)
 @router.message(Command("upload"), F.chat.type == "private")
 @router.message(F.text == BTN_UPLOAD, F.chat.type == "private")
 async def admin_upload(message: Message, state: FSMContext) -> None:
-    chat_id = await _get_active_chat_id(state, message)
-    if not chat_id:
+    active = await get_active_chat(state, message, read_chat_overview)
+    if not active:
         return
-
-    async with async_session_maker() as session:
-        settings_repo = SettingsRepo(session)
-        db_settings = await settings_repo.get_settings(chat_id)
-        ical_url = resolve_ical_url(db_settings)
+    chat_id, overview = active
+    overview = await load_chat_overview(chat_id, overview)
+    ical_url = resolve_ical_url(overview.settings)
 
     if not ical_url:
         await message.answer(
@@ -60,11 +56,9 @@ async def admin_upload(message: Message, state: FSMContext) -> None:
         )
         return
 
-    async with async_session_maker() as session:
-        uploads_repo = UploadsRepo(session)
-        schedule_repo = ScheduleRepo(session)
-        last_upload = await uploads_repo.get_last_upload(chat_id)
-        coverage_min, coverage_max = await schedule_repo.get_coverage_minmax(chat_id)
+    overview = await load_chat_overview(chat_id)
+    last_upload = overview.last_upload
+    coverage_min, coverage_max = overview.coverage_min, overview.coverage_max
 
     date_range = "?"
     rows_count = "?"
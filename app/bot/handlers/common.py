@@ -1,3 +1,6 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
@@ -5,6 +8,8 @@ from app.bot.chat_access import is_user_chat_member
 from app.db.connection import async_session_maker
 from app.db.repos.setup_tokens_repo import SetupTokenRepo
 
+T = TypeVar("T")
+
 MISSING_ACTIVE_CHAT_TEXT = (
     "Для настройки зайдите в нужную группу и отправьте /setup (или /settings).\n"
     "Затем откройте личку с ботом по ссылке из группы."
@@ -30,7 +35,16 @@ async def restore_last_active_chat_id(state: FSMContext, message: Message) -> in
     return chat_id
 
 
-async def get_active_chat_id(state: FSMContext, message: Message) -> int | None:
+async def get_active_chat(
+    state: FSMContext,
+    message: Message,
+    load: Callable[[int], Awaitable[T]] | None = None,
+) -> tuple[int, T | None] | None:
+    """
+    Active chat of the private dialog, or None after telling the user why there is none.
+    `load(chat_id)` (e.g. a DB read for the reply) runs concurrently with the membership check, so it must not
+    write anything: it also runs for users who are then refused.
+    """
     user = message.from_user
     if not user:
         await message.answer(
@@ -44,10 +58,19 @@ async def get_active_chat_id(state: FSMContext, message: Message) -> int | None:
         if not chat_id:
             await message.answer(MISSING_ACTIVE_CHAT_TEXT)
             return None
-        return chat_id
-    if not await is_user_chat_member(message.bot, chat_id, user.id):
+        return chat_id, (await load(chat_id) if load else None)
+    if load:
+        is_member, loaded = await asyncio.gather(is_user_chat_member(message.bot, chat_id, user.id), load(chat_id))
+    else:
+        is_member, loaded = await is_user_chat_member(message.bot, chat_id, user.id), None
+    if not is_member:
         await message.answer(
             "\u0412\u044b \u043d\u0435 \u0443\u0447\u0430\u0441\u0442\u043d\u0438\u043a \u044d\u0442\u043e\u0433\u043e \u0447\u0430\u0442\u0430, \u043f\u043e\u0442\u043e\u043c\u0443 \u043d\u0435 \u043c\u043e\u0436\u0435\u0442\u0435 \u043d\u0430\u0441\u0442\u0440\u0430\u0438\u0432\u0430\u0442\u044c \u0435\u0433\u043e."
         )
         return None
-    return chat_id
+    return chat_id, loaded
+
+
+async def get_active_chat_id(state: FSMContext, message: Message) -> int | None:
+    active = await get_active_chat(state, message)
+    return active[0] if active else None
@@ -1,16 +1,22 @@
+import asyncio
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from typing import Awaitable, Callable
 
 from aiogram import F, Router
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.filters import Command, CommandStart
 from aiogram.types import ChatMemberUpdated, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
+from app.bot.chat_access import chat_member_cache
+from app.bot.middlewares import GroupCommandCoalescer
 from app.config import settings as env_settings
-from app.db.connection import async_session_maker
+from app.db.connection import async_read_session_maker, async_session_maker
 from app.db.repos.schedule_repo import ScheduleRepo
 from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url
 from app.db.repos.setup_tokens_repo import SetupTokenRepo
+from app.services.chat_health import mark_chat_reachable, mark_chat_unreachable
+from app.services.chat_titles import chat_title_of
 from app.services.date_service import get_next_week_window, get_today, get_tomorrow, get_week_window
 from app.services.ical_sync_service import sync_ical_schedule
 from app.services.message_builder import (
@@ -21,9 +27,16 @@ from app.services.message_builder import (
     split_telegram,
     ParseMode,
 )
+from app.services.response_cache import ChatContext, cached_chat_context, cached_render
 from app.services.scheduler_service import apply_schedule
+from app.services.tracing import create_untraced_task
 
 router = Router()
+router.message.middleware(GroupCommandCoalescer())
+
+# Chats with a background iCal refresh in flight (one per chat), and strong refs to those tasks.
+_revalidating: set[int] = set()
+_background_tasks: set[asyncio.Task] = set()
 
 
 @router.message(CommandStart(), F.chat.type.in_({"group", "supergroup"}))
@@ -33,11 +46,29 @@ async def start_group(message: Message) -> None:
     )
 
 
+def _can_post(member) -> bool:
+    status = getattr(member, "status", None)
+    if status in ("creator", "administrator", "member"):
+        return True
+    if status == "restricted":
+        return bool(getattr(member, "is_member", False)) and getattr(member, "can_send_messages", True) is not False
+    return False
+
+
 @router.my_chat_member(F.chat.type.in_({"group", "supergroup"}))
 async def on_bot_added(event: ChatMemberUpdated) -> None:
     try:
         old_status = getattr(event.old_chat_member, "status", None)
         new_status = getattr(event.new_chat_member, "status", None)
+        # Keep the delivery health in step with membership: the scheduler skips unreachable chats.
+        if _can_post(event.new_chat_member):
+            if not _can_post(event.old_chat_member):
+                await mark_chat_reachable(event.chat.id, f"my_chat_member: {new_status}")
+        else:
+            await mark_chat_unreachable(event.chat.id, f"my_chat_member: {new_status}")
+        # Answers cached while the bot had other rights (or was not in the chat) no longer hold.
+        chat_member_cache.forget(event.chat.id)
+
         if old_status in ("left", "kicked") and new_status in ("member", "administrator"):
             await event.bot.send_message(
                 event.chat.id,
@@ -48,9 +79,16 @@ async def on_bot_added(event: ChatMemberUpdated) -> None:
         logging.exception("Failed to handle my_chat_member update.")
 
 
+@router.chat_member(F.chat.type.in_({"group", "supergroup"}))
+async def on_chat_member(event: ChatMemberUpdated) -> None:
+    # Delivered only where the bot is an admin; keeps the membership cache of the settings menu current.
+    chat_member_cache.put(event.chat.id, event.new_chat_member.user.id, event.new_chat_member)
+
+
 async def _build_settings_keyboard(message: Message, setup_token: str) -> InlineKeyboardMarkup | None:
     try:
-        me = await message.bot.get_me()
+        # Bot.me() keeps the get_me answer from startup; only a failed lookup is retried on the next call.
+        me = await message.bot.me()
         if not me.username:
             return None
         link = f"https://t.me/{me.username}?start=setup_{setup_token}"
@@ -61,12 +99,15 @@ async def _build_settings_keyboard(message: Message, setup_token: str) -> Inline
     )
 
 
-async def _try_send_private_settings(message: Message, setup_token: str) -> bool:
+async def _try_send_private_settings(
+    message: Message,
+    setup_token: str,
+    keyboard: InlineKeyboardMarkup | None,
+) -> bool:
     user = message.from_user
     if not user:
         return False
 
-    keyboard = await _build_settings_keyboard(message, setup_token)
     if keyboard:
         text = "Откройте настройки в личке по кнопке."
     else:
@@ -97,6 +138,10 @@ async def setup_group(message: Message) -> None:
         repo = SettingsRepo(session)
         token_repo = SetupTokenRepo(session)
         db_settings = await repo.ensure_settings(message.chat.id)
+        # The row may be new, so the title seen by ChatTitleMiddleware had nowhere to go yet.
+        title = chat_title_of(message.chat)
+        if title:
+            await repo.set_chat_title(message.chat.id, title)
         setup_token = await token_repo.create_token(
             message.chat.id,
             getattr(message.from_user, "id", None),
@@ -106,7 +151,7 @@ async def setup_group(message: Message) -> None:
     apply_schedule(db_settings)
 
     keyboard = await _build_settings_keyboard(message, setup_token)
-    dm_sent = await _try_send_private_settings(message, setup_token)
+    dm_sent = await _try_send_private_settings(message, setup_token, keyboard)
 
     if dm_sent:
         await message.answer(
@@ -142,7 +187,7 @@ async def settings_link(message: Message) -> None:
         )
         await session.commit()
     keyboard = await _build_settings_keyboard(message, setup_token)
-    dm_sent = await _try_send_private_settings(message, setup_token)
+    dm_sent = await _try_send_private_settings(message, setup_token, keyboard)
 
     if dm_sent:
         await message.answer(
@@ -205,13 +250,104 @@ async def group_status(message: Message) -> None:
     await message.answer(response)
 
 
-async def _resolve_chat_context(chat_id: int) -> tuple[str, str | None]:
-    async with async_session_maker() as session:
-        settings_repo = SettingsRepo(session)
-        db_settings = await settings_repo.get_settings(chat_id)
-        tz = (db_settings.timezone if db_settings else None) or env_settings.TZ
-        ical_url = resolve_ical_url(db_settings) if db_settings else None
-    return tz, ical_url
+async def _load_chat_context(chat_id: int) -> ChatContext:
+    """
+    A plain read on the read pool: a chat without a settings row gets the env defaults, and a sync
+    holding the write lock does not delay the answer.
+    """
+    async with async_read_session_maker() as session:
+        db_settings = await SettingsRepo(session).find_settings(chat_id)
+    return ChatContext(
+        tz=(db_settings.timezone if db_settings else None) or env_settings.TZ,
+        ical_url=resolve_ical_url(db_settings),
+        last_ical_sync_at=db_settings.last_ical_sync_at if db_settings else None,
+    )
+
+
+async def _resolve_chat_context(chat_id: int) -> tuple[str, str | None, bool]:
+    """
+    (timezone, iCal URL, whether the stored iCal data is older than ICAL_COMMAND_MAX_AGE_MINUTES).
+    Served from the response cache, so a repeated command whose answer is cached does not touch the DB.
+    """
+    context = await cached_chat_context(chat_id, lambda: _load_chat_context(chat_id))
+    return context.tz, context.ical_url, _ical_is_stale(context.last_ical_sync_at)
+
+
+def _ical_is_stale(last_ical_sync_at: str | None) -> bool:
+    if not last_ical_sync_at:
+        return True
+    try:
+        synced_at = datetime.fromisoformat(last_ical_sync_at)
+    except ValueError:
+        return True
+    max_age = timedelta(minutes=max(0, int(env_settings.ICAL_COMMAND_MAX_AGE_MINUTES or 0)))
+    return datetime.now() - synced_at > max_age
+
+
+def _quote_request() -> bool:
+    return bool(env_settings.GROUP_COMMAND_REPLY_ONCE) and float(env_settings.GROUP_COMMAND_COALESCE_SECONDS or 0) > 0
+
+
+async def _replace_answer(sent: list[Message], old_chunks: list[str], new_chunks: list[str]) -> None:
+    """Edits the parts that changed, sends extra parts, deletes surplus ones."""
+    for sent_message, old_text, new_text in zip(sent, old_chunks, new_chunks):
+        if old_text != new_text:
+            await sent_message.edit_text(new_text, parse_mode=ParseMode.HTML)
+    for new_text in new_chunks[len(sent):]:
+        await sent[-1].answer(new_text, parse_mode=ParseMode.HTML)
+    for sent_message in sent[len(new_chunks):]:
+        try:
+            await sent_message.delete()
+        except TelegramBadRequest:
+            logging.warning("Could not delete outdated schedule part in chat_id=%s", sent_message.chat.id)
+
+
+async def _revalidate_answer(
+    chat_id: int,
+    sent: list[Message],
+    chunks: list[str],
+    render: Callable[[], Awaitable[list[str]]],
+) -> None:
+    try:
+        if not await sync_ical_schedule(chat_id):
+            return
+        fresh_chunks = await render()
+        if fresh_chunks != chunks:
+            await _replace_answer(sent, chunks, fresh_chunks)
+    except Exception:
+        logging.exception("Background iCal refresh failed for chat_id=%s", chat_id)
+    finally:
+        _revalidating.discard(chat_id)
+
+
+async def _answer_schedule(
+    message: Message,
+    ical_url: str | None,
+    ical_stale: bool,
+    render: Callable[[], Awaitable[list[str]]],
+) -> None:
+    """
+    Stale-while-revalidate: answers from stored data right away. If the iCal data is older than
+    ICAL_COMMAND_MAX_AGE_MINUTES, the feed is refreshed in the background and the answer is edited
+    only if the refreshed schedule renders differently.
+    """
+    chunks = await render()
+    sent = []
+    for index, chunk in enumerate(chunks):
+        if index == 0 and _quote_request():
+            # Repeats of this command are dropped by GroupCommandCoalescer, so show which request is answered.
+            sent.append(await message.reply(chunk, parse_mode=ParseMode.HTML, allow_sending_without_reply=True))
+        else:
+            sent.append(await message.answer(chunk, parse_mode=ParseMode.HTML))
+
+    chat_id = message.chat.id
+    if not ical_url or not ical_stale or chat_id in _revalidating:
+        return
+    _revalidating.add(chat_id)
+    # Not part of this update's latency: the trace is already recorded when the refresh runs.
+    task = create_untraced_task(_revalidate_answer(chat_id, sent, chunks, render))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 async def _send_range_schedule(
@@ -220,30 +356,27 @@ async def _send_range_schedule(
     date_to: date,
     tz: str,
     ical_url: str | None,
+    ical_stale: bool = False,
     *,
     week_style: bool = False,
 ) -> None:
     chat_id = message.chat.id
-
-    if ical_url:
-        try:
-            await sync_ical_schedule(chat_id)
-        except Exception:
-            logging.exception("iCal sync failed for chat_id=%s", chat_id)
-
     date_from_str = date_from.isoformat()
     date_to_str = date_to.isoformat()
 
-    async with async_session_maker() as session:
-        schedule_repo = ScheduleRepo(session)
-        items = await schedule_repo.get_by_date_range(chat_id, date_from_str, date_to_str)
+    async def render_from_db() -> list[str]:
+        async with async_read_session_maker() as session:
+            schedule_repo = ScheduleRepo(session)
+            items = await schedule_repo.get_by_date_range(chat_id, date_from_str, date_to_str)
+        if week_style:
+            return split_telegram(build_week_range_message(date_from, date_to, items, tz))
+        return split_telegram(build_range_message(date_from, date_to, items, tz))
 
-    if week_style:
-        message_text = build_week_range_message(date_from, date_to, items, tz)
-    else:
-        message_text = build_range_message(date_from, date_to, items, tz)
-    for chunk in split_telegram(message_text):
-        await message.answer(chunk, parse_mode=ParseMode.HTML)
+    async def render() -> list[str]:
+        command = "week" if week_style else "range"
+        return await cached_render(chat_id, command, tz, date_from, date_to, render_from_db)
+
+    await _answer_schedule(message, ical_url, ical_stale, render)
 
 
 async def _send_week_brief(
@@ -252,64 +385,61 @@ async def _send_week_brief(
     date_to: date,
     tz: str,
     ical_url: str | None,
+    ical_stale: bool = False,
 ) -> None:
     chat_id = message.chat.id
-
-    if ical_url:
-        try:
-            await sync_ical_schedule(chat_id)
-        except Exception:
-            logging.exception("iCal sync failed for chat_id=%s", chat_id)
-
     date_from_str = date_from.isoformat()
     date_to_str = date_to.isoformat()
 
-    async with async_session_maker() as session:
-        schedule_repo = ScheduleRepo(session)
-        items = await schedule_repo.get_by_date_range(chat_id, date_from_str, date_to_str)
+    async def render_from_db() -> list[str]:
+        async with async_read_session_maker() as session:
+            schedule_repo = ScheduleRepo(session)
+            items = await schedule_repo.get_by_date_range(chat_id, date_from_str, date_to_str)
+        return split_telegram(build_week_brief_message(date_from, date_to, items, tz))
+
+    async def render() -> list[str]:
+        return await cached_render(chat_id, "brief", tz, date_from, date_to, render_from_db)
 
-    message_text = build_week_brief_message(date_from, date_to, items, tz)
-    for chunk in split_telegram(message_text):
-        await message.answer(chunk, parse_mode=ParseMode.HTML)
+    await _answer_schedule(message, ical_url, ical_stale, render)
 
 
 @router.message(Command("today"), F.chat.type.in_({"group", "supergroup"}))
 async def group_today(message: Message) -> None:
-    tz, ical_url = await _resolve_chat_context(message.chat.id)
+    tz, ical_url, ical_stale = await _resolve_chat_context(message.chat.id)
     target_date = get_today(tz)
-    await _send_range_schedule(message, target_date, target_date, tz, ical_url)
+    await _send_range_schedule(message, target_date, target_date, tz, ical_url, ical_stale)
 
 
 @router.message(Command("tomorrow"), F.chat.type.in_({"group", "supergroup"}))
 async def group_tomorrow(message: Message) -> None:
-    tz, ical_url = await _resolve_chat_context(message.chat.id)
+    tz, ical_url, ical_stale = await _resolve_chat_context(message.chat.id)
     target_date = get_tomorrow(tz)
-    await _send_range_schedule(message, target_date, target_date, tz, ical_url)
+    await _send_range_schedule(message, target_date, target_date, tz, ical_url, ical_stale)
 
 
 @router.message(Command("weekbrief", "week_short"), F.chat.type.in_({"group", "supergroup"}))
 async def group_week_brief(message: Message) -> None:
-    tz, ical_url = await _resolve_chat_context(message.chat.id)
+    tz, ical_url, ical_stale = await _resolve_chat_context(message.chat.id)
     date_from, date_to = get_week_window(tz)
-    await _send_week_brief(message, date_from, date_to, tz, ical_url)
+    await _send_week_brief(message, date_from, date_to, tz, ical_url, ical_stale)
 
 
 @router.message(Command("week"), F.chat.type.in_({"group", "supergroup"}))
 async def group_week(message: Message) -> None:
-    tz, ical_url = await _resolve_chat_context(message.chat.id)
+    tz, ical_url, ical_stale = await _resolve_chat_context(message.chat.id)
     date_from, date_to = get_week_window(tz)
-    await _send_range_schedule(message, date_from, date_to, tz, ical_url, week_style=True)
+    await _send_range_schedule(message, date_from, date_to, tz, ical_url, ical_stale, week_style=True)
 
 
 @router.message(Command("nextweekbrief", "nextweek_short"), F.chat.type.in_({"group", "supergroup"}))
 async def group_next_week_brief(message: Message) -> None:
-    tz, ical_url = await _resolve_chat_context(message.chat.id)
+    tz, ical_url, ical_stale = await _resolve_chat_context(message.chat.id)
     date_from, date_to = get_next_week_window(tz)
-    await _send_week_brief(message, date_from, date_to, tz, ical_url)
+    await _send_week_brief(message, date_from, date_to, tz, ical_url, ical_stale)
 
 
 @router.message(Command("nextweek"), F.chat.type.in_({"group", "supergroup"}))
 async def group_next_week(message: Message) -> None:
-    tz, ical_url = await _resolve_chat_context(message.chat.id)
+    tz, ical_url, ical_stale = await _resolve_chat_context(message.chat.id)
     date_from, date_to = get_next_week_window(tz)
-    await _send_range_schedule(message, date_from, date_to, tz, ical_url, week_style=True)
+    await _send_range_schedule(message, date_from, date_to, tz, ical_url, ical_stale, week_style=True)
@@ -8,9 +8,10 @@ from aiogram.types import Message
 from app.bot.chat_access import is_user_chat_member
 from app.bot.handlers.admin_menu import admin_menu_keyboard
 from app.bot.handlers.common import MISSING_ACTIVE_CHAT_TEXT, restore_last_active_chat_id
-from app.db.connection import async_session_maker
+from app.db.connection import async_read_session_maker, async_session_maker
 from app.db.repos.setup_tokens_repo import SetupTokenRepo
 from app.db.repos.settings_repo import SettingsRepo
+from app.services.chat_titles import refresh_missing_title
 
 router = Router()
 
@@ -25,12 +26,10 @@ def _parse_setup_token(arg: str | None) -> str | None:
 
 
 async def _send_active_chat_menu(message: Message, chat_id: int) -> None:
-    chat_title = None
-    try:
-        chat = await message.bot.get_chat(chat_id)
-        chat_title = chat.title or chat.full_name
-    except Exception:
-        pass
+    async with async_read_session_maker() as session:
+        chat_title = await SettingsRepo(session).get_chat_title(chat_id)
+    if not chat_title:
+        refresh_missing_title(message.bot, chat_id)
 
     title_text = chat_title or str(chat_id)
     await message.answer(
@@ -1,7 +1,17 @@
+import asyncio
 import logging
+import time
+from typing import Callable
+
 from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
 from aiogram.types import Message
 
+from app.config import settings as env_settings
+from app.services.chat_titles import chat_title_of, remember_chat_title
+from app.services.tracing import finish_trace, set_trace_handler, span, start_trace
+
 
 def _is_group_command(message: Message) -> bool:
     text = message.text or message.caption
@@ -34,3 +44,168 @@ class LoggingMiddleware(BaseMiddleware):
             if event.chat.type in ("group", "supergroup") and not _is_group_command(event):
                 return
         return await handler(event, data)
+
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer middleware on dp.update: times the whole update (all routers, middlewares and the handler)
+    and collects DB, Telegram and iCal time spent in its context. Register it first.
+    Until HandlerNameMiddleware names the handler the trace is "unhandled:<update type>".
+    """
+
+    async def __call__(self, handler, event, data):
+        if not env_settings.TRACE_ENABLED:
+            return await handler(event, data)
+        token = start_trace(f"unhandled:{getattr(event, 'event_type', type(event).__name__)}")
+        try:
+            return await handler(event, data)
+        finally:
+            finish_trace(token)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner middleware (propagates to nested routers): names the trace after the matched handler."""
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        if callback is not None:
+            module = getattr(callback, "__module__", "").rsplit(".", 1)[-1]
+            set_trace_handler(f"{module}.{getattr(callback, '__name__', repr(callback))}")
+        return await handler(event, data)
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+    """Session middleware: Telegram API time of the traced update, including rate-limit waits when outermost."""
+
+    async def __call__(self, make_request, bot, method):
+        with span("telegram"):
+            return await make_request(bot, method)
+
+
+class ChatTitleMiddleware(BaseMiddleware):
+    """
+    Keeps settings.chat_title current from the group updates the bot receives anyway (messages,
+    my_chat_member, chat_member, title changes), so menus and /status never call get_chat for it.
+    Register as an outer middleware on dp.update.
+    """
+
+    async def __call__(self, handler, event, data):
+        chat = getattr(getattr(event, "event", None), "chat", None)
+        if chat is not None and getattr(chat, "type", None) in ("group", "supergroup"):
+            try:
+                await remember_chat_title(chat.id, chat_title_of(chat))
+            except Exception:
+                logging.getLogger(__name__).exception("Failed to store title of chat_id=%s", chat.id)
+        return await handler(event, data)
+
+
+# Schedule commands whose answer depends only on the chat and the moment, so concurrent copies are interchangeable.
+_COALESCED_COMMANDS = {
+    "today": "today",
+    "tomorrow": "tomorrow",
+    "week": "week",
+    "weekbrief": "weekbrief",
+    "week_short": "weekbrief",
+    "nextweek": "nextweek",
+    "nextweekbrief": "nextweekbrief",
+    "nextweek_short": "nextweekbrief",
+}
+
+
+def _coalesce_key(message: Message) -> tuple[int, str] | None:
+    chat = getattr(message, "chat", None)
+    if chat is None or chat.type not in ("group", "supergroup"):
+        return None
+    text = (getattr(message, "text", None) or "").strip()
+    if not text.startswith("/"):
+        return None
+    command = text.split()[0][1:].split("@", 1)[0].lower()
+    canonical = _COALESCED_COMMANDS.get(command)
+    if canonical is None:
+        return None
+    return chat.id, canonical
+
+
+class GroupCommandCoalescer(BaseMiddleware):
+    """
+    Collapses bursts of the same schedule command in one group (everyone typing /today in a break).
+    The first command in a GROUP_COMMAND_COALESCE_SECONDS window is handled as usual; identical ones
+    in the window wait for it and are answered from the response cache it filled, or dropped when
+    GROUP_COMMAND_REPLY_ONCE is on (the first answer quotes its request). If the first one fails, the
+    repeats are handled normally and the window starts over, so a failed answer never silences the group.
+    Register as an inner middleware so only messages that matched a handler are counted.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float | None = None,
+        reply_once: bool | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._window_seconds = window_seconds
+        self._reply_once = reply_once
+        self._clock = clock
+        self._recent: dict[tuple[int, str], float] = {}
+        self._inflight: dict[tuple[int, str], asyncio.Event] = {}
+        self._answered: set[tuple[int, str]] = set()
+
+    @property
+    def window_seconds(self) -> float:
+        if self._window_seconds is not None:
+            return self._window_seconds
+        return max(0.0, float(env_settings.GROUP_COMMAND_COALESCE_SECONDS or 0))
+
+    @property
+    def reply_once(self) -> bool:
+        if self._reply_once is not None:
+            return self._reply_once
+        return bool(env_settings.GROUP_COMMAND_REPLY_ONCE)
+
+    def _prune(self, now: float, window: float) -> None:
+        expired = [key for key, started in self._recent.items() if now - started >= window]
+        for key in expired:
+            if key not in self._inflight:
+                del self._recent[key]
+                self._answered.discard(key)
+
+    async def __call__(self, handler, event, data):
+        window = self.window_seconds
+        key = _coalesce_key(event) if window > 0 else None
+        if key is None:
+            return await handler(event, data)
+
+        while True:
+            now = self._clock()
+            self._prune(now, window)
+            started = self._recent.get(key)
+            if started is None or (now - started >= window and key not in self._inflight):
+                break
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                # Check again afterwards: if the first one failed, one of the waiting repeats takes its place.
+                await inflight.wait()
+                continue
+            if self.reply_once and key in self._answered:
+                logging.getLogger(__name__).debug("Coalesced /%s in chat_id=%s", key[1], key[0])
+                return None
+            return await handler(event, data)
+
+        self._recent[key] = now
+        self._answered.discard(key)
+        done = asyncio.Event()
+        self._inflight[key] = done
+        answered = False
+        try:
+            result = await handler(event, data)
+            answered = result is not UNHANDLED
+            return result
+        finally:
+            if answered:
+                self._answered.add(key)
+            else:
+                # Nobody got an answer: let the next identical command be handled as a first one.
+                self._recent.pop(key, None)
+            done.set()
+            self._inflight.pop(key, None)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only methods that post into a chat count against Telegram's message limits.
+_LIMITED_METHOD_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+_MAX_CHAT_BUCKETS = 10_000
+# While a chat is under flood control the whole bot sends at this fraction of the global rate.
+_FLOOD_GLOBAL_RATE_FACTOR = 0.5
+
+
+class TokenBucket:
+    """
+    Token bucket without locks: reserve() takes a token immediately (the balance may go negative)
+    and returns how long the caller must sleep before using it, so concurrent callers queue in order.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._slow_rate = rate
+        self._slow_until = 0.0
+
+    def _rate(self, now: float) -> float:
+        return self._slow_rate if now < self._slow_until else self.rate
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate(now))
+        self._updated = now
+
+    def reserve(self) -> float:
+        now = self._clock()
+        self._refill(now)
+        self._tokens -= 1
+        wait = 0.0 if self._tokens >= 0 else -self._tokens / self._rate(now)
+        return max(wait, self._blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        """Telegram asked to wait (RetryAfter): nobody gets a token before that."""
+        self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def slow_down(self, factor: float, seconds: float) -> None:
+        """Refills at `factor` of the normal rate for the next `seconds`."""
+        now = self._clock()
+        self._refill(now)
+        self._slow_rate = self.rate * factor
+        self._slow_until = max(self._slow_until, now + seconds)
+
+    def is_idle(self) -> bool:
+        now = self._clock()
+        self._refill(now)
+        return self._tokens >= self.capacity and self._blocked_until <= now
+
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    """
+    Session middleware that paces every outgoing message (scheduled sends and handler replies alike):
+    one global bucket plus a bucket per chat (groups ~20/min, private chats ~1/s with a small burst,
+    so a multi-part reply is not spread over seconds).
+    TelegramRetryAfter pauses the affected bucket and retries instead of failing the send. Telegram does not
+    say whether a flood wait is per chat or bot-wide, so a chat's flood wait also halves the global rate
+    for its duration, and a second chat hitting one meanwhile pauses the global bucket as well.
+    """
+
+    def __init__(
+        self,
+        global_rate: float | None = None,
+        group_rate_per_minute: float | None = None,
+        private_rate: float | None = None,
+        private_burst: float | None = None,
+        max_retries: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        global_rate = global_rate if global_rate is not None else settings.TELEGRAM_GLOBAL_RATE
+        self._group_rate_per_minute = (
+            group_rate_per_minute if group_rate_per_minute is not None else settings.TELEGRAM_GROUP_RATE_PER_MINUTE
+        )
+        self._private_rate = private_rate if private_rate is not None else settings.TELEGRAM_PRIVATE_RATE
+        self._private_burst = private_burst if private_burst is not None else settings.TELEGRAM_PRIVATE_BURST
+        self._max_retries = max_retries if max_retries is not None else settings.TELEGRAM_RETRY_AFTER_MAX_RETRIES
+        self._clock = clock
+        self._global = TokenBucket(global_rate, global_rate, clock)
+        # LRU: the least recently used chat is dropped first once _MAX_CHAT_BUCKETS is reached.
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+        self._flood_chat_id: int | str | None = None
+        self._flood_until = 0.0
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+        else:
+            while len(self._chats) >= _MAX_CHAT_BUCKETS:
+                self._chats.popitem(last=False)
+            # Channels/groups have negative ids (and @usernames are public chats).
+            if isinstance(chat_id, str) or chat_id < 0:
+                rate = self._group_rate_per_minute / 60
+                capacity = self._group_rate_per_minute
+            else:
+                rate = self._private_rate
+                capacity = max(1.0, self._private_burst)
+            bucket = TokenBucket(rate, capacity, self._clock)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _on_flood_wait(self, chat_id: int | str | None, chat_bucket: TokenBucket | None, seconds: float) -> None:
+        if chat_bucket is None:
+            self._global.block_for(seconds)
+            return
+        chat_bucket.block_for(seconds)
+        now = self._clock()
+        if now < self._flood_until and chat_id != self._flood_chat_id:
+            # Two chats under flood control at once: the limit is the bot's, not the chat's.
+            self._global.block_for(seconds)
+        else:
+            self._global.slow_down(_FLOOD_GLOBAL_RATE_FACTOR, seconds)
+        self._flood_chat_id = chat_id
+        self._flood_until = max(self._flood_until, now + seconds)
+
+    async def _acquire(self, chat_bucket: TokenBucket | None) -> None:
+        # Chat first, then global: a chat waiting out its per-minute budget must not hold a global token.
+        if chat_bucket is not None:
+            delay = chat_bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        delay = self._global.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __call__(self, make_request, bot, method):
+        if not type(method).__name__.startswith(_LIMITED_METHOD_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+
+        attempt = 0
+        while True:
+            await self._acquire(chat_bucket)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                attempt += 1
+                if attempt > self._max_retries:
+                    raise
+                logger.warning(
+                    "Telegram flood control on %s chat_id=%s: retry in %ss (attempt %s/%s)",
+                    type(method).__name__,
+                    chat_id,
+                    exc.retry_after,
+                    attempt,
+                    self._max_retries,
+                )
+                self._on_flood_wait(chat_id, chat_bucket, exc.retry_after)
@@ -0,0 +1,198 @@
+import asyncio
+import hmac
+import logging
+import signal
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.bot.circuit_breaker import telegram_breaker
+from app.config import settings as env_settings
+from app.services.tracing import latency_stats
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = "/healthz"
+METRICS_PATH = "/metrics"
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler that answers Telegram at once and processes updates in the background,
+    at most `max_concurrent` at a time. When all slots are busy the HTTP response waits for one,
+    so Telegram (limited by max_connections) slows down instead of the bot piling up tasks.
+    Only aiogram's public API is used: `handle` (the route registered by `register`) is replaced,
+    and the background tasks are tracked here rather than by aiogram's handle_in_background machinery.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrent: int, **kwargs: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=False, **kwargs)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        update = await request.json(loads=bot.session.json_loads)
+        await self._slots.acquire()
+        try:
+            task = asyncio.create_task(self._feed_update(bot, update))
+        except BaseException:
+            self._slots.release()
+            raise
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._slots.release())
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    __call__ = handle
+
+    async def _feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            result = await self.dispatcher.feed_raw_update(bot, update, **self.data)
+            # The HTTP response is already sent, so a method returned by a handler is called instead.
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(bot, result)
+        except Exception:
+            logger.exception("Webhook update %s failed.", update.get("update_id"))
+
+    async def drain(self, timeout: float = 0) -> None:
+        """Lets updates in progress finish within `timeout` seconds, then cancels the rest."""
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+        if timeout > 0:
+            await asyncio.wait(tasks, timeout=timeout)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        # aiogram closes the bot session here on app shutdown; graceful_shutdown still needs it and closes it last.
+        pass
+
+
+def build_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    path: str,
+    secret_token: str | None = None,
+    max_concurrent: int = 16,
+) -> tuple[web.Application, BoundedRequestHandler]:
+    """
+    aiohttp app with the Telegram webhook on `path` (POST), a health check on /healthz (GET)
+    and per-handler latency percentiles on /metrics (GET, JSON). /metrics is served only with a secret
+    and requires it as "Authorization: Bearer <secret>".
+    """
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dispatcher,
+        bot,
+        max_concurrent=max_concurrent,
+        secret_token=secret_token or None,
+    )
+    handler.register(app, path=path)
+
+    async def healthz(request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "status": "ok",
+                "telegram": "unreachable" if telegram_breaker.is_open else "ok",
+                "updates_in_flight": handler.in_flight,
+                "max_concurrent_updates": handler.max_concurrent,
+            }
+        )
+
+    async def metrics(request: web.Request) -> web.Response:
+        expected = f"Bearer {secret_token}".encode()
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+            return web.Response(body="Unauthorized", status=401)
+        return web.json_response({"handlers": latency_stats.snapshot()})
+
+    app.router.add_get(HEALTH_PATH, healthz)
+    if secret_token:
+        app.router.add_get(METRICS_PATH, metrics)
+    setup_application(app, dispatcher, bot=bot)
+    return app, handler
+
+
+def _webhook_url() -> str:
+    base = (env_settings.WEBHOOK_URL or "").rstrip("/")
+    if not base:
+        raise RuntimeError("TELEGRAM_MODE=webhook requires WEBHOOK_URL (public https:// base URL of this bot).")
+    return base + env_settings.WEBHOOK_PATH
+
+
+def _webhook_secret() -> str:
+    secret = env_settings.WEBHOOK_SECRET or ""
+    if not secret:
+        # Without it anyone who finds the URL can post forged updates.
+        raise RuntimeError("TELEGRAM_MODE=webhook requires WEBHOOK_SECRET (long random string).")
+    return secret
+
+
+async def _wait_for_stop_signal() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C still arrives as KeyboardInterrupt/CancelledError.
+            pass
+    try:
+        await stop.wait()
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+
+async def run_webhook(bot: Bot, dispatcher: Dispatcher, allowed_updates: list[str]) -> None:
+    """
+    Serves the webhook until SIGTERM/SIGINT. On stop, new requests are refused first, then updates
+    in progress get half of SHUTDOWN_TIMEOUT_SECONDS (the rest is left to graceful_shutdown).
+    The webhook stays registered, so Telegram keeps updates queued until the next start.
+    """
+    url, secret = _webhook_url(), _webhook_secret()
+    app, handler = build_webhook_app(
+        dispatcher,
+        bot,
+        path=env_settings.WEBHOOK_PATH,
+        secret_token=secret,
+        max_concurrent=env_settings.WEBHOOK_MAX_CONCURRENT_UPDATES,
+    )
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, host=env_settings.WEBHOOK_HOST, port=env_settings.WEBHOOK_PORT)
+    await site.start()
+    try:
+        await bot.set_webhook(
+            url,
+            secret_token=secret,
+            allowed_updates=allowed_updates,
+            max_connections=min(100, max(1, env_settings.WEBHOOK_MAX_CONCURRENT_UPDATES)),
+        )
+        logger.info(
+            "Webhook listening on %s:%s%s",
+            env_settings.WEBHOOK_HOST,
+            env_settings.WEBHOOK_PORT,
+            env_settings.WEBHOOK_PATH,
+        )
+        await _wait_for_stop_signal()
+    finally:
+        await site.stop()
+        await handler.drain(timeout=max(0.0, float(env_settings.SHUTDOWN_TIMEOUT_SECONDS)) / 2)
+        await runner.cleanup()
@@ -10,6 +10,7 @@ from pydantic_settings import BaseSettings
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 DEFAULT_DB_PATH = "sqlite+aiosqlite:///./data/bot.db"
+SQLITE_PROFILE_NAMES = ("durable", "balanced", "throughput")
 
 _URL_SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
 _WINDOWS_DRIVE_PATH_RE = re.compile(r"^[a-zA-Z]:[\\\\/]")
@@ -72,8 +73,97 @@ class Settings(BaseSettings):
     # 0 = allowed to sync every run; set >0 to throttle (seconds)
     ICAL_SYNC_MIN_INTERVAL_SECONDS: int = 0
     ICAL_SYNC_DAYS: int = 14
+    # Warm-up: feeds are refreshed during the LEAD minutes before each send time (spread per chat);
+    # the send itself re-syncs only if the cached data is older than MAX_AGE minutes (0 = always use the cache).
+    ICAL_WARMUP_LEAD_MINUTES: int = 10
+    ICAL_SEND_MAX_AGE_MINUTES: int = 180
+    # Group commands (/today, /week, ...) answer from stored data; older data is refreshed in the background.
+    ICAL_COMMAND_MAX_AGE_MINUTES: int = 30
+    # Rendered answers of group commands (and each chat's settings they need) kept in memory (LRU entries; 0 = off).
+    RESPONSE_CACHE_SIZE: int = 512
+    # Identical group commands within this window share one answer (0 = off); reply-once (opt-in) drops
+    # the duplicates once the first one was answered.
+    GROUP_COMMAND_COALESCE_SECONDS: float = 10
+    GROUP_COMMAND_REPLY_ONCE: bool = False
     SETUP_TOKEN_TTL_MINUTES: int = 20
+    # get_chat_member answers cached per (chat, user): members for CACHE_SECONDS, non-members for NEGATIVE seconds.
+    CHAT_MEMBER_CACHE_SIZE: int = 4096
+    CHAT_MEMBER_CACHE_SECONDS: float = 300
+    CHAT_MEMBER_NEGATIVE_CACHE_SECONDS: float = 30
     TELEGRAM_PROXY: Optional[str] = None
+    # Update delivery: "polling" or "webhook" (aiohttp server on WEBHOOK_HOST:WEBHOOK_PORT, public WEBHOOK_URL + PATH).
+    TELEGRAM_MODE: str = "polling"
+    WEBHOOK_URL: Optional[str] = None
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_MAX_CONCURRENT_UPDATES: int = 16
+    # Outgoing message pacing (Telegram: ~30 msg/s overall, 20 msg/min per group, ~1 msg/s per private chat).
+    TELEGRAM_GLOBAL_RATE: float = 30
+    TELEGRAM_GROUP_RATE_PER_MINUTE: float = 20
+    TELEGRAM_PRIVATE_RATE: float = 1
+    TELEGRAM_PRIVATE_BURST: float = 3
+    TELEGRAM_RETRY_AFTER_MAX_RETRIES: int = 3
+    # Circuit breaker: after N consecutive network errors Telegram calls fail fast and delivery pauses;
+    # get_me probes with backoff, then delivery concurrency ramps back up over RAMP_SECONDS.
+    TELEGRAM_BREAKER_FAILURE_THRESHOLD: int = 5
+    TELEGRAM_BREAKER_BACKOFF_SECONDS: float = 5
+    TELEGRAM_BREAKER_BACKOFF_MAX_SECONDS: float = 300
+    TELEGRAM_BREAKER_RAMP_SECONDS: float = 60
+    # Outbox delivery: chats delivered in parallel (each chat is one ordered lane); failed sends retry with backoff.
+    DELIVERY_WORKERS: int = 4
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BASE_SECONDS: float = 5
+    OUTBOX_RETRY_MAX_SECONDS: float = 300
+    OUTBOX_POLL_SECONDS: float = 1
+    # Delivery results are written to send_log/outbox in one batch per interval.
+    OUTBOX_FLUSH_SECONDS: float = 1
+    # Spread scheduled sends: each chat is delayed by a stable crc32(chat_id) offset within this window (0 = off).
+    SEND_SPREAD_SECONDS: int = 0
+    # On SIGTERM in-flight sends and syncs get this long to finish (keep below the container stop timeout).
+    SHUTDOWN_TIMEOUT_SECONDS: float = 20
+    # FSM (private settings dialogs): "sqlite" keeps state in the DB across restarts, "memory" is aiogram's
+    # MemoryStorage. Keys idle for FSM_TTL_DAYS are dropped; writes are batched every FSM_FLUSH_SECONDS
+    # (0 = write-through without a local cache, needed when several bot processes share the DB).
+    FSM_STORAGE: str = "sqlite"
+    FSM_TTL_DAYS: int = 30
+    FSM_CACHE_SIZE: int = 1024
+    FSM_FLUSH_SECONDS: float = 1
+    # Per-update latency tracing (handler, DB, Telegram API, iCal time). Updates slower than TRACE_SLOW_MS are logged;
+    # p50/p90/p99 of the last TRACE_SAMPLE_SIZE updates per handler are logged every TRACE_REPORT_MINUTES (0 = off)
+    # and served on /metrics in webhook mode.
+    TRACE_ENABLED: bool = True
+    TRACE_SLOW_MS: int = 1000
+    TRACE_SAMPLE_SIZE: int = 512
+    TRACE_REPORT_MINUTES: int = 15
+    # Retention (days to keep; 0 = keep forever). Runs daily at RETENTION_HOUR.
+    RETENTION_HOUR: int = 4
+    RETENTION_SEND_LOG_DAYS: int = 90
+    RETENTION_UPLOADS_DAYS: int = 30
+    RETENTION_SETUP_TOKENS_DAYS: int = 7
+    RETENTION_SCHEDULE_DAYS: int = 30
+    RETENTION_BATCH_SIZE: int = 500
+    # SQLite PRAGMA profile: durable | balanced | throughput (see app/db/connection.py SQLITE_PROFILES)
+    SQLITE_PROFILE: str = "balanced"
+    # Connections of the read-only SQLite pool used by command read paths (WAL readers never wait on the writer).
+    DB_READ_POOL_SIZE: int = 8
+
+    @field_validator("TELEGRAM_MODE")
+    @classmethod
+    def validate_telegram_mode(cls, value: str):
+        value = (value or "polling").strip().lower()
+        if value not in ("polling", "webhook"):
+            raise ValueError("TELEGRAM_MODE must be 'polling' or 'webhook'")
+        return value
+
+    @field_validator("FSM_STORAGE")
+    @classmethod
+    def validate_fsm_storage(cls, value: str):
+        value = (value or "sqlite").strip().lower()
+        if value not in ("sqlite", "memory"):
+            raise ValueError("FSM_STORAGE must be 'sqlite' or 'memory'")
+        return value
 
     @field_validator("MORNING_TIME", "EVENING_TIME")
     @classmethod
@@ -95,6 +185,14 @@ class Settings(BaseSettings):
             raise ValueError(f"TZ must be a valid IANA timezone, got '{value}'") from exc
         return value
 
+    @field_validator("SQLITE_PROFILE")
+    @classmethod
+    def validate_sqlite_profile(cls, value: str):
+        value = (value or "").strip().lower()
+        if value not in SQLITE_PROFILE_NAMES:
+            raise ValueError(f"SQLITE_PROFILE must be one of {', '.join(SQLITE_PROFILE_NAMES)}, got '{value}'")
+        return value
+
     @field_validator("DB_PATH", mode="before")
     @classmethod
     def normalize_db_path_value(cls, value):
@@ -1,22 +1,65 @@
 import asyncio
 import errno
+from functools import lru_cache
 import logging
 import os
 from pathlib import Path
+import re
 import shutil
+import time
 import uuid
 
-from alembic import command
-from alembic.config import Config
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import event
+from sqlalchemy import event, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.engine.url import make_url
 
 from app.config import settings
+from app.services.tracing import add_span_time, current_trace
 
 SQLITE_TIMEOUT_SECONDS = 30
 
+# PRAGMAs applied to every new SQLite connection, selected by settings.SQLITE_PROFILE.
+# Measured with scripts/bench_sqlite_profiles.py (results in README, "Профиль SQLite"). All profiles keep WAL
+# and the same crash-safety of the file itself; they differ in how many of the last commits a power loss may
+# roll back and in memory use.
+SQLITE_PROFILES: dict[str, dict[str, int | str]] = {
+    # fsync on every commit: nothing committed is ever lost, but each commit pays a disk flush.
+    "durable": {
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 64 * 1024 * 1024,
+    },
+    # fsync only at checkpoints: a power loss may drop the last commits, app crashes lose nothing.
+    "balanced": {
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 64 * 1024 * 1024,
+    },
+    # Like balanced, plus a bigger cache/mmap and fewer checkpoints for bulk syncs of many chats.
+    "throughput": {
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 4000,
+        "journal_size_limit": 128 * 1024 * 1024,
+    },
+}
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+MIGRATIONS_VERSIONS_DIR = PROJECT_ROOT / "migrations" / "versions"
+
+_REVISION_RE = re.compile(r"^revision\b[^=\n]*=\s*['\"]([^'\"]+)['\"]", re.MULTILINE)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\b[^=\n]*=\s*(.+)$", re.MULTILINE)
+_QUOTED_RE = re.compile(r"['\"]([^'\"]+)['\"]")
+
 
 def _is_sqlite_url(url: str) -> bool:
     return url.startswith("sqlite")
@@ -186,6 +229,8 @@ def _prepare_sqlite_filesystem(db_url: str) -> None:
 
 _engine = None
 _session_maker = None
+_read_engine = None
+_read_session_maker = None
 
 
 def _ensure_engine_initialized() -> None:
@@ -205,6 +250,77 @@ def async_session_maker() -> AsyncSession:
     assert _session_maker is not None
     return _session_maker()
 
+
+def _set_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def _ensure_read_engine_initialized() -> None:
+    global _read_engine, _read_session_maker
+    if _read_engine is not None and _read_session_maker is not None:
+        return
+
+    _ensure_engine_initialized()
+    if sqlite_db_file_path(settings.DB_PATH) is None:
+        # Non-file databases (":memory:", other backends) cannot share state with a second engine.
+        _read_engine = _engine
+        _read_session_maker = _session_maker
+        return
+
+    # Not `mode=ro`: a read-only open cannot create the -shm file and fails on a WAL DB whose writer is idle.
+    # query_only gives the same guarantee (any write raises) on ordinary WAL readers.
+    pool_size = max(1, settings.DB_READ_POOL_SIZE)
+    _read_engine = create_async_engine(
+        settings.DB_PATH,
+        echo=False,
+        connect_args={"timeout": SQLITE_TIMEOUT_SECONDS},
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    event.listen(_read_engine.sync_engine, "connect", _set_query_only)
+    _read_session_maker = async_sessionmaker(_read_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def async_read_session_maker() -> AsyncSession:
+    """
+    Session for pure reads (schedule ranges, coverage, last upload).
+
+    Under WAL these connections read the last committed snapshot and never wait for a long sync
+    transaction on the writer engine. Writes through this session fail with "attempt to write a readonly database".
+    """
+    _ensure_read_engine_initialized()
+    assert _read_session_maker is not None
+    return _read_session_maker()
+
+async def dispose_engines() -> None:
+    """Closes the reader and writer pools (shutdown). Sessions opened afterwards create fresh engines."""
+    global _engine, _session_maker, _read_engine, _read_session_maker
+    read_engine, engine = _read_engine, _engine
+    _read_engine = _read_session_maker = None
+    _engine = _session_maker = None
+    if read_engine is not None and read_engine is not engine:
+        await read_engine.dispose()
+    if engine is not None:
+        await engine.dispose()
+
+# DB time of the update being handled (see app/services/tracing.py); a no-op outside of updates.
+@event.listens_for(Engine, "before_cursor_execute")
+def _trace_cursor_start(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_trace() is not None:
+        context._trace_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _trace_cursor_end(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_trace_started", None)
+    if started is not None:
+        add_span_time("db", time.perf_counter() - started)
+
+
 # Enable foreign_keys = ON (sqlite specific)
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -212,21 +328,113 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         return
     cursor = dbapi_connection.cursor()
     try:
+        # Must precede anything that creates tables; on existing DBs it is a no-op until VACUUM, and setting it
+        # there waits for the write lock, which would make every new reader queue behind a long write.
+        cursor.execute("PRAGMA page_count")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute(f"PRAGMA busy_timeout={SQLITE_TIMEOUT_SECONDS * 1000}")
+        for name, value in sqlite_profile().items():
+            cursor.execute(f"PRAGMA {name}={value}")
     finally:
         cursor.close()
 
+
+def sqlite_profile(name: str | None = None) -> dict[str, int | str]:
+    return SQLITE_PROFILES.get(name or settings.SQLITE_PROFILE, SQLITE_PROFILES["balanced"])
+
+
+async def log_sqlite_profile() -> None:
+    """Logs the PRAGMA values actually in effect (SQLite silently ignores unsupported ones)."""
+    if not _is_sqlite_url(settings.DB_PATH):
+        return
+    values = {}
+    async with get_engine().connect() as conn:
+        for name in ("journal_mode", *sqlite_profile()):
+            values[name] = (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+    logging.info(
+        "SQLite profile=%s %s",
+        settings.SQLITE_PROFILE,
+        " ".join(f"{name}={value}" for name, value in values.items()),
+    )
+
 def get_engine():
     _ensure_engine_initialized()
     assert _engine is not None
     return _engine
 
 
+def sqlite_storage_bytes(db_url: str | None = None) -> int | None:
+    """Size of the SQLite DB file plus its WAL, or None for non-file databases."""
+    sqlite_db = sqlite_db_file_path(db_url or settings.DB_PATH)
+    if sqlite_db is None:
+        return None
+    db_abs = _resolve_db_path(sqlite_db)
+    total = 0
+    for path in (db_abs, db_abs.with_name(f"{db_abs.name}-wal")):
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+async def compact_database() -> None:
+    """
+    Return free pages to the filesystem after bulk deletes.
+
+    incremental_vacuum only shrinks DBs created with auto_vacuum=INCREMENTAL; older DBs reuse the freed
+    pages instead, so the file still stops growing. The WAL is checkpointed and truncated either way.
+    """
+    if not _is_sqlite_url(settings.DB_PATH):
+        return
+    engine = get_engine()
+    async with engine.connect() as conn:
+        auto_vacuum = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if auto_vacuum == 2:
+            # A plain execute() frees a single page per step; executescript() runs the pragma to completion.
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript("PRAGMA incremental_vacuum;")
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+@lru_cache(maxsize=None)
+def migration_head_revisions(versions_dir: Path = MIGRATIONS_VERSIONS_DIR) -> frozenset[str]:
+    """
+    Head revision(s) of the migration scripts, read from their `revision`/`down_revision` lines.
+
+    This avoids importing Alembic (and executing every script) just to learn that the DB is current.
+    """
+    revisions: set[str] = set()
+    parents: set[str] = set()
+    for script in sorted(versions_dir.glob("*.py")):
+        source = script.read_text(encoding="utf-8")
+        revision = _REVISION_RE.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION_RE.search(source)
+        if down_revision is not None:
+            parents.update(_QUOTED_RE.findall(down_revision.group(1)))
+    return frozenset(revisions - parents)
+
+
+async def _current_db_revisions() -> frozenset[str] | None:
+    """Revisions stamped in alembic_version, or None if the table is missing/unreadable."""
+    try:
+        async with get_engine().connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            return frozenset(row[0] for row in result)
+    except Exception:
+        return None
+
+
 async def ensure_schema() -> None:
     """
     Ensure the database schema matches the latest migrations.
+    Alembic is only loaded when alembic_version differs from the migration heads.
     """
     _ensure_engine_initialized()
     try:
@@ -239,6 +447,22 @@ async def ensure_schema() -> None:
     if sqlite_db is not None:
         sqlite_db_abs = _resolve_db_path(sqlite_db)
         logging.info("SQLite DB file=%s (exists=%s)", sqlite_db_abs, sqlite_db_abs.exists())
+        try:
+            await log_sqlite_profile()
+        except Exception:
+            logging.exception("Failed to read SQLite PRAGMA values.")
+
+    heads = migration_head_revisions()
+    current = await _current_db_revisions()
+    if heads and current == heads:
+        logging.info("Database schema is up to date (revision=%s); skipping Alembic.", ",".join(sorted(heads)))
+        return
+
+    logging.info(
+        "Database schema upgrade required (current=%s, head=%s).",
+        ",".join(sorted(current)) if current else None,
+        ",".join(sorted(heads)),
+    )
     try:
         await asyncio.to_thread(_run_migrations)
     except Exception:
@@ -247,7 +471,9 @@ async def ensure_schema() -> None:
 
 
 def _run_migrations() -> None:
-    project_root = Path(__file__).resolve().parents[2]
-    alembic_cfg = Config(str(project_root / "alembic.ini"))
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_cfg = Config(str(PROJECT_ROOT / "alembic.ini"))
     alembic_cfg.set_main_option("sqlalchemy.url", settings.DB_PATH)
     command.upgrade(alembic_cfg, "head")
@@ -1,7 +1,87 @@
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, validates
 from sqlalchemy import Integer, Text, Index, UniqueConstraint, ForeignKey, CheckConstraint, Boolean
+from sqlalchemy.types import TypeDecorator
 from typing import Optional
 
+_EPOCH_DAY_ZERO = date(1970, 1, 1)
+
+
+class EpochDay(TypeDecorator):
+    """YYYY-MM-DD in Python, days since 1970-01-01 in the DB (same ordering, 1-3 byte varint)."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        if isinstance(value, datetime):
+            value = value.date()
+        if not isinstance(value, date):
+            value = date.fromisoformat(str(value).strip()[:10])
+        return (value - _EPOCH_DAY_ZERO).days
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return (_EPOCH_DAY_ZERO + timedelta(days=int(value))).isoformat()
+
+
+class DayMinute(TypeDecorator):
+    """HH:MM in Python, minutes since midnight in the DB."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        hours, minutes = str(value).strip()[:5].split(":")
+        return int(hours) * 60 + int(minutes)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return f"{int(value) // 60:02d}:{int(value) % 60:02d}"
+
+
+class EpochSeconds(TypeDecorator):
+    """
+    ISO datetime in Python, unix seconds in the DB. 0 stands for "no value" (key columns are NOT NULL).
+    Only the instant is stored: values are read back as UTC ("...+00:00") whatever offset they were written
+    with, and naive values are taken as UTC. Compare them as instants, not as strings.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return 0
+        if isinstance(value, int):
+            return value
+        if not isinstance(value, datetime):
+            value = datetime.fromisoformat(str(value).strip())
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return None
+        return datetime.fromtimestamp(int(value), tz=timezone.utc).isoformat()
+
+
+LOCAL_ICAL_UID_PREFIX = "legacy:"
+
+
+def new_local_ical_uid() -> str:
+    """Synthetic ical_uid for rows that come without one (Excel/manual uploads), unique like real UIDs."""
+    return LOCAL_ICAL_UID_PREFIX + uuid4().hex
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -23,6 +103,10 @@ class Settings(Base):
     last_sent_morning_date: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     last_sent_evening_date: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     last_sent_manual_at: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Delivery health: healthy | degraded | unreachable (see app/services/chat_health.py).
+    delivery_state: Mapped[str] = mapped_column(Text, nullable=False, default="healthy", server_default="healthy")
+    delivery_state_reason: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    delivery_state_at: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     updated_at: Mapped[str] = mapped_column(Text, nullable=False)
 
     __table_args__ = (
@@ -65,26 +149,31 @@ class Upload(Base):
 
 class ScheduleItem(Base):
     __tablename__ = "schedule_items"
-    
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    chat_id: Mapped[int] = mapped_column(Integer, ForeignKey("settings.chat_id"), nullable=False)
-    date: Mapped[str] = mapped_column(Text, nullable=False)
-    start_time: Mapped[str] = mapped_column(Text, nullable=False)
-    end_time: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # Clustered WITHOUT ROWID table: the primary key leads with the read path (chat_id, date, start_time),
+    # so a /week window is one contiguous B-tree range and rows need no separate date index.
+    # ical_uid/ical_dtstart complete the key and are unique per chat (iCal upserts conflict on them):
+    # rows without an iCal UID get a synthetic 'legacy:<hex>' UID and ical_dtstart 0, as the migration did.
+    chat_id: Mapped[int] = mapped_column(Integer, ForeignKey("settings.chat_id"), primary_key=True)
+    date: Mapped[str] = mapped_column(EpochDay, primary_key=True)
+    start_time: Mapped[str] = mapped_column(DayMinute, primary_key=True)
+    ical_uid: Mapped[str] = mapped_column(Text, primary_key=True, default=new_local_ical_uid)
+    ical_dtstart: Mapped[Optional[str]] = mapped_column(EpochSeconds, primary_key=True, default=0)
+    end_time: Mapped[str] = mapped_column(DayMinute, nullable=False)
     room: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     subject: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     teacher: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    ical_uid: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    ical_dtstart: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     source_upload_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("uploads.id"), nullable=True)
-    
+
     __table_args__ = (
-        Index("idx_schedule_date", "chat_id", "date"),
-        Index("idx_schedule_date_start", "chat_id", "date", "start_time"),
-        Index("idx_schedule_ical_key", "chat_id", "ical_uid", "ical_dtstart"),
         UniqueConstraint("chat_id", "ical_uid", "ical_dtstart", name="uq_schedule_ical_key"),
+        {"sqlite_with_rowid": False},
     )
 
+    @validates("ical_uid")
+    def _validate_ical_uid(self, key, value):
+        return value or new_local_ical_uid()
+
 
 class SendLog(Base):
     __tablename__ = "send_log"
@@ -101,3 +190,57 @@ class SendLog(Base):
     __table_args__ = (
         UniqueConstraint("chat_id", "target_date", "kind", name="uq_send_log"),
     )
+
+
+class Outbox(Base):
+    """Scheduled deliveries waiting for (or being handled by) the delivery workers; one row per send_log key."""
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    chat_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    target_date: Mapped[str] = mapped_column(Text, nullable=False)
+    kind: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_at: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[str] = mapped_column(Text, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("chat_id", "target_date", "kind", name="uq_outbox"),
+        Index("idx_outbox_status_available", "status", "available_at"),
+    )
+
+
+class RenderedMessage(Base):
+    """
+    Day message pre-rendered at sync time (morning and evening sends of a date share it), stored as
+    ready-to-send Telegram chunks so the due-time send skips the schedule query and formatting.
+    """
+
+    __tablename__ = "rendered_messages"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    chat_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    target_date: Mapped[str] = mapped_column(Text, nullable=False)
+    chunks: Mapped[str] = mapped_column(Text, nullable=False)  # JSON list of message parts
+    content_hash: Mapped[str] = mapped_column(Text, nullable=False)
+    items_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rendered_at: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (UniqueConstraint("chat_id", "target_date", name="uq_rendered_messages"),)
+
+
+class FsmState(Base):
+    """aiogram FSM state and data of one storage key (bot, chat, user, ...), written by SqliteStorage."""
+
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(Text, primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    data: Mapped[str] = mapped_column(Text, nullable=False, default="{}")  # JSON object
+    updated_at: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (Index("idx_fsm_states_updated_at", "updated_at"),)
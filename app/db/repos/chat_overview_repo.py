@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+
+from sqlalchemy import desc, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.db.models import ScheduleItem, Settings, Upload
+
+
+@dataclass
+class ChatOverview:
+    settings: Settings
+    last_upload: Upload | None
+    coverage_min: str | None
+    coverage_max: str | None
+
+
+class ChatOverviewRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, chat_id: int) -> ChatOverview | None:
+        """Settings, last upload and schedule coverage of a chat in one query; None if the chat has no settings."""
+        last_upload_sq = (
+            select(Upload).where(Upload.chat_id == chat_id).order_by(desc(Upload.id)).limit(1).subquery()
+        )
+        last_upload = aliased(Upload, last_upload_sq)
+        coverage = (
+            select(
+                func.min(ScheduleItem.date).label("coverage_min"),
+                func.max(ScheduleItem.date).label("coverage_max"),
+            )
+            .where(ScheduleItem.chat_id == chat_id)
+            .subquery()
+        )
+        stmt = (
+            select(Settings, last_upload, coverage.c.coverage_min, coverage.c.coverage_max)
+            .select_from(Settings)
+            .outerjoin(last_upload, true())
+            .join(coverage, true())
+            .where(Settings.chat_id == chat_id)
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+        return ChatOverview(settings=row[0], last_upload=row[1], coverage_min=row[2], coverage_max=row[3])
@@ -0,0 +1,44 @@
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import FsmState
+
+
+class FsmStatesRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, key: str) -> FsmState | None:
+        result = await self.session.execute(select(FsmState).where(FsmState.key == key))
+        return result.scalar_one_or_none()
+
+    async def upsert_many(self, rows: list[tuple[str, str | None, str, str]]) -> None:
+        """Stores (key, state, data_json, updated_at) rows."""
+        if not rows:
+            return
+        stmt = sqlite_insert(FsmState).values(
+            [
+                {"key": key, "state": state, "data": data, "updated_at": updated_at}
+                for key, state, data, updated_at in rows
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={
+                "state": stmt.excluded.state,
+                "data": stmt.excluded.data,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        if keys:
+            await self.session.execute(delete(FsmState).where(FsmState.key.in_(keys)))
+
+    async def delete_older_than(self, cutoff_iso: str, limit: int) -> int:
+        """Delete up to `limit` keys not touched since cutoff_iso. Returns deleted count."""
+        keys = select(FsmState.key).where(FsmState.updated_at < cutoff_iso).limit(limit)
+        result = await self.session.execute(delete(FsmState).where(FsmState.key.in_(keys)))
+        return result.rowcount
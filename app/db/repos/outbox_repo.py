@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Outbox
+from app.db.repos.sendlog_repo import BULK_CHUNK_SIZE
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+class OutboxRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _enqueue_stmt(rows: list[tuple[int, str, str, str | None]]):
+        now = datetime.now().isoformat()
+        stmt = sqlite_insert(Outbox).values(
+            [
+                {
+                    "chat_id": chat_id,
+                    "target_date": target_date,
+                    "kind": kind,
+                    "status": STATUS_PENDING,
+                    "attempts": 0,
+                    "available_at": available_at or now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for chat_id, target_date, kind, available_at in rows
+            ]
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=["chat_id", "target_date", "kind"],
+            set_={
+                "status": STATUS_PENDING,
+                "attempts": 0,
+                "available_at": stmt.excluded.available_at,
+                "updated_at": now,
+                "last_error": None,
+            },
+            where=Outbox.status.in_((STATUS_OK, STATUS_ERROR)),
+        )
+
+    async def enqueue(self, chat_id: int, target_date: str, kind: str, available_at: str | None = None) -> bool:
+        """
+        Queues a delivery. Called right after a successful send_log reservation, so a finished (ok/error) row
+        for the same key is re-armed; a pending/sending row is left alone. Returns True if a row was queued.
+        """
+        result = await self.session.execute(self._enqueue_stmt([(chat_id, target_date, kind, available_at)]))
+        return result.rowcount > 0
+
+    async def enqueue_many(self, rows: list[tuple[int, str, str, str | None]]) -> int:
+        """
+        Bulk enqueue of (chat_id, target_date, kind, available_at) rows (None = now) in one multi-row INSERT
+        per chunk; rows get ids in `rows` order. Returns queued count.
+        """
+        queued = 0
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            result = await self.session.execute(self._enqueue_stmt(rows[start : start + BULK_CHUNK_SIZE]))
+            queued += max(0, result.rowcount or 0)
+        return queued
+
+    async def claim_due(self, limit: int, now: str | None = None) -> list[Outbox]:
+        """
+        Atomically moves up to `limit` due pending rows to "sending" (attempts counted) and returns them
+        oldest first, so per-chat lanes receive a chat's messages in queue order.
+        """
+        now = now or datetime.now().isoformat()
+        due_ids = (
+            select(Outbox.id)
+            .where(Outbox.status == STATUS_PENDING, Outbox.available_at <= now)
+            .order_by(Outbox.available_at, Outbox.id)
+            .limit(limit)
+        )
+        stmt = (
+            update(Outbox)
+            .where(Outbox.id.in_(due_ids))
+            .values(status=STATUS_SENDING, attempts=Outbox.attempts + 1, updated_at=now)
+            .returning(Outbox)
+        )
+        result = await self.session.execute(stmt)
+        # RETURNING order is unspecified in SQLite.
+        return sorted(result.scalars().all(), key=lambda row: (row.available_at, row.id))
+
+    async def record_retry(self, outbox_id: int, error: str) -> None:
+        """A transient failure that the lane retries in place: the row stays "sending"."""
+        stmt = update(Outbox).where(Outbox.id == outbox_id).values(
+            attempts=Outbox.attempts + 1, updated_at=datetime.now().isoformat(), last_error=error
+        )
+        await self.session.execute(stmt)
+
+    async def release(self, outbox_id: int, available_at: str, error: str) -> bool:
+        """A claimed row goes back to "pending" until `available_at`. Returns False if it is no longer "sending"."""
+        stmt = update(Outbox).where(Outbox.id == outbox_id, Outbox.status == STATUS_SENDING).values(
+            status=STATUS_PENDING, available_at=available_at, updated_at=datetime.now().isoformat(), last_error=error
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def fail(self, outbox_id: int, error: str) -> bool:
+        """A claimed row is given up as "error". Returns False if it is no longer "sending"."""
+        stmt = update(Outbox).where(Outbox.id == outbox_id, Outbox.status == STATUS_SENDING).values(
+            status=STATUS_ERROR, updated_at=datetime.now().isoformat(), last_error=error
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def finish_many(self, rows: list[tuple[int, str, str | None]]) -> None:
+        """Bulk mark_ok/mark_error for (outbox_id, status, last_error) rows: one executemany by primary key."""
+        if not rows:
+            return
+        now = datetime.now().isoformat()
+        await self.session.execute(
+            update(Outbox),
+            [
+                {"id": outbox_id, "status": status, "last_error": error, "updated_at": now}
+                for outbox_id, status, error in rows
+            ],
+        )
+
+    async def requeue_inflight(self) -> int:
+        """Rows left in "sending" by a previous process never finished; put them back in the queue."""
+        stmt = update(Outbox).where(Outbox.status == STATUS_SENDING).values(
+            status=STATUS_PENDING, updated_at=datetime.now().isoformat()
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def delete_older_than(self, cutoff_date: str, limit: int) -> int:
+        """Delete up to `limit` finished rows with target_date < cutoff_date. Returns deleted count."""
+        ids = (
+            select(Outbox.id)
+            .where(Outbox.target_date < cutoff_date, Outbox.status.in_((STATUS_OK, STATUS_ERROR)))
+            .limit(limit)
+        )
+        stmt = delete(Outbox).where(Outbox.id.in_(ids))
+        result = await self.session.execute(stmt)
+        return result.rowcount
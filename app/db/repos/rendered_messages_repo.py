@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RenderedMessage
+
+
+class RenderedMessagesRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, chat_id: int, target_date: str) -> RenderedMessage | None:
+        stmt = select(RenderedMessage).where(
+            RenderedMessage.chat_id == chat_id,
+            RenderedMessage.target_date == target_date,
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_hashes(self, chat_id: int, date_from: str, date_to: str) -> dict[str, str]:
+        stmt = select(RenderedMessage.target_date, RenderedMessage.content_hash).where(
+            RenderedMessage.chat_id == chat_id,
+            RenderedMessage.target_date >= date_from,
+            RenderedMessage.target_date <= date_to,
+        )
+        result = await self.session.execute(stmt)
+        return {row.target_date: row.content_hash for row in result}
+
+    async def upsert_many(self, chat_id: int, rows: list[tuple[str, str, str, int]]) -> None:
+        """Stores (target_date, chunks_json, content_hash, items_count) rows for one chat."""
+        if not rows:
+            return
+        now = datetime.now().isoformat()
+        stmt = sqlite_insert(RenderedMessage).values(
+            [
+                {
+                    "chat_id": chat_id,
+                    "target_date": target_date,
+                    "chunks": chunks,
+                    "content_hash": content_hash,
+                    "items_count": items_count,
+                    "rendered_at": now,
+                }
+                for target_date, chunks, content_hash, items_count in rows
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["chat_id", "target_date"],
+            set_={
+                "chunks": stmt.excluded.chunks,
+                "content_hash": stmt.excluded.content_hash,
+                "items_count": stmt.excluded.items_count,
+                "rendered_at": stmt.excluded.rendered_at,
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def delete_range(self, chat_id: int, date_from: str, date_to: str) -> None:
+        stmt = delete(RenderedMessage).where(
+            RenderedMessage.chat_id == chat_id,
+            RenderedMessage.target_date >= date_from,
+            RenderedMessage.target_date <= date_to,
+        )
+        await self.session.execute(stmt)
+
+    async def delete_before(self, cutoff_date: str, limit: int) -> int:
+        """Delete up to `limit` rows (all chats) with target_date < cutoff_date. Returns deleted count."""
+        ids = select(RenderedMessage.id).where(RenderedMessage.target_date < cutoff_date).limit(limit)
+        result = await self.session.execute(delete(RenderedMessage).where(RenderedMessage.id.in_(ids)))
+        return result.rowcount
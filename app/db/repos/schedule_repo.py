@@ -44,14 +44,10 @@ class ScheduleRepo:
             ScheduleItem.date <= date_to,
         )
         if key_pairs:
-            # NOTE: NULL semantics matter here.
-            # Rows imported from Excel/manual sources typically have NULL ical_uid/ical_dtstart.
-            # In SQL, `NOT (NULL, NULL) IN (...)` is NULL (unknown), so such rows would NOT be deleted
-            # without an explicit NULL check. That leaves stale legacy rows mixed with iCal data.
+            # Key columns are NOT NULL (part of the clustered primary key): Excel/manual rows carry synthetic
+            # 'legacy:<...>' UIDs with ical_dtstart 0, which never match a parsed pair, so they are cleared as well.
             delete_stmt = delete_stmt.where(
-                (ScheduleItem.ical_uid.is_(None))
-                | (ScheduleItem.ical_dtstart.is_(None))
-                | (~tuple_(ScheduleItem.ical_uid, ScheduleItem.ical_dtstart).in_(key_pairs))
+                ~tuple_(ScheduleItem.ical_uid, ScheduleItem.ical_dtstart).in_(key_pairs)
             )
         await self.session.execute(delete_stmt)
 
@@ -123,3 +119,10 @@ class ScheduleRepo:
         )
         result = await self.session.execute(stmt)
         return result.one_or_none()
+
+    async def delete_before(self, cutoff_date: str, limit: int) -> int:
+        """Delete up to `limit` items (all chats) with date < cutoff_date. Returns deleted count."""
+        pk = tuple_(*ScheduleItem.__table__.primary_key.columns)
+        keys = select(*ScheduleItem.__table__.primary_key.columns).where(ScheduleItem.date < cutoff_date).limit(limit)
+        result = await self.session.execute(delete(ScheduleItem).where(pk.in_(keys)))
+        return result.rowcount
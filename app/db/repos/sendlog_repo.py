@@ -1,5 +1,7 @@
+from typing import Iterable
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, desc
+from sqlalchemy import bindparam, select, tuple_, update, delete, desc
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.db.models import SendLog
 from datetime import datetime, timedelta
@@ -10,6 +12,10 @@ STATUS_ERROR = "error"
 # Legacy compatibility: older versions used "sent" for successful delivery.
 STATUS_SENT_LEGACY = "sent"
 SUCCESS_STATUSES = (STATUS_OK, STATUS_SENT_LEGACY)
+# Rows per multi-row statement: well below SQLite's bound-parameter limit.
+BULK_CHUNK_SIZE = 500
+
+SendKey = tuple[int, str, str]  # (chat_id, target_date, kind)
 
 
 def is_send_success(status: str | None) -> bool:
@@ -20,26 +26,21 @@ class SendLogRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
         
-    async def try_reserve(
-        self,
-        chat_id: int,
-        target_date: str,
-        kind: str,
-        older_than_minutes: int = 15,
-    ) -> bool:
-        """
-        Attempts to reserve a sending task.
-        Allows re-reservation if status is "error" or "reserved" is stale.
-        """
+    @staticmethod
+    def _reserve_stmt(keys: list[SendKey], older_than_minutes: int):
         now = datetime.now().isoformat()
         stuck_before = (datetime.now() - timedelta(minutes=older_than_minutes)).isoformat()
-
-        stmt = sqlite_insert(SendLog).values(
-            chat_id=chat_id,
-            target_date=target_date,
-            kind=kind,
-            reserved_at=now,
-            status=STATUS_RESERVED,
+        return sqlite_insert(SendLog).values(
+            [
+                {
+                    "chat_id": chat_id,
+                    "target_date": target_date,
+                    "kind": kind,
+                    "reserved_at": now,
+                    "status": STATUS_RESERVED,
+                }
+                for chat_id, target_date, kind in keys
+            ]
         ).on_conflict_do_update(
             index_elements=["chat_id", "target_date", "kind"],
             set_={
@@ -54,9 +55,36 @@ class SendLogRepo:
             )
         )
 
+    async def try_reserve(
+        self,
+        chat_id: int,
+        target_date: str,
+        kind: str,
+        older_than_minutes: int = 15,
+    ) -> bool:
+        """
+        Attempts to reserve a sending task.
+        Allows re-reservation if status is "error" or "reserved" is stale.
+        """
+        stmt = self._reserve_stmt([(chat_id, target_date, kind)], older_than_minutes)
         result = await self.session.execute(stmt)
         return result.rowcount > 0
-    
+
+    async def try_reserve_many(self, keys: Iterable[SendKey], older_than_minutes: int = 15) -> set[SendKey]:
+        """
+        Bulk try_reserve: one INSERT ... ON CONFLICT DO UPDATE ... RETURNING per chunk.
+        Returns exactly the keys that were reserved (same rules as try_reserve).
+        """
+        keys = list(dict.fromkeys(keys))
+        won: set[SendKey] = set()
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            stmt = self._reserve_stmt(keys[start : start + BULK_CHUNK_SIZE], older_than_minutes).returning(
+                SendLog.chat_id, SendLog.target_date, SendLog.kind
+            )
+            result = await self.session.execute(stmt)
+            won.update((row.chat_id, row.target_date, row.kind) for row in result)
+        return won
+
     async def mark_sent(self, chat_id: int, target_date: str, kind: str, sent_at: str):
         stmt = update(SendLog).where(
             SendLog.chat_id == chat_id,
@@ -73,6 +101,55 @@ class SendLogRepo:
         ).values(status=STATUS_ERROR, error=error, sent_at=None)
         await self.session.execute(stmt)
         
+    async def mark_sent_many(self, rows: list[tuple[int, str, str, str]]) -> None:
+        """Bulk mark_sent for (chat_id, target_date, kind, sent_at) rows: one executemany statement."""
+        if not rows:
+            return
+        table = SendLog.__table__
+        stmt = update(table).where(
+            table.c.chat_id == bindparam("b_chat_id"),
+            table.c.target_date == bindparam("b_target_date"),
+            table.c.kind == bindparam("b_kind"),
+        ).values(status=STATUS_OK, sent_at=bindparam("b_sent_at"))
+        await self.session.execute(
+            stmt,
+            [
+                {"b_chat_id": chat_id, "b_target_date": target_date, "b_kind": kind, "b_sent_at": sent_at}
+                for chat_id, target_date, kind, sent_at in rows
+            ],
+        )
+
+    async def mark_error_many(self, rows: list[tuple[int, str, str, str]]) -> None:
+        """Bulk mark_error for (chat_id, target_date, kind, error) rows: one executemany statement."""
+        if not rows:
+            return
+        table = SendLog.__table__
+        stmt = update(table).where(
+            table.c.chat_id == bindparam("b_chat_id"),
+            table.c.target_date == bindparam("b_target_date"),
+            table.c.kind == bindparam("b_kind"),
+        ).values(status=STATUS_ERROR, error=bindparam("b_error"), sent_at=None)
+        await self.session.execute(
+            stmt,
+            [
+                {"b_chat_id": chat_id, "b_target_date": target_date, "b_kind": kind, "b_error": error}
+                for chat_id, target_date, kind, error in rows
+            ],
+        )
+
+    async def get_statuses(self, keys: Iterable[SendKey]) -> dict[SendKey, str]:
+        """Statuses of the given keys in one query per chunk; missing keys are absent from the result."""
+        keys = list(dict.fromkeys(keys))
+        statuses: dict[SendKey, str] = {}
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            stmt = select(SendLog.chat_id, SendLog.target_date, SendLog.kind, SendLog.status).where(
+                tuple_(SendLog.chat_id, SendLog.target_date, SendLog.kind).in_(keys[start : start + BULK_CHUNK_SIZE])
+            )
+            result = await self.session.execute(stmt)
+            for row in result:
+                statuses[(row.chat_id, row.target_date, row.kind)] = row.status
+        return statuses
+
     async def get_last_sent(self, kind: str) -> SendLog | None:
         """Get the most recent successfully delivered log entry for a given kind."""
         stmt = select(SendLog).where(
@@ -101,3 +178,10 @@ class SendLogRepo:
         )
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
+
+    async def delete_older_than(self, cutoff_date: str, limit: int) -> int:
+        """Delete up to `limit` log rows with target_date < cutoff_date. Returns deleted count."""
+        ids = select(SendLog.id).where(SendLog.target_date < cutoff_date).limit(limit)
+        stmt = delete(SendLog).where(SendLog.id.in_(ids))
+        result = await self.session.execute(stmt)
+        return result.rowcount
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.db.models import Settings
 from app.config import settings as env_settings
@@ -93,12 +93,70 @@ class SettingsRepo:
         stmt = select(Settings).where(Settings.chat_id == chat_id)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
+
+    async def find_settings(self, chat_id: int) -> Settings | None:
+        """The chat's settings row without creating it, so it also works on read-only sessions."""
+        result = await self.session.execute(select(Settings).where(Settings.chat_id == chat_id))
+        return result.scalar_one_or_none()
     
     async def get_all_settings(self) -> list[Settings]:
         stmt = select(Settings).where(Settings.chat_id.is_not(None))
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def get_schedulable_settings(self, unreachable_state: str) -> list[Settings]:
+        """Chats with sending enabled that are not in `unreachable_state` (the minute tick's working set)."""
+        stmt = select(Settings).where(
+            Settings.chat_id.is_not(None),
+            Settings.mode != 0,
+            Settings.delivery_state != unreachable_state,
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def set_delivery_state(self, chat_id: int, state: str, reason: str | None = None) -> bool:
+        """Updates the delivery health of an existing chat; returns False if nothing changed."""
+        stmt = (
+            update(Settings)
+            .where(
+                Settings.chat_id == chat_id,
+                (Settings.delivery_state != state) | Settings.delivery_state_reason.is_distinct_from(reason),
+            )
+            .values(delivery_state=state, delivery_state_reason=reason, delivery_state_at=datetime.now().isoformat())
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def set_delivery_state_many(self, chat_ids: list[int], state: str, reason: str | None = None) -> list[int]:
+        """Bulk set_delivery_state in one UPDATE ... RETURNING; returns the chat_ids whose state changed."""
+        if not chat_ids:
+            return []
+        stmt = (
+            update(Settings)
+            .where(
+                Settings.chat_id.in_(chat_ids),
+                (Settings.delivery_state != state) | Settings.delivery_state_reason.is_distinct_from(reason),
+            )
+            .values(delivery_state=state, delivery_state_reason=reason, delivery_state_at=datetime.now().isoformat())
+            .returning(Settings.chat_id)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_chat_title(self, chat_id: int) -> str | None:
+        result = await self.session.execute(select(Settings.chat_title).where(Settings.chat_id == chat_id))
+        return result.scalar_one_or_none()
+
+    async def set_chat_title(self, chat_id: int, title: str) -> bool:
+        """Stores the title of an existing chat; returns False if there is no row or the title is unchanged."""
+        stmt = (
+            update(Settings)
+            .where(Settings.chat_id == chat_id, Settings.chat_title.is_distinct_from(title))
+            .values(chat_title=title)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
     async def upsert_settings(self, chat_id: int, **kwargs):
         # Ensure updated_at is always set
         if 'updated_at' not in kwargs:
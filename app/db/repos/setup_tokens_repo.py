@@ -1,7 +1,7 @@
 import secrets
 from datetime import datetime, timedelta
 
-from sqlalchemy import select, update
+from sqlalchemy import select, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import SetupToken
@@ -73,3 +73,21 @@ class SetupTokenRepo:
         )
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none() is not None
+
+    async def delete_expired_before(self, cutoff: str, limit: int) -> int:
+        """
+        Delete up to `limit` tokens that expired before `cutoff` (UTC ISO).
+        The latest used token per user is kept: get_last_used_chat_id() restores the active chat from it.
+        """
+        last_used_ids = (
+            select(func.max(SetupToken.id))
+            .where(SetupToken.used_by.is_not(None), SetupToken.used_at.is_not(None))
+            .group_by(SetupToken.used_by)
+        )
+        ids = (
+            select(SetupToken.id)
+            .where(SetupToken.expires_at < cutoff, SetupToken.id.not_in(last_used_ids))
+            .limit(limit)
+        )
+        result = await self.session.execute(delete(SetupToken).where(SetupToken.id.in_(ids)))
+        return result.rowcount
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from app.db.models import Upload
+from sqlalchemy import select, delete, desc, func
+from app.db.models import ScheduleItem, Upload
 
 class UploadsRepo:
     def __init__(self, session: AsyncSession):
@@ -21,3 +21,22 @@ class UploadsRepo:
         )
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
+
+    async def delete_older_than(self, cutoff: str, limit: int) -> int:
+        """
+        Delete up to `limit` uploads with uploaded_at < cutoff.
+        Keeps the latest upload per chat (/status shows it) and uploads still referenced by schedule_items.
+        """
+        latest_ids = select(func.max(Upload.id)).group_by(Upload.chat_id)
+        referenced_ids = select(ScheduleItem.source_upload_id).where(ScheduleItem.source_upload_id.is_not(None))
+        ids = (
+            select(Upload.id)
+            .where(
+                Upload.uploaded_at < cutoff,
+                Upload.id.not_in(latest_ids),
+                Upload.id.not_in(referenced_ids),
+            )
+            .limit(limit)
+        )
+        result = await self.session.execute(delete(Upload).where(Upload.id.in_(ids)))
+        return result.rowcount
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from aiogram.types import (
     BotCommand,
     BotCommandScopeAllGroupChats,
@@ -16,16 +17,21 @@ from app.db.repos.settings_repo import SettingsRepo
 from app.services.scheduler_service import init_scheduler, ensure_periodic_job, scheduler
 from app.services.catchup_service import run_catchup
 from app.services.alerts_service import daily_coverage_check
+from app.services.retention_service import run_retention
+from app.services.delivery_service import start_delivery_workers
+from app.services.shutdown_service import graceful_shutdown
+from app.services.tracing import log_latency_report
 from app.bot.dispatcher import bot, dp
+from app.bot.webhook import run_webhook
 
 async def main():
     # 1. Setup Logging
     setup_logging()
     logging.info("Initializing Bot...")
 
-    # 1.5. Verify bot token
+    # 1.5. Verify bot token (Bot.me() also caches the identity for handlers, e.g. the /setup deep link)
     try:
-        bot_info = await bot.get_me()
+        bot_info = await bot.me()
         logging.info(f"Bot verified: @{bot_info.username} (id={bot_info.id})")
     except TelegramNetworkError as e:
         logging.error(f"Failed to verify bot token due to network error: {e}")
@@ -89,21 +95,53 @@ async def main():
             replace_existing=True
         )
 
-        # 6. Run Catch-up Logic per chat
-        logging.info("Running catch-up...")
-        for db_settings in all_settings:
-            try:
-                await run_catchup(db_settings)
-            except Exception:
-                logging.exception("Catch-up failed for chat_id=%s", getattr(db_settings, "chat_id", None))
+        # 5.5. Register daily retention/compaction of history tables
+        scheduler.add_job(
+            run_retention,
+            CronTrigger(hour=env_settings.RETENTION_HOUR, minute=30, timezone=env_settings.TZ),
+            id="retention",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
+        # 5.6. Periodic latency percentiles per handler (see app/services/tracing.py)
+        if env_settings.TRACE_ENABLED and env_settings.TRACE_REPORT_MINUTES > 0:
+            scheduler.add_job(
+                log_latency_report,
+                IntervalTrigger(minutes=env_settings.TRACE_REPORT_MINUTES),
+                id="latency_report",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+
+    # 6. Start outbox delivery workers (also resumes deliveries queued before a restart)
+    await start_delivery_workers()
+
+    # 6.5. Run Catch-up Logic per chat: missed sends are queued to the workers, never sent twice inline
+    logging.info("Running catch-up...")
+    for db_settings in all_settings:
+        try:
+            await run_catchup(db_settings)
+        except Exception:
+            logging.exception("Catch-up failed for chat_id=%s", getattr(db_settings, "chat_id", None))
 
     # 7. Start Scheduler
     scheduler.start()
     
-    # 8. Start Polling
-    logging.info("Starting polling...")
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    # 8. Receive updates (polling or webhook)
+    try:
+        if env_settings.TELEGRAM_MODE == "webhook":
+            logging.info("Starting webhook server...")
+            await run_webhook(bot, dp, allowed_updates=dp.resolve_used_update_types())
+        else:
+            logging.info("Starting polling...")
+            await bot.delete_webhook(drop_pending_updates=True)
+            # aiogram stops polling on SIGTERM/SIGINT; the coordinator then drains and releases what is in flight.
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types(), close_bot_session=False)
+    finally:
+        await graceful_shutdown(bot)
 
 if __name__ == "__main__":
     try:
@@ -1,15 +1,15 @@
 import logging
 from app.db.models import Settings
 from app.services.date_service import get_local_now, get_today, get_tomorrow, parse_hhmm
-from app.services.sender import send_schedule
+from app.services.delivery_service import enqueue_delivery
 from app.services.alerts_service import alert_admin
 from app.db.connection import async_session_maker
 from app.db.repos.sendlog_repo import SendLogRepo
 
 async def run_catchup(settings: Settings):
     """
-    Checks if any scheduled messages were missed while the bot was offline and sends them.
-    Also checks for stuck 'reserved' tasks in the logs.
+    Checks if any scheduled messages were missed while the bot was offline and queues them in the outbox
+    (the delivery workers must be running). Also checks for stuck 'reserved' tasks in the logs.
     """
     if not settings.chat_id:
         await alert_admin("Chat not bound, skip catch-up (chat_id missing).")
@@ -36,13 +36,13 @@ async def run_catchup(settings: Settings):
 
     # 1. Morning catch-up (Send schedule for TODAY)
     if settings.mode in (1, 2) and now_time >= morning_time:
-        # send_schedule handles anti-duplication logic internally
-        sent = await send_schedule(
+        # enqueue_delivery reserves send_log first and never queues a second row for a key already in the outbox
+        queued = await enqueue_delivery(
             chat_id=settings.chat_id,
             target_date=today,
             kind="morning"
         )
-        if sent:
+        if queued:
             msgs.append(f"morning on {today}")
 
     # 2. Evening catch-up (Send schedule for TOMORROW)
@@ -52,20 +52,20 @@ async def run_catchup(settings: Settings):
             evening_time = parse_hhmm(settings.evening_time)
             if now_time >= evening_time:
                 tomorrow = get_tomorrow(tz)
-                sent = await send_schedule(
+                queued = await enqueue_delivery(
                     chat_id=settings.chat_id,
                     target_date=tomorrow,
                     kind="evening"
                 )
-                if sent:
+                if queued:
                     msgs.append(f"evening on {tomorrow}")
         except ValueError:
             logging.error(f"Invalid evening_time format: {settings.evening_time}")
 
-    # 3. Notify admin if a catch-up action physically occurred (newly sent/attempted)
+    # 3. Notify admin if a catch-up action physically occurred (newly queued)
     if msgs:
         await alert_admin(
-            f"Bot was offline, catch-up executed for chat_id={settings.chat_id}: {', '.join(msgs)}"
+            f"Bot was offline, catch-up queued for chat_id={settings.chat_id}: {', '.join(msgs)}"
         )
 
     # 4. Check for stuck reserved tasks (reserved without sent_at for > 15 mins)
@@ -0,0 +1,82 @@
+import logging
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from app.db.connection import async_session_maker
+from app.db.repos.settings_repo import SettingsRepo
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_HEALTHY = "healthy"
+# Sends keep failing for transient reasons (network, 5xx); the chat stays scheduled.
+DELIVERY_DEGRADED = "degraded"
+# Telegram refuses the chat itself (kicked, no rights, chat gone); the scheduler skips it until
+# a my_chat_member update shows the bot is back.
+DELIVERY_UNREACHABLE = "unreachable"
+
+# Bad requests that describe the chat rather than the message.
+_UNREACHABLE_BAD_REQUEST_MARKERS = (
+    "chat not found",
+    "chat_write_forbidden",
+    "not enough rights",
+    "have no rights",
+    "need administrator rights",
+    "bot is not a member",
+    "group chat was upgraded",
+    "chat was deactivated",
+)
+
+
+def is_chat_unreachable_error(exc: Exception) -> bool:
+    """True if `exc` means the chat cannot receive messages at all (not just this one message)."""
+    if isinstance(exc, TelegramForbiddenError):
+        return True
+    if isinstance(exc, TelegramBadRequest):
+        text = (str(exc) or "").lower()
+        return any(marker in text for marker in _UNREACHABLE_BAD_REQUEST_MARKERS)
+    return False
+
+
+async def _set_state(chat_id: int, state: str, reason: str | None) -> None:
+    try:
+        async with async_session_maker() as session:
+            changed = await SettingsRepo(session).set_delivery_state(chat_id, state, reason)
+            await session.commit()
+    except Exception:
+        logger.exception("Failed to persist delivery state=%s for chat_id=%s.", state, chat_id)
+        return
+    if changed:
+        logger.info("Chat delivery state: chat_id=%s state=%s reason=%s", chat_id, state, reason)
+
+
+async def record_delivery_success(chat_id: int) -> None:
+    await _set_state(chat_id, DELIVERY_HEALTHY, None)
+
+
+async def record_delivery_successes(chat_ids: list[int]) -> None:
+    """Batch form of record_delivery_success used by the outbox flush: one UPDATE for all chats."""
+    if not chat_ids:
+        return
+    try:
+        async with async_session_maker() as session:
+            changed = await SettingsRepo(session).set_delivery_state_many(chat_ids, DELIVERY_HEALTHY)
+            await session.commit()
+    except Exception:
+        logger.exception("Failed to persist delivery state=%s for %s chats.", DELIVERY_HEALTHY, len(chat_ids))
+        return
+    for chat_id in changed:
+        logger.info("Chat delivery state: chat_id=%s state=%s reason=%s", chat_id, DELIVERY_HEALTHY, None)
+
+
+async def record_delivery_failure(chat_id: int, exc: Exception, error_text: str) -> None:
+    """Called once a send has finally failed (retries exhausted or a permanent error)."""
+    state = DELIVERY_UNREACHABLE if is_chat_unreachable_error(exc) else DELIVERY_DEGRADED
+    await _set_state(chat_id, state, error_text)
+
+
+async def mark_chat_reachable(chat_id: int, reason: str | None = None) -> None:
+    await _set_state(chat_id, DELIVERY_HEALTHY, reason)
+
+
+async def mark_chat_unreachable(chat_id: int, reason: str) -> None:
+    await _set_state(chat_id, DELIVERY_UNREACHABLE, reason)
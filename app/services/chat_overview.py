@@ -0,0 +1,26 @@
+from app.db.connection import async_read_session_maker, async_session_maker
+from app.db.repos.chat_overview_repo import ChatOverview, ChatOverviewRepo
+from app.db.repos.settings_repo import SettingsRepo
+
+
+async def read_chat_overview(chat_id: int) -> ChatOverview | None:
+    """
+    Settings, last upload and coverage for the private /status and upload screens in one read-pool query;
+    None if the chat has no settings row yet. Read-only, so it may run before the user's access is checked.
+    """
+    async with async_read_session_maker() as session:
+        return await ChatOverviewRepo(session).get(chat_id)
+
+
+async def load_chat_overview(chat_id: int, overview: ChatOverview | None = None) -> ChatOverview:
+    """
+    read_chat_overview (or its earlier result), except that a chat seen for the first time gets its
+    default settings row on the writer (it cannot have uploads yet). Call only once access is confirmed.
+    """
+    if overview is None:
+        overview = await read_chat_overview(chat_id)
+    if overview is not None:
+        return overview
+    async with async_session_maker() as session:
+        db_settings = await SettingsRepo(session).get_settings(chat_id)
+    return ChatOverview(settings=db_settings, last_upload=None, coverage_min=None, coverage_max=None)
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+
+from app.db.connection import async_session_maker
+from app.db.repos.settings_repo import SettingsRepo
+from app.services.tracing import create_untraced_task
+
+logger = logging.getLogger(__name__)
+
+# Last title seen per chat in this process: repeated messages of a chat do not touch the DB.
+_MAX_SEEN_TITLES = 10_000
+_seen_titles: dict[int, str] = {}
+_refresh_tasks: dict[int, asyncio.Task] = {}
+
+
+def chat_title_of(chat) -> str | None:
+    if chat is None:
+        return None
+    return getattr(chat, "title", None) or getattr(chat, "full_name", None) or None
+
+
+async def remember_chat_title(chat_id: int, title: str | None) -> None:
+    """Writes `title` to settings.chat_title when it differs from what this process last saw."""
+    if not title or _seen_titles.get(chat_id) == title:
+        return
+    async with async_session_maker() as session:
+        if await SettingsRepo(session).set_chat_title(chat_id, title):
+            await session.commit()
+    if len(_seen_titles) >= _MAX_SEEN_TITLES:
+        _seen_titles.clear()
+    _seen_titles[chat_id] = title
+
+
+async def _refresh_chat_title(bot: Bot, chat_id: int) -> None:
+    try:
+        chat = await bot.get_chat(chat_id)
+        await remember_chat_title(chat_id, chat_title_of(chat))
+    except Exception:
+        logger.debug("Could not refresh title of chat_id=%s", chat_id, exc_info=True)
+    finally:
+        _refresh_tasks.pop(chat_id, None)
+
+
+def refresh_missing_title(bot: Bot, chat_id: int) -> None:
+    """Fetches a missing title in the background (one request per chat at a time); the caller shows the ID now."""
+    if chat_id in _refresh_tasks:
+        return
+    _refresh_tasks[chat_id] = create_untraced_task(_refresh_chat_title(bot, chat_id), name=f"chat-title-{chat_id}")
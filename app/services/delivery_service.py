@@ -0,0 +1,399 @@
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from aiogram.exceptions import TelegramNetworkError
+
+from app.bot.circuit_breaker import telegram_breaker
+from app.config import settings as env_settings
+from app.db.connection import async_session_maker
+from app.db.models import Outbox
+from app.db.repos.outbox_repo import STATUS_ERROR, STATUS_OK, OutboxRepo
+from app.db.repos.sendlog_repo import STATUS_RESERVED, SendLogRepo, is_send_success
+from app.services.chat_health import record_delivery_failure, record_delivery_successes
+from app.services.sender import (
+    _format_send_error,
+    deliver_schedule,
+    is_inline_reserved,
+    is_permanent_send_error,
+    notify_coverage_gap,
+    presync_ical,
+)
+
+logger = logging.getLogger(__name__)
+
+# Claimed outbox rows waiting in memory, one FIFO lane per chat. A lane is drained by a single task,
+# so a chat's messages keep their queue order; different chats run in parallel up to DELIVERY_WORKERS.
+_lanes: dict[int, deque[Outbox]] = {}
+_lane_tasks: dict[int, asyncio.Task] = {}
+_dispatcher_task: asyncio.Task | None = None
+_slots: asyncio.Semaphore | None = None
+_inflight = 0
+_wakeup = asyncio.Event()
+
+# Finished deliveries are written to send_log/outbox in batches by the flusher task (a constant number of
+# transactions per OUTBOX_FLUSH_SECONDS instead of one per chat). Without the flusher they are written at once.
+# A lane with more items flushes before its next send, so a crash can only leave the last delivery of a chat
+# unwritten ("sending"/"reserved"; requeued and sent again on the next start), within OUTBOX_FLUSH_SECONDS.
+_FLUSH_MAX_BATCH = 500
+_completions: list["_Completion"] = []
+_flush_lock = asyncio.Lock()
+_flusher_task: asyncio.Task | None = None
+_flush_now = asyncio.Event()
+
+
+@dataclass
+class _Completion:
+    item: Outbox
+    sent_at: str | None = None
+    error: str | None = None
+    exc: Exception | None = None
+
+
+def notify_outbox() -> None:
+    """Wakes the dispatcher right away instead of at its next poll."""
+    _wakeup.set()
+
+
+async def enqueue_deliveries(
+    keys: list[tuple[int, date, str]],
+    available_at: dict[tuple[int, date, str], str] | None = None,
+) -> set[tuple[int, date, str]]:
+    """
+    Reserves all (chat_id, target_date, kind) keys in send_log and queues the won ones in the outbox,
+    in one transaction. `available_at` optionally delays individual keys (ISO time, server clock).
+    Returns the keys that were queued; the rest are already reserved/ok.
+    """
+    available_at = available_at or {}
+    rows = [(chat_id, target_date.isoformat(), kind) for chat_id, target_date, kind in keys]
+    if not rows:
+        return set()
+    async with async_session_maker() as session:
+        won = await SendLogRepo(session).try_reserve_many(rows)
+        if won:
+            # Keep the caller's order: outbox ids decide the order within a chat's lane.
+            await OutboxRepo(session).enqueue_many(
+                [
+                    (chat_id, target_date, kind, available_at.get((chat_id, date.fromisoformat(target_date), kind)))
+                    for chat_id, target_date, kind in dict.fromkeys(rows)
+                    if (chat_id, target_date, kind) in won
+                ]
+            )
+        await session.commit()
+    if won:
+        notify_outbox()
+    return {(chat_id, date.fromisoformat(target_date), kind) for chat_id, target_date, kind in won}
+
+
+async def enqueue_delivery(chat_id: int, target_date: date, kind: str) -> bool:
+    """
+    Reserves (chat_id, target_date, kind) in send_log and queues it in the outbox in one transaction.
+    Returns False if the send is already reserved/ok (same semantics as send_schedule).
+    """
+    return bool(await enqueue_deliveries([(chat_id, target_date, kind)]))
+
+
+async def flush_completions() -> int:
+    """Writes buffered delivery outcomes to send_log, outbox and chat health. Returns the number written."""
+    global _completions
+    # Serialized, so a caller that finds the buffer empty knows that earlier results are committed, not in flight.
+    async with _flush_lock:
+        if not _completions:
+            return 0
+        batch, _completions = _completions, []
+        try:
+            async with async_session_maker() as session:
+                sendlog_repo = SendLogRepo(session)
+                await sendlog_repo.mark_sent_many(
+                    [(c.item.chat_id, c.item.target_date, c.item.kind, c.sent_at) for c in batch if c.error is None]
+                )
+                await sendlog_repo.mark_error_many(
+                    [(c.item.chat_id, c.item.target_date, c.item.kind, c.error) for c in batch if c.error is not None]
+                )
+                await OutboxRepo(session).finish_many(
+                    [(c.item.id, STATUS_OK if c.error is None else STATUS_ERROR, c.error) for c in batch]
+                )
+                await session.commit()
+        except BaseException as exc:
+            # Unwritten outcomes go back to the buffer (also on cancellation, so stop_delivery_workers can flush them).
+            _completions[:0] = batch
+            if not isinstance(exc, Exception):
+                raise
+            logger.exception("Outbox: failed to flush %s delivery results.", len(batch))
+            return 0
+
+    # Chat health follows each chat's latest outcome in the batch.
+    latest: dict[int, _Completion] = {}
+    for completion in batch:
+        latest[completion.item.chat_id] = completion
+    await record_delivery_successes([chat_id for chat_id, c in latest.items() if c.error is None])
+    for chat_id, completion in latest.items():
+        if completion.error is not None:
+            await record_delivery_failure(chat_id, completion.exc, completion.error)
+    return len(batch)
+
+
+async def _complete(completion: _Completion) -> None:
+    _completions.append(completion)
+    if _flusher_task is None:
+        await flush_completions()
+    elif len(_completions) >= _FLUSH_MAX_BATCH:
+        _flush_now.set()
+
+
+async def _flush_loop(interval: float) -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_flush_now.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        _flush_now.clear()
+        await flush_completions()
+
+
+def _retry_delay_seconds(attempts: int) -> float:
+    base = max(0.0, float(env_settings.OUTBOX_RETRY_BASE_SECONDS))
+    cap = max(base, float(env_settings.OUTBOX_RETRY_MAX_SECONDS))
+    return min(cap, base * (2 ** max(0, attempts - 1)))
+
+
+async def _reservation_lost(item: Outbox) -> str | None:
+    """
+    The send_log status if the row's reservation is no longer this delivery's, else None. That happens when
+    a stale reservation was re-won and sent elsewhere (inline /send, catch-up) while the row waited.
+    """
+    if is_inline_reserved(item.chat_id, item.target_date, item.kind):
+        return STATUS_RESERVED
+    key = (item.chat_id, item.target_date, item.kind)
+    async with async_session_maker() as session:
+        status = (await SendLogRepo(session).get_statuses([key])).get(key)
+    return None if status == STATUS_RESERVED else (status or "missing")
+
+
+async def process_outbox_item(item: Outbox) -> bool:
+    """
+    Sends one claimed outbox row and records the outcome in outbox and send_log.
+    Transient failures are retried in place with exponential backoff (the lane waits, so later messages
+    of the same chat cannot overtake) until OUTBOX_MAX_ATTEMPTS. Returns True if the message was delivered.
+    A row whose send_log key was already sent (or is being sent) by someone else is finished without sending.
+    """
+    status = await _reservation_lost(item)
+    if status is not None:
+        logger.info(
+            "Outbox id=%s: send_log for chat_id=%s kind=%s date=%s is %s, not sending again.",
+            item.id,
+            item.chat_id,
+            item.kind,
+            item.target_date,
+            status,
+        )
+        finished = (STATUS_OK, None) if is_send_success(status) else (STATUS_ERROR, f"skipped: send_log {status}")
+        async with async_session_maker() as session:
+            await OutboxRepo(session).finish_many([(item.id, *finished)])
+            await session.commit()
+        return False
+
+    target_date = date.fromisoformat(item.target_date)
+    # Slots bound the work, not the waiting: a lane sleeping out a backoff does not block other chats.
+    async with _slots or contextlib.nullcontext():
+        await presync_ical(item.chat_id)
+
+    attempts = item.attempts
+    while True:
+        try:
+            async with _slots or contextlib.nullcontext():
+                items_count = await deliver_schedule(item.chat_id, target_date)
+            break
+        except Exception as exc:
+            if isinstance(exc, TelegramNetworkError) and telegram_breaker.is_open:
+                # Bot-wide outage, not this chat's fault: wait for the probe to succeed without using up attempts.
+                await telegram_breaker.wait_closed()
+                continue
+            error_text = _format_send_error(exc)
+            retry = not is_permanent_send_error(exc) and attempts < env_settings.OUTBOX_MAX_ATTEMPTS
+            logger.warning(
+                "Delivery failed chat_id=%s kind=%s date=%s attempt=%s retry=%s: %s",
+                item.chat_id,
+                item.kind,
+                item.target_date,
+                attempts,
+                retry,
+                error_text,
+            )
+            if not retry:
+                await _complete(_Completion(item, error=error_text, exc=exc))
+                return False
+            async with async_session_maker() as session:
+                await OutboxRepo(session).record_retry(item.id, error_text)
+                await session.commit()
+            await asyncio.sleep(_retry_delay_seconds(attempts))
+            attempts += 1
+
+    await _complete(_Completion(item, sent_at=datetime.now().isoformat()))
+
+    if not items_count:
+        await notify_coverage_gap(item.chat_id, item.target_date)
+    return True
+
+
+async def _recover_failed_item(item: Outbox, exc: Exception) -> None:
+    """
+    process_outbox_item failed outside its send retry loop (DB error, a bug): instead of leaving the row
+    "sending" until the next start, put it back in the queue with backoff, or give it up as "error" (send_log
+    too, so the next tick may reserve it again) once OUTBOX_MAX_ATTEMPTS is used up.
+    """
+    if any(completion.item.id == item.id for completion in _completions):
+        # The outcome is already recorded and waits for the flusher.
+        return
+    error_text = f"unexpected: {_format_send_error(exc)}"
+    async with async_session_maker() as session:
+        outbox_repo = OutboxRepo(session)
+        if item.attempts < env_settings.OUTBOX_MAX_ATTEMPTS:
+            retry_at = datetime.now() + timedelta(seconds=_retry_delay_seconds(item.attempts))
+            await outbox_repo.release(item.id, retry_at.isoformat(), error_text)
+        elif await outbox_repo.fail(item.id, error_text):
+            sendlog_repo = SendLogRepo(session)
+            key = (item.chat_id, item.target_date, item.kind)
+            if (await sendlog_repo.get_statuses([key])).get(key) == STATUS_RESERVED:
+                await sendlog_repo.mark_error_many([(*key, error_text)])
+        await session.commit()
+
+
+async def _run_lane(chat_id: int) -> None:
+    global _inflight
+    lane = _lanes[chat_id]
+    try:
+        while lane:
+            item = lane.popleft()
+            try:
+                await process_outbox_item(item)
+            except Exception as exc:
+                logger.exception("Delivery lane chat_id=%s: unexpected error on outbox id=%s.", chat_id, item.id)
+                try:
+                    await _recover_failed_item(item, exc)
+                except Exception:
+                    # The row stays "sending"; requeue_inflight() picks it up on the next start.
+                    logger.exception("Delivery lane chat_id=%s: could not release outbox id=%s.", chat_id, item.id)
+            finally:
+                _inflight -= 1
+                notify_outbox()
+            if lane:
+                # Write this chat's result before its next send (results of other lanes go in the same transaction).
+                await flush_completions()
+    finally:
+        # No await between the empty check above and here, so nothing can be appended to a dropped lane.
+        _lanes.pop(chat_id, None)
+        _lane_tasks.pop(chat_id, None)
+
+
+def _route(item: Outbox) -> None:
+    global _inflight
+    _inflight += 1
+    lane = _lanes.get(item.chat_id)
+    if lane is None:
+        lane = _lanes[item.chat_id] = deque()
+    lane.append(item)
+    if item.chat_id not in _lane_tasks:
+        _lane_tasks[item.chat_id] = asyncio.create_task(
+            _run_lane(item.chat_id), name=f"delivery-lane-{item.chat_id}"
+        )
+
+
+async def _claim_due(limit: int) -> list[Outbox]:
+    async with async_session_maker() as session:
+        items = await OutboxRepo(session).claim_due(limit)
+        await session.commit()
+        return items
+
+
+async def _dispatch_loop(concurrency: int) -> None:
+    poll_seconds = max(0.1, float(env_settings.OUTBOX_POLL_SECONDS))
+    while True:
+        # Clear before claiming: an enqueue or a finished item after an empty claim still wakes us.
+        _wakeup.clear()
+        # Zero while the Telegram breaker is open, ramping back up after it closes.
+        limit = telegram_breaker.concurrency_limit(concurrency)
+        if limit == 0:
+            await telegram_breaker.wait_closed()
+            continue
+        # Keep only a small backlog claimed in memory; the rest stays "pending" in the DB.
+        free = limit * 4 - _inflight
+        claimed: list[Outbox] = []
+        if free > 0:
+            try:
+                claimed = await _claim_due(free)
+            except Exception:
+                logger.exception("Delivery dispatcher: failed to claim outbox rows.")
+        for item in claimed:
+            _route(item)
+        if claimed and len(claimed) == free:
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_delivery_workers(count: int | None = None) -> None:
+    """Starts the outbox dispatcher; `count` (default DELIVERY_WORKERS) chats are delivered in parallel."""
+    global _dispatcher_task, _slots, _flusher_task
+    if _dispatcher_task is not None:
+        return
+    async with async_session_maker() as session:
+        requeued = await OutboxRepo(session).requeue_inflight()
+        await session.commit()
+    if requeued:
+        logger.info("Outbox: requeued %s deliveries interrupted by the previous shutdown.", requeued)
+
+    concurrency = max(1, count if count is not None else int(env_settings.DELIVERY_WORKERS))
+    _slots = asyncio.Semaphore(concurrency)
+    _flusher_task = asyncio.create_task(
+        _flush_loop(max(0.1, float(env_settings.OUTBOX_FLUSH_SECONDS))), name="delivery-flusher"
+    )
+    _dispatcher_task = asyncio.create_task(_dispatch_loop(concurrency), name="delivery-dispatcher")
+    logger.info("Started outbox dispatcher (parallel chats=%s).", concurrency)
+
+
+async def stop_delivery_workers(timeout: float = 0) -> None:
+    """
+    Stops claiming new rows and gives each lane up to `timeout` seconds to finish the send it is in, then
+    cancels what is left. Results are flushed, and claimed rows that did not finish go back to "pending"
+    so the next start delivers them at once (their send_log reservation stays with the outbox row).
+    """
+    global _dispatcher_task, _flusher_task, _inflight
+    dispatcher, _dispatcher_task = _dispatcher_task, None
+    if dispatcher is not None:
+        dispatcher.cancel()
+        await asyncio.gather(dispatcher, return_exceptions=True)
+
+    # Queued-but-unstarted items stay "sending" in the DB and are requeued below; lanes end after the current one.
+    for lane in _lanes.values():
+        lane.clear()
+    lane_tasks = list(_lane_tasks.values())
+    if lane_tasks and timeout > 0:
+        _, pending = await asyncio.wait(lane_tasks, timeout=timeout)
+        if pending:
+            logger.warning("Outbox: %s deliveries did not finish before the shutdown deadline.", len(pending))
+    for task in lane_tasks:
+        task.cancel()
+    await asyncio.gather(*lane_tasks, return_exceptions=True)
+    _lanes.clear()
+    _lane_tasks.clear()
+    _inflight = 0
+
+    # Lanes are gone, so no new results can arrive: stop the flusher and write what is left.
+    flusher, _flusher_task = _flusher_task, None
+    if flusher is not None:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+    await flush_completions()
+
+    if dispatcher is not None:
+        async with async_session_maker() as session:
+            requeued = await OutboxRepo(session).requeue_inflight()
+            await session.commit()
+        if requeued:
+            logger.info("Outbox: %s unfinished deliveries returned to the queue.", requeued)
@@ -4,13 +4,17 @@ from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from app.config import settings as env_settings
-from app.db.connection import async_session_maker
+from app.db.connection import async_read_session_maker, async_session_maker
 from app.db.models import ScheduleItem
+from app.db.repos.rendered_messages_repo import RenderedMessagesRepo
 from app.db.repos.schedule_repo import ScheduleRepo
 from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url
 from app.db.repos.uploads_repo import UploadsRepo
 from app.ical.fetcher import fetch_ical, IcalFetchError
 from app.ical.parser import parse_ical
+from app.services.prerender_service import refresh_rendered_days
+from app.services.response_cache import response_cache
+from app.services.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -18,84 +22,102 @@ _min_interval_seconds = max(0, int(env_settings.ICAL_SYNC_MIN_INTERVAL_SECONDS o
 _sync_days = max(1, int(env_settings.ICAL_SYNC_DAYS or 14))
 
 
-async def sync_ical_schedule(chat_id: int, force: bool = False) -> bool:
+async def sync_ical_schedule(chat_id: int, force: bool = False, max_age_seconds: int | None = None) -> bool:
+    """
+    Fetches the chat's iCal feed and replaces the synced window. Returns True if data was saved.
+    `max_age_seconds` skips the fetch while the last sync is younger than that (the send path's freshness bound).
+
+    Settings are read on the read pool and the feed is fetched and parsed outside any transaction;
+    only the final write (upload, upsert, pre-render, sync time) takes the SQLite write lock,
+    so senders and other writers never wait on a feed host.
+    """
     if not chat_id:
         return False
 
     now = datetime.now()
-    async with async_session_maker() as session:
-        settings_repo = SettingsRepo(session)
-        db_settings = await settings_repo.get_settings(chat_id)
-        ical_url = resolve_ical_url(db_settings)
-        if not ical_url:
-            return False
-        tz_name = db_settings.timezone if db_settings and db_settings.timezone else env_settings.TZ
-        try:
-            tzinfo = ZoneInfo(tz_name)
-        except Exception:
-            tzinfo = ZoneInfo("UTC")
-        today = datetime.now(tzinfo).date()
-        window_start = today
-        window_end = today + timedelta(days=_sync_days - 1)
-
-        last_sync_at = None
-        if db_settings and db_settings.last_ical_sync_at:
-            try:
-                last_sync_at = datetime.fromisoformat(db_settings.last_ical_sync_at)
-            except ValueError:
-                logger.warning(
-                    "Invalid last_ical_sync_at for chat_id=%s: %s",
-                    chat_id,
-                    db_settings.last_ical_sync_at,
-                )
-
-        if not force and last_sync_at:
-            delta = (now - last_sync_at).total_seconds()
-            if delta < _min_interval_seconds:
-                return False
+    async with async_read_session_maker() as session:
+        db_settings = await SettingsRepo(session).find_settings(chat_id)
+    ical_url = resolve_ical_url(db_settings)
+    if not ical_url:
+        return False
+    tz_name = db_settings.timezone if db_settings and db_settings.timezone else env_settings.TZ
+    try:
+        tzinfo = ZoneInfo(tz_name)
+    except Exception:
+        tzinfo = ZoneInfo("UTC")
+    today = datetime.now(tzinfo).date()
+    window_start = today
+    window_end = today + timedelta(days=_sync_days - 1)
 
+    last_sync_at = None
+    if db_settings and db_settings.last_ical_sync_at:
         try:
-            logger.info("iCal sync started for chat_id=%s url=%s", chat_id, ical_url)
-            ics_text = await asyncio.to_thread(fetch_ical, ical_url)
-            parsed = await asyncio.to_thread(parse_ical, ics_text, tz_name, window_start, window_end)
-        except IcalFetchError as exc:
-            logger.error("iCal fetch failed: %s", exc)
-            return False
-        except Exception:
-            logger.exception("iCal parse failed")
-            return False
-
-        if parsed.warnings:
+            last_sync_at = datetime.fromisoformat(db_settings.last_ical_sync_at)
+        except ValueError:
             logger.warning(
-                "iCal parse warnings (%s): %s",
-                len(parsed.warnings),
-                "; ".join(parsed.warnings),
+                "Invalid last_ical_sync_at for chat_id=%s: %s",
+                chat_id,
+                db_settings.last_ical_sync_at,
             )
-        if parsed.warnings and not parsed.items:
-            logger.error("iCal parse returned no events, aborting sync to keep existing data.")
+
+    if not force and last_sync_at:
+        delta = (now - last_sync_at).total_seconds()
+        if delta < _min_interval_seconds:
+            return False
+        if max_age_seconds is not None and delta < max_age_seconds:
             return False
 
-        date_from = window_start.isoformat()
-        date_to = window_end.isoformat()
-
-        items = [
-            ScheduleItem(
-                date=item.date,
-                start_time=item.start_time,
-                end_time=item.end_time,
-                subject=item.subject,
-                room=item.room,
-                teacher=item.teacher,
-                ical_uid=item.ical_uid,
-                ical_dtstart=item.ical_dtstart,
-            )
-            for item in parsed.items
-            if date_from <= item.date <= date_to
-        ]
+    try:
+        logger.info("iCal sync started for chat_id=%s url=%s", chat_id, ical_url)
+        with span("ical"):
+            ics_text = await asyncio.to_thread(fetch_ical, ical_url)
+            parsed = await asyncio.to_thread(parse_ical, ics_text, tz_name, window_start, window_end)
+    except IcalFetchError as exc:
+        logger.error("iCal fetch failed: %s", exc)
+        return False
+    except Exception:
+        logger.exception("iCal parse failed")
+        return False
 
-        uploaded_at = datetime.now().isoformat()
-        warnings_text = "\n".join(parsed.warnings) if parsed.warnings else None
+    if parsed.warnings:
+        logger.warning(
+            "iCal parse warnings (%s): %s",
+            len(parsed.warnings),
+            "; ".join(parsed.warnings),
+        )
+    if parsed.warnings and not parsed.items:
+        logger.error("iCal parse returned no events, aborting sync to keep existing data.")
+        return False
 
+    date_from = window_start.isoformat()
+    date_to = window_end.isoformat()
+
+    items = [
+        ScheduleItem(
+            date=item.date,
+            start_time=item.start_time,
+            end_time=item.end_time,
+            subject=item.subject,
+            room=item.room,
+            teacher=item.teacher,
+            ical_uid=item.ical_uid,
+            ical_dtstart=item.ical_dtstart,
+        )
+        for item in parsed.items
+        if date_from <= item.date <= date_to
+    ]
+
+    uploaded_at = datetime.now().isoformat()
+    warnings_text = "\n".join(parsed.warnings) if parsed.warnings else None
+
+    async with async_session_maker() as session:
+        # Creates the settings row of a chat that has none (it runs on env defaults) before its upload refers to it.
+        await SettingsRepo(session).upsert_settings(
+            chat_id,
+            last_ical_sync_at=now.isoformat(),
+            coverage_end_date=date_to,
+            updated_at=now.isoformat(),
+        )
         uploads_repo = UploadsRepo(session)
         schedule_repo = ScheduleRepo(session)
         upload_id = await uploads_repo.insert_upload(
@@ -109,17 +131,27 @@ async def sync_ical_schedule(chat_id: int, force: bool = False) -> bool:
             warnings=warnings_text,
         )
         await schedule_repo.upsert_ical_range(chat_id, date_from, date_to, items, upload_id)
-        if db_settings:
-            db_settings.last_ical_sync_at = now.isoformat()
-            db_settings.coverage_end_date = date_to
-            db_settings.updated_at = now.isoformat()
+        try:
+            rendered_days = await refresh_rendered_days(session, chat_id, date_from, date_to, tz_name)
+        except Exception:
+            # Drop the now-stale messages: senders render on the spot and the schedule itself is still saved.
+            logger.exception("Pre-rendering messages failed for chat_id=%s.", chat_id)
+            await RenderedMessagesRepo(session).delete_range(chat_id, date_from, date_to)
+            rendered_days = None
         await session.commit()
 
+    # After the commit, so a command rendered from now on reads the new data.
+    if rendered_days is None:
+        response_cache.invalidate(chat_id, [(window_start + timedelta(days=i)).isoformat() for i in range(_sync_days)])
+    else:
+        response_cache.invalidate(chat_id, rendered_days)
+
     logger.info(
-        "iCal sync completed for chat_id=%s (%s..%s, items=%s).",
+        "iCal sync completed for chat_id=%s (%s..%s, items=%s, changed days=%s).",
         chat_id,
         date_from,
         date_to,
         len(items),
+        len(rendered_days) if rendered_days is not None else "?",
     )
     return True
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import zlib
+from datetime import datetime, time, timedelta
+
+from app.config import settings as env_settings
+from app.db.models import Settings
+from app.db.repos.settings_repo import resolve_ical_url
+from app.services.date_service import get_local_now, parse_hhmm
+from app.services.ical_sync_service import sync_ical_schedule
+
+logger = logging.getLogger(__name__)
+
+# Feed hosts are slow and shared: a handful of fetches at a time is plenty when they are spread over the lead.
+_WARMUP_CONCURRENCY = 4
+_warmup_tasks: dict[int, asyncio.Task] = {}
+_warmup_slots: asyncio.Semaphore | None = None
+
+
+def _spread_offset(chat_id: int, lead: timedelta) -> timedelta:
+    """Stable per-chat offset into the lead interval, so chats with the same send time do not fetch together."""
+    # Keep the last minute free: the scheduler ticks once a minute and must still see the window open.
+    span = int(lead.total_seconds()) - 60
+    if span <= 0:
+        return timedelta(0)
+    return timedelta(seconds=zlib.crc32(str(chat_id).encode()) % span)
+
+
+def warmup_due(
+    chat_id: int,
+    send_times: list[time],
+    now_local: datetime,
+    last_sync_age: timedelta | None,
+    lead: timedelta,
+) -> bool:
+    """
+    True if `now_local` is inside this chat's warm-up window before one of `send_times`
+    and the feed has not been synced since that window opened.
+    """
+    if lead <= timedelta(0):
+        return False
+    offset = _spread_offset(chat_id, lead)
+    for send_time in send_times:
+        # A window may start the previous evening (e.g. 00:05 with a 10 minute lead).
+        for day_shift in (0, 1):
+            due = datetime.combine(now_local.date() + timedelta(days=day_shift), send_time, tzinfo=now_local.tzinfo)
+            warm_at = due - lead + offset
+            if warm_at <= now_local < due:
+                return last_sync_age is None or last_sync_age > now_local - warm_at
+    return False
+
+
+def _send_times(settings: Settings) -> list[time]:
+    try:
+        mode = int(settings.mode)
+    except (TypeError, ValueError):
+        return []
+    raw = []
+    if mode >= 1:
+        raw.append(settings.morning_time)
+    if mode == 2:
+        raw.append(settings.evening_time)
+    times = []
+    for value in raw:
+        if not value:
+            continue
+        try:
+            times.append(parse_hhmm(value))
+        except ValueError:
+            continue
+    return times
+
+
+def _last_sync_age(settings: Settings, now: datetime) -> timedelta | None:
+    if not settings.last_ical_sync_at:
+        return None
+    try:
+        return now - datetime.fromisoformat(settings.last_ical_sync_at)
+    except ValueError:
+        return None
+
+
+async def _warm_up(chat_id: int) -> None:
+    global _warmup_slots
+    if _warmup_slots is None:
+        _warmup_slots = asyncio.Semaphore(_WARMUP_CONCURRENCY)
+    try:
+        async with _warmup_slots:
+            await sync_ical_schedule(chat_id)
+    except Exception:
+        logger.exception("iCal warm-up failed for chat_id=%s; the send will use cached data.", chat_id)
+    finally:
+        _warmup_tasks.pop(chat_id, None)
+
+
+def schedule_ical_warmups(all_settings: list[Settings], now: datetime | None = None) -> int:
+    """
+    Starts background feed refreshes for chats whose send time is less than ICAL_WARMUP_LEAD_MINUTES away.
+    Does not wait for them, so the scheduler tick is never blocked on feed hosts. Returns the number started.
+    """
+    lead = timedelta(minutes=max(0, int(env_settings.ICAL_WARMUP_LEAD_MINUTES or 0)))
+    if lead <= timedelta(0):
+        return 0
+    now = now or datetime.now()
+    started = 0
+    for settings in all_settings:
+        chat_id = settings.chat_id
+        if not chat_id or chat_id in _warmup_tasks or not resolve_ical_url(settings):
+            continue
+        send_times = _send_times(settings)
+        if not send_times:
+            continue
+        now_local = get_local_now(settings.timezone or env_settings.TZ)
+        if not warmup_due(chat_id, send_times, now_local, _last_sync_age(settings, now), lead):
+            continue
+        _warmup_tasks[chat_id] = asyncio.create_task(_warm_up(chat_id), name=f"ical-warmup-{chat_id}")
+        started += 1
+    if started:
+        logger.info("iCal warm-up: refreshing %s feeds ahead of their send time.", started)
+    return started
+
+
+async def stop_ical_warmups(timeout: float = 0) -> None:
+    """Lets running feed refreshes finish their transaction within `timeout` seconds, then cancels them."""
+    tasks = list(_warmup_tasks.values())
+    if not tasks:
+        return
+    if timeout > 0:
+        await asyncio.wait(tasks, timeout=timeout)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _warmup_tasks.clear()
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings as env_settings
+from app.db.models import ScheduleItem
+from app.db.repos.rendered_messages_repo import RenderedMessagesRepo
+from app.db.repos.schedule_repo import ScheduleRepo
+from app.db.repos.settings_repo import SettingsRepo
+from app.services.message_builder import build_day_message, split_telegram
+
+logger = logging.getLogger(__name__)
+
+
+def render_day(target_date: date, items: list[ScheduleItem], tz: str) -> list[str]:
+    """The exact chunks a morning/evening send of `target_date` posts."""
+    return split_telegram(build_day_message(target_date, items, tz))
+
+
+def content_hash(chunks: list[str]) -> str:
+    return hashlib.sha256("\x00".join(chunks).encode("utf-8")).hexdigest()
+
+
+async def refresh_rendered_days(
+    session: AsyncSession, chat_id: int, date_from: str, date_to: str, tz: str
+) -> list[str]:
+    """
+    Re-renders every day of [date_from, date_to] from schedule_items (one range query) and stores the days
+    whose content hash changed. Runs inside the sync transaction, so stored messages never lag the schedule.
+    Returns the changed dates (also what response caches must drop).
+    """
+    items_by_date: dict[str, list[ScheduleItem]] = defaultdict(list)
+    for item in await ScheduleRepo(session).get_by_date_range(chat_id, date_from, date_to):
+        items_by_date[item.date].append(item)
+
+    rendered_repo = RenderedMessagesRepo(session)
+    stored = await rendered_repo.get_hashes(chat_id, date_from, date_to)
+
+    rows: list[tuple[str, str, str, int]] = []
+    day = date.fromisoformat(date_from)
+    end = date.fromisoformat(date_to)
+    while day <= end:
+        day_str = day.isoformat()
+        day_items = items_by_date.get(day_str, [])
+        chunks = render_day(day, day_items, tz)
+        digest = content_hash(chunks)
+        if stored.get(day_str) != digest:
+            rows.append((day_str, json.dumps(chunks, ensure_ascii=False), digest, len(day_items)))
+        day += timedelta(days=1)
+
+    await rendered_repo.upsert_many(chat_id, rows)
+    return [row[0] for row in rows]
+
+
+async def get_day_chunks(session: AsyncSession, chat_id: int, target_date: date) -> tuple[list[str], int]:
+    """
+    Returns (chunks, lessons count) for a day: the pre-rendered message if the sync stored one,
+    otherwise rendered on the spot (dates outside the sync window, chats without iCal).
+    """
+    target_date_str = target_date.isoformat()
+    rendered = await RenderedMessagesRepo(session).get(chat_id, target_date_str)
+    if rendered is not None:
+        return json.loads(rendered.chunks), rendered.items_count
+
+    settings = await SettingsRepo(session).get_settings(chat_id)
+    items = await ScheduleRepo(session).get_by_date(chat_id, target_date_str)
+    tz = settings.timezone if settings else env_settings.TZ
+    return render_day(target_date, items, tz), len(items)
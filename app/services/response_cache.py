@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Awaitable, Callable, Iterable
+
+from app.config import settings as env_settings
+
+CacheKey = tuple[int, str, str, str, str]  # (chat_id, command, tz, date_from, date_to)
+
+
+@dataclass(frozen=True)
+class ChatContext:
+    """What a group command needs from the chat's settings before it can render (or hit the cache)."""
+
+    tz: str
+    ical_url: str | None
+    last_ical_sync_at: str | None
+
+
+class ResponseCache:
+    """
+    LRU of rendered group-command answers (already split into Telegram chunks) and of each chat's ChatContext.
+    A sync drops exactly the entries whose date window contains a changed date, plus the chat's context;
+    a settings change drops the context. A per-chat version stops a read that hit the DB before either
+    from storing its (now stale) result afterwards.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, list[str]] = OrderedDict()
+        self._contexts: OrderedDict[int, ChatContext] = OrderedDict()
+        self._versions: dict[int, int] = {}
+
+    def version(self, chat_id: int) -> int:
+        return self._versions.get(chat_id, 0)
+
+    def get(self, key: CacheKey) -> list[str] | None:
+        chunks = self._entries.get(key)
+        if chunks is not None:
+            self._entries.move_to_end(key)
+        return chunks
+
+    def put(self, key: CacheKey, chunks: list[str], version: int) -> None:
+        if self.max_entries <= 0 or version != self.version(key[0]):
+            return
+        self._entries[key] = chunks
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_context(self, chat_id: int) -> ChatContext | None:
+        context = self._contexts.get(chat_id)
+        if context is not None:
+            self._contexts.move_to_end(chat_id)
+        return context
+
+    def put_context(self, chat_id: int, context: ChatContext, version: int) -> None:
+        if self.max_entries <= 0 or version != self.version(chat_id):
+            return
+        self._contexts[chat_id] = context
+        self._contexts.move_to_end(chat_id)
+        while len(self._contexts) > self.max_entries:
+            self._contexts.popitem(last=False)
+
+    def invalidate_context(self, chat_id: int) -> None:
+        """The chat's settings changed: its context is read again on the next command."""
+        self._versions[chat_id] = self.version(chat_id) + 1
+        self._contexts.pop(chat_id, None)
+
+    def invalidate(self, chat_id: int, dates: Iterable[str]) -> int:
+        """
+        After a sync: drops the chat's context (new sync time) and its entries whose window covers any of
+        `dates` (ISO strings). Returns the number of dropped entries.
+        """
+        self.invalidate_context(chat_id)
+        changed = sorted(dates)
+        if not changed:
+            return 0
+        stale = [
+            key
+            for key in self._entries
+            if key[0] == chat_id and any(key[3] <= day <= key[4] for day in changed)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._contexts.clear()
+
+
+response_cache = ResponseCache(max(0, int(env_settings.RESPONSE_CACHE_SIZE)))
+
+
+async def cached_render(
+    chat_id: int,
+    command: str,
+    tz: str,
+    date_from: date,
+    date_to: date,
+    render: Callable[[], Awaitable[list[str]]],
+) -> list[str]:
+    """Returns the cached answer for this window or renders it (DB read + formatting) and caches it."""
+    key = (chat_id, command, tz, date_from.isoformat(), date_to.isoformat())
+    chunks = response_cache.get(key)
+    if chunks is not None:
+        return chunks
+    version = response_cache.version(chat_id)
+    chunks = await render()
+    response_cache.put(key, chunks, version)
+    return chunks
+
+
+async def cached_chat_context(chat_id: int, load: Callable[[], Awaitable[ChatContext]]) -> ChatContext:
+    """Returns the chat's cached ChatContext or loads it (one settings read) and caches it."""
+    context = response_cache.get_context(chat_id)
+    if context is not None:
+        return context
+    version = response_cache.version(chat_id)
+    context = await load()
+    response_cache.put_context(chat_id, context, version)
+    return context
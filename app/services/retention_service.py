@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings as env_settings
+from app.db.connection import async_session_maker, compact_database, sqlite_storage_bytes
+from app.db.repos.fsm_states_repo import FsmStatesRepo
+from app.db.repos.outbox_repo import OutboxRepo
+from app.db.repos.rendered_messages_repo import RenderedMessagesRepo
+from app.db.repos.schedule_repo import ScheduleRepo
+from app.db.repos.sendlog_repo import SendLogRepo
+from app.db.repos.setup_tokens_repo import SetupTokenRepo
+from app.db.repos.uploads_repo import UploadsRepo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionReport:
+    deleted: dict[str, int] = field(default_factory=dict)
+    bytes_before: int | None = None
+    bytes_after: int | None = None
+
+    @property
+    def bytes_reclaimed(self) -> int | None:
+        if self.bytes_before is None or self.bytes_after is None:
+            return None
+        return max(0, self.bytes_before - self.bytes_after)
+
+
+async def _delete_in_batches(
+    delete_batch: Callable[[AsyncSession, int], Awaitable[int]],
+    batch_size: int,
+) -> int:
+    """
+    Runs delete_batch in separate short transactions until a batch comes back smaller than batch_size.
+    Each commit releases the SQLite write lock, so senders and syncs can interleave with the cleanup.
+    """
+    total = 0
+    while True:
+        async with async_session_maker() as session:
+            deleted = await delete_batch(session, batch_size)
+            await session.commit()
+        total += max(0, deleted or 0)
+        if not deleted or deleted < batch_size:
+            return total
+        await asyncio.sleep(0)
+
+
+async def run_retention(now: datetime | None = None) -> RetentionReport:
+    """
+    Prunes history tables according to RETENTION_* settings (0 days = keep forever), then compacts the DB.
+    """
+    now = now or datetime.now()
+    # setup_tokens timestamps are naive UTC; a naive `now` is taken as server local time.
+    utc_now = now.astimezone(timezone.utc).replace(tzinfo=None)
+    today: date = now.date()
+    batch_size = max(1, int(env_settings.RETENTION_BATCH_SIZE or 500))
+    report = RetentionReport(bytes_before=sqlite_storage_bytes())
+
+    # Order matters: schedule_items go first so their uploads become unreferenced.
+    schedule_days = int(env_settings.RETENTION_SCHEDULE_DAYS or 0)
+    if schedule_days > 0:
+        cutoff = (today - timedelta(days=schedule_days)).isoformat()
+        report.deleted["schedule_items"] = await _delete_in_batches(
+            lambda session, limit: ScheduleRepo(session).delete_before(cutoff, limit), batch_size
+        )
+        report.deleted["rendered_messages"] = await _delete_in_batches(
+            lambda session, limit: RenderedMessagesRepo(session).delete_before(cutoff, limit), batch_size
+        )
+
+    send_log_days = int(env_settings.RETENTION_SEND_LOG_DAYS or 0)
+    if send_log_days > 0:
+        cutoff = (today - timedelta(days=send_log_days)).isoformat()
+        report.deleted["send_log"] = await _delete_in_batches(
+            lambda session, limit: SendLogRepo(session).delete_older_than(cutoff, limit), batch_size
+        )
+        report.deleted["outbox"] = await _delete_in_batches(
+            lambda session, limit: OutboxRepo(session).delete_older_than(cutoff, limit), batch_size
+        )
+
+    uploads_days = int(env_settings.RETENTION_UPLOADS_DAYS or 0)
+    if uploads_days > 0:
+        cutoff = (now - timedelta(days=uploads_days)).isoformat()
+        report.deleted["uploads"] = await _delete_in_batches(
+            lambda session, limit: UploadsRepo(session).delete_older_than(cutoff, limit), batch_size
+        )
+
+    tokens_days = int(env_settings.RETENTION_SETUP_TOKENS_DAYS or 0)
+    if tokens_days > 0:
+        cutoff = (utc_now - timedelta(days=tokens_days)).isoformat()
+        report.deleted["setup_tokens"] = await _delete_in_batches(
+            lambda session, limit: SetupTokenRepo(session).delete_expired_before(cutoff, limit), batch_size
+        )
+
+    fsm_days = int(env_settings.FSM_TTL_DAYS or 0)
+    if fsm_days > 0:
+        cutoff = (now - timedelta(days=fsm_days)).isoformat()
+        report.deleted["fsm_states"] = await _delete_in_batches(
+            lambda session, limit: FsmStatesRepo(session).delete_older_than(cutoff, limit), batch_size
+        )
+
+    try:
+        await compact_database()
+    except Exception:
+        logger.exception("Retention: DB compaction failed.")
+    report.bytes_after = sqlite_storage_bytes()
+
+    logger.info(
+        "Retention done: deleted=%s size_before=%s size_after=%s reclaimed=%s bytes",
+        report.deleted,
+        report.bytes_before,
+        report.bytes_after,
+        report.bytes_reclaimed,
+    )
+    return report
@@ -1,17 +1,20 @@
 import logging
-from datetime import datetime
+import zlib
+from datetime import date, datetime, time, timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from app.bot.circuit_breaker import telegram_breaker
 from app.config import settings as env_settings
 from app.db.connection import async_session_maker
 from app.db.models import Settings
-from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url
+from app.db.repos.settings_repo import SettingsRepo
 from app.db.repos.sendlog_repo import SendLogRepo, is_send_success
+from app.services.chat_health import DELIVERY_UNREACHABLE
 from app.services.date_service import get_local_now, get_today, get_tomorrow, parse_hhmm
-from app.services.ical_sync_service import sync_ical_schedule
-from app.services.sender import send_schedule
+from app.services.delivery_service import enqueue_deliveries
+from app.services.ical_warmup_service import schedule_ical_warmups
 
 scheduler = AsyncIOScheduler()
 
@@ -31,42 +34,60 @@ def _job_id(prefix: str) -> str:
     return f"{prefix}"
 
 
-def _is_ical_stale(last_sync_at: str | None, min_interval_seconds: int) -> bool:
-    if min_interval_seconds <= 0:
-        return True
-    if not last_sync_at:
-        return True
-    try:
-        last_sync_dt = datetime.fromisoformat(last_sync_at)
-    except ValueError:
-        return True
-    delta = (datetime.now() - last_sync_dt).total_seconds()
-    return delta >= min_interval_seconds
-
-
-async def _update_last_sent(chat_id: int, **updates: str) -> None:
+async def _update_last_sent(updates: dict[int, dict[str, str]]) -> None:
     if not updates:
         return
     async with async_session_maker() as session:
         settings_repo = SettingsRepo(session)
-        await settings_repo.upsert_settings(chat_id, **updates)
+        for chat_id, values in updates.items():
+            await settings_repo.upsert_settings(chat_id, **values)
         await session.commit()
 
 
-async def _get_sendlog_status(chat_id: int, target_date: str, kind: str) -> str | None:
+async def _get_sendlog_statuses(keys: list[tuple[int, str, str]]) -> dict[tuple[int, str, str], str]:
     async with async_session_maker() as session:
-        sendlog_repo = SendLogRepo(session)
-        log = await sendlog_repo.get_log(chat_id, target_date, kind)
-        return log.status if log else None
+        return await SendLogRepo(session).get_statuses(keys)
+
+
+def _send_offset(chat_id: int) -> timedelta:
+    """Stable per-chat delay within SEND_SPREAD_SECONDS: same chat, same offset every day."""
+    window = max(0, int(env_settings.SEND_SPREAD_SECONDS or 0))
+    if window <= 0:
+        return timedelta(0)
+    return timedelta(seconds=zlib.crc32(str(chat_id).encode()) % window)
+
+
+def _available_at(chat_id: int, now_local: datetime, send_time: time) -> str | None:
+    """When the outbox may send: the chat's send time plus its offset, on the server clock (None = now)."""
+    offset = _send_offset(chat_id)
+    if not offset:
+        return None
+    due_local = datetime.combine(now_local.date(), send_time, tzinfo=now_local.tzinfo) + offset
+    # Past (late tick, restart) just means "send now".
+    return due_local.astimezone().replace(tzinfo=None).isoformat()
 
 
 async def _run_periodic_sender() -> None:
+    """
+    Minute tick: queues due morning/evening sends into the outbox (delivery_service workers send them)
+    and records last_sent_* once send_log reports success.
+    All chats are handled in bulk: one status read, one reservation transaction, one last_sent_* write.
+    """
+    if telegram_breaker.is_open:
+        # Telegram is unreachable: reserving sends and syncing iCal for them would only pile up error rows.
+        logging.debug("Scheduler: Telegram circuit breaker is open, skipping tick.")
+        return
+
+    # Unreachable chats (bot kicked / no rights) are filtered in SQL: no iCal fetches or API calls for them.
     async with async_session_maker() as session:
         settings_repo = SettingsRepo(session)
-        all_settings = await settings_repo.get_all_settings()
+        all_settings = await settings_repo.get_schedulable_settings(DELIVERY_UNREACHABLE)
 
-    min_interval_seconds = max(0, int(env_settings.ICAL_SYNC_MIN_INTERVAL_SECONDS or 0))
+    # Feeds are refreshed in the background ahead of the send time, so the send itself uses cached data.
+    schedule_ical_warmups(all_settings)
 
+    # (settings, kind, target_date, local today, available_at) for every send whose time has come.
+    passed: list[tuple[Settings, str, date, str, str | None]] = []
     for settings in all_settings:
         if not settings.chat_id:
             continue
@@ -83,62 +104,51 @@ async def _run_periodic_sender() -> None:
         today = get_today(tz)
         today_str = today.isoformat()
 
-        updates: dict[str, str] = {}
-
-        morning_due = False
-        if mode >= 1:
-            if settings.morning_time:
-                try:
-                    morning_time = parse_hhmm(settings.morning_time)
-                    if now_local.time() >= morning_time:
-                        morning_status = await _get_sendlog_status(settings.chat_id, today_str, "morning")
-                        morning_due = not is_send_success(morning_status)
-                        if is_send_success(morning_status) and settings.last_sent_morning_date != today_str:
-                            updates["last_sent_morning_date"] = today_str
-                except ValueError:
-                    logging.error("Invalid morning_time format: %s (chat_id=%s)", settings.morning_time, settings.chat_id)
-
-        evening_due = False
+        if mode >= 1 and settings.morning_time:
+            try:
+                morning_time = parse_hhmm(settings.morning_time)
+                if now_local.time() >= morning_time:
+                    available_at = _available_at(settings.chat_id, now_local, morning_time)
+                    passed.append((settings, "morning", today, today_str, available_at))
+            except ValueError:
+                logging.error("Invalid morning_time format: %s (chat_id=%s)", settings.morning_time, settings.chat_id)
+
         if mode == 2 and settings.evening_time:
             try:
                 evening_time = parse_hhmm(settings.evening_time)
                 if now_local.time() >= evening_time:
-                    tomorrow = get_tomorrow(tz)
-                    tomorrow_str = tomorrow.isoformat()
-                    evening_status = await _get_sendlog_status(settings.chat_id, tomorrow_str, "evening")
-                    evening_due = not is_send_success(evening_status)
-                    if is_send_success(evening_status) and settings.last_sent_evening_date != today_str:
-                        updates["last_sent_evening_date"] = today_str
+                    available_at = _available_at(settings.chat_id, now_local, evening_time)
+                    passed.append((settings, "evening", get_tomorrow(tz), today_str, available_at))
             except ValueError:
                 logging.error("Invalid evening_time format: %s (chat_id=%s)", settings.evening_time, settings.chat_id)
 
-        if not morning_due and not evening_due:
-            if updates:
-                await _update_last_sent(settings.chat_id, **updates)
-            continue
+    if not passed:
+        return
 
-        effective_ical_url = resolve_ical_url(settings)
-        if effective_ical_url and _is_ical_stale(settings.last_ical_sync_at, min_interval_seconds):
-            try:
-                await sync_ical_schedule(settings.chat_id)
-            except Exception:
-                logging.exception("iCal sync failed for chat_id=%s; proceeding with cached data.", settings.chat_id)
-
-        if morning_due:
-            await send_schedule(settings.chat_id, today, "morning")
-            morning_status = await _get_sendlog_status(settings.chat_id, today_str, "morning")
-            if is_send_success(morning_status):
-                updates["last_sent_morning_date"] = today_str
-
-        if evening_due:
-            tomorrow = get_tomorrow(tz)
-            tomorrow_str = tomorrow.isoformat()
-            await send_schedule(settings.chat_id, tomorrow, "evening")
-            evening_status = await _get_sendlog_status(settings.chat_id, tomorrow_str, "evening")
-            if is_send_success(evening_status):
-                updates["last_sent_evening_date"] = today_str
-
-        await _update_last_sent(settings.chat_id, **updates)
+    statuses = await _get_sendlog_statuses(
+        [(settings.chat_id, target_date.isoformat(), kind) for settings, kind, target_date, _, _ in passed]
+    )
+    due: list[tuple[int, date, str]] = []
+    delays: dict[tuple[int, date, str], str] = {}
+    updates: dict[int, dict[str, str]] = {}
+    for settings, kind, target_date, today_str, available_at in passed:
+        status = statuses.get((settings.chat_id, target_date.isoformat(), kind))
+        if not is_send_success(status):
+            key = (settings.chat_id, target_date, kind)
+            due.append(key)
+            if available_at:
+                delays[key] = available_at
+            continue
+        field = f"last_sent_{kind}_date"
+        if getattr(settings, field) != today_str:
+            updates.setdefault(settings.chat_id, {})[field] = today_str
+
+    # iCal refresh and the send itself happen in the delivery workers; last_sent_* is
+    # recorded by a later tick once send_log says "ok".
+    if due:
+        # With SEND_SPREAD_SECONDS the outbox holds each chat until its own offset, flattening the burst.
+        await enqueue_deliveries(due, delays)
+    await _update_last_sent(updates)
 
 
 def ensure_periodic_job() -> None:
@@ -4,13 +4,19 @@ from datetime import date, datetime
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 from app.config import settings as env_settings
-from app.db.connection import async_session_maker
+from app.db.connection import async_read_session_maker, async_session_maker
 from app.db.repos.settings_repo import SettingsRepo, resolve_ical_url
 from app.db.repos.schedule_repo import ScheduleRepo
 from app.db.repos.sendlog_repo import SendLogRepo
-from app.services.message_builder import build_day_message, split_telegram, ParseMode
+from app.services.message_builder import ParseMode
 from app.services.alerts_service import alert_admin
+from app.services.chat_health import record_delivery_failure, record_delivery_success
 from app.services.ical_sync_service import sync_ical_schedule
+from app.services.prerender_service import get_day_chunks
+
+
+# send_log keys reserved by an inline send_schedule that has not finished yet (see release_inline_reservations).
+_inline_reservations: set[tuple[int, str, str]] = set()
 
 
 def _format_send_error(exc: Exception) -> str:
@@ -21,9 +27,87 @@ def _format_send_error(exc: Exception) -> str:
         return f"bad_request: {detail}"
     return detail
 
+def is_permanent_send_error(exc: Exception) -> bool:
+    """Telegram rejected the request itself (kicked, no rights, bad chat): retrying cannot help."""
+    return isinstance(exc, (TelegramForbiddenError, TelegramBadRequest))
+
+
+async def presync_ical(chat_id: int) -> None:
+    """
+    Best-effort iCal refresh before sending, only when the cached data is older than ICAL_SEND_MAX_AGE_MINUTES:
+    the warm-up stage (app.services.ical_warmup_service) normally refreshed it shortly before the send time.
+    """
+    max_age_minutes = max(0, int(env_settings.ICAL_SEND_MAX_AGE_MINUTES or 0))
+    if max_age_minutes == 0:
+        return
+    try:
+        await sync_ical_schedule(chat_id, max_age_seconds=max_age_minutes * 60)
+    except Exception:
+        logging.exception("Pre-send iCal sync failed; continuing with cached data.")
+
+
+async def deliver_schedule(chat_id: int, target_date: date) -> int:
+    """
+    Sends the day to the chat, using the message pre-rendered at sync time when there is one.
+    Raises on Telegram errors. No send_log bookkeeping: callers own the reservation.
+    Returns the number of lessons in the message.
+    """
+    async with async_session_maker() as session:
+        chunks, items_count = await get_day_chunks(session, chat_id, target_date)
+
+    # Lazy import to avoid circular dependencies and because bot might not be init yet
+    from app.bot.dispatcher import bot
+
+    for chunk in chunks:
+        await bot.send_message(chat_id=chat_id, text=chunk, parse_mode=ParseMode.HTML)
+    return items_count
+
+
+async def notify_coverage_gap(chat_id: int, target_date_str: str) -> None:
+    """We sent "No Classes"; alert the admin if that is because the date is outside the synced data."""
+    async with async_read_session_maker() as session:
+        min_date, max_date = await ScheduleRepo(session).get_coverage_minmax(chat_id)
+
+    is_outside = False
+    if not min_date or not max_date:
+        is_outside = True
+    else:
+        if target_date_str < min_date or target_date_str > max_date:
+            is_outside = True
+
+    if is_outside:
+        await alert_admin(
+            f"User received 'No Classes' for {target_date_str}, but date is outside DB coverage "
+            f"({min_date}..{max_date}). Might be missing upload?"
+        )
+
+
+def is_inline_reserved(chat_id: int, target_date: str, kind: str) -> bool:
+    """True while an inline send_schedule of this process holds the send_log key."""
+    return (chat_id, target_date, kind) in _inline_reservations
+
+
+async def release_inline_reservations(reason: str = "interrupted: bot shutdown") -> int:
+    """
+    Marks reservations of inline sends that are still in progress as "error" (shutdown), so the next
+    start can send them again right away instead of waiting for the stale-reservation timeout.
+    """
+    if not _inline_reservations:
+        return 0
+    keys = list(_inline_reservations)
+    _inline_reservations.clear()
+    async with async_session_maker() as session:
+        await SendLogRepo(session).mark_error_many(
+            [(chat_id, target_date, kind, reason) for chat_id, target_date, kind in keys]
+        )
+        await session.commit()
+    return len(keys)
+
+
 async def send_schedule(chat_id: int, target_date: date, kind: str, notify_admin_on_data_gaps: bool = True) -> bool:
     """
-    Orchestrates sending a schedule for a specific date to a user.
+    Orchestrates sending a schedule for a specific date to a user, inline (manual /send, catch-up).
+    Scheduled sends go through the outbox instead (app.services.delivery_service).
     Returns True only if the message was successfully sent to Telegram and persisted as status="ok".
     Returns False if skipped (invalid chat_id / duplicate) or if sending failed (status="error").
     """
@@ -37,41 +121,25 @@ async def send_schedule(chat_id: int, target_date: date, kind: str, notify_admin
         ical_url = resolve_ical_url(settings)
 
     if ical_url:
-        try:
-            await sync_ical_schedule(chat_id)
-        except Exception:
-            logging.exception("Pre-send iCal sync failed; continuing with cached data.")
+        await presync_ical(chat_id)
 
+    target_date_str = target_date.strftime("%Y-%m-%d")
     async with async_session_maker() as session:
         # 2. Anti-duplicate mechanism
         sendlog_repo = SendLogRepo(session)
-        target_date_str = target_date.strftime("%Y-%m-%d")
 
         # try_reserve returns True if we successfully reserved the task
         if not await sendlog_repo.try_reserve(chat_id, target_date_str, kind):
             logging.info(f"Schedule for {chat_id} on {target_date_str} ({kind}) already reserved/ok/skipped.")
             return False
+        # Commit the reservation before talking to Telegram so the write lock is not held during the send.
+        await session.commit()
+        reservation = (chat_id, target_date_str, kind)
+        _inline_reservations.add(reservation)
 
         try:
-            settings_repo = SettingsRepo(session)
-            settings = await settings_repo.get_settings(chat_id)
-
-            # 3. Fetch schedule items
-            schedule_repo = ScheduleRepo(session)
-            items = await schedule_repo.get_by_date(chat_id, target_date_str)
-
-            # 4. Build message
-            tz = settings.timezone if settings else env_settings.TZ
-            message_text = build_day_message(target_date, items, tz)
-
-            # 5. Send to Telegram
-            chunks = split_telegram(message_text)
-
-            # Lazy import to avoid circular dependencies and because bot might not be init yet
-            from app.bot.dispatcher import bot
-
-            for chunk in chunks:
-                await bot.send_message(chat_id=chat_id, text=chunk, parse_mode=ParseMode.HTML)
+            # 3-5. Fetch items, build and send the message
+            items_count = await deliver_schedule(chat_id, target_date)
 
             # 6. Mark as successfully sent
             sent_at = datetime.now().isoformat()
@@ -88,24 +156,15 @@ async def send_schedule(chat_id: int, target_date: date, kind: str, notify_admin
             except Exception:
                 # If DB write failed, scheduler will see a stuck "reserved" task (or none) and retry later.
                 logging.exception("Failed to persist send_log error (chat_id=%s kind=%s date=%s).", chat_id, kind, target_date_str)
+            await record_delivery_failure(chat_id, exc, error_text)
             return False
+        finally:
+            _inline_reservations.discard(reservation)
+
+    await record_delivery_success(chat_id)
+
+    # 7. Check regarding data coverage gaps
+    if not items_count and notify_admin_on_data_gaps:
+        await notify_coverage_gap(chat_id, target_date_str)
 
-        # 7. Check regarding data coverage gaps
-        if not items and notify_admin_on_data_gaps:
-            # We sent "No Classes", check if it's because of missing data (outside coverage)
-            min_date, max_date = await schedule_repo.get_coverage_minmax(chat_id)
-
-            is_outside = False
-            if not min_date or not max_date:
-                is_outside = True
-            else:
-                if target_date_str < min_date or target_date_str > max_date:
-                    is_outside = True
-
-            if is_outside:
-                await alert_admin(
-                    f"User received 'No Classes' for {target_date_str}, but date is outside DB coverage "
-                    f"({min_date}..{max_date}). Might be missing upload?"
-                )
-
-        return True
+    return True
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+
+from app.config import settings as env_settings
+from app.db.connection import dispose_engines
+from app.services.delivery_service import stop_delivery_workers
+from app.services.ical_warmup_service import stop_ical_warmups
+from app.services.scheduler_service import scheduler
+from app.services.sender import release_inline_reservations
+
+logger = logging.getLogger(__name__)
+
+
+async def graceful_shutdown(bot: Bot, timeout: float | None = None) -> None:
+    """
+    Shutdown coordinator, run after polling has stopped (SIGTERM/SIGINT):
+    1. no new scheduler ticks;
+    2. in-flight deliveries and iCal syncs get what is left of SHUTDOWN_TIMEOUT_SECONDS to finish;
+    3. unfinished outbox rows go back to the queue and inline send reservations are marked "error",
+       so the next start sends them at once instead of after the 15 minute stale-reservation timeout;
+    4. the Telegram HTTP session and the DB engines are closed.
+    Every step runs even if an earlier one fails.
+    """
+    if timeout is None:
+        timeout = max(0.0, float(env_settings.SHUTDOWN_TIMEOUT_SECONDS))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    def remaining() -> float:
+        return max(0.0, deadline - loop.time())
+
+    logger.info("Shutting down (deadline %.0fs)...", timeout)
+    if scheduler.running:
+        try:
+            scheduler.shutdown(wait=False)
+        except Exception:
+            logger.exception("Shutdown: failed to stop the scheduler.")
+
+    try:
+        await stop_delivery_workers(timeout=remaining())
+    except Exception:
+        logger.exception("Shutdown: failed to drain delivery workers.")
+
+    try:
+        await stop_ical_warmups(timeout=remaining())
+    except Exception:
+        logger.exception("Shutdown: failed to stop iCal warm-ups.")
+
+    try:
+        released = await release_inline_reservations()
+        if released:
+            logger.info("Shutdown: released %s interrupted send reservations.", released)
+    except Exception:
+        logger.exception("Shutdown: failed to release send reservations.")
+
+    try:
+        await bot.session.close()
+    except Exception:
+        logger.exception("Shutdown: failed to close the Telegram session.")
+
+    try:
+        await dispose_engines()
+    except Exception:
+        logger.exception("Shutdown: failed to close DB engines.")
+    logger.info("Shutdown complete.")
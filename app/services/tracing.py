@@ -0,0 +1,153 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Coroutine, Iterator
+
+from app.config import settings as env_settings
+
+logger = logging.getLogger(__name__)
+
+# Time components of an update. They can overlap (e.g. a DB read gathered with a Telegram call),
+# so they are "time spent in", not a partition of the total.
+SPAN_KINDS = ("db", "telegram", "ical")
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class UpdateTrace:
+    handler: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: dict[str, float] = field(default_factory=lambda: dict.fromkeys(SPAN_KINDS, 0.0))
+
+    def add(self, kind: str, seconds: float) -> None:
+        self.spans[kind] = self.spans.get(kind, 0.0) + seconds
+
+
+_current_trace: ContextVar[UpdateTrace | None] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> UpdateTrace | None:
+    return _current_trace.get()
+
+
+def add_span_time(kind: str, seconds: float) -> None:
+    """
+    Adds `seconds` to the update being handled in this context. Tasks created by the update inherit its trace,
+    so background work that outlives the update must be started with create_untraced_task.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(kind, seconds)
+
+
+def create_untraced_task(coro: Coroutine[Any, Any, Any], *, name: str | None = None) -> asyncio.Task:
+    """asyncio.create_task whose task keeps the caller's context except the update trace."""
+    context = contextvars.copy_context()
+    context.run(_current_trace.set, None)
+    return asyncio.create_task(coro, name=name, context=context)
+
+
+@contextmanager
+def span(kind: str) -> Iterator[None]:
+    if _current_trace.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span_time(kind, time.perf_counter() - started)
+
+
+def _percentile(sorted_values: list[float], pct: int) -> float:
+    # Nearest rank: p99 of 50 samples is the slowest one, never an interpolated value nobody saw.
+    index = max(0, -(-len(sorted_values) * pct // 100) - 1)
+    return sorted_values[index]
+
+
+class LatencyStats:
+    """Last `sample_size` traces per handler; percentiles are computed on demand from them."""
+
+    def __init__(self, sample_size: int):
+        self.sample_size = max(1, sample_size)
+        self._samples: dict[str, deque[tuple[float, ...]]] = {}
+        self._counts: dict[str, int] = {}
+
+    def record(self, trace: UpdateTrace, total: float) -> None:
+        samples = self._samples.get(trace.handler)
+        if samples is None:
+            samples = self._samples[trace.handler] = deque(maxlen=self.sample_size)
+        samples.append((total, *(trace.spans.get(kind, 0.0) for kind in SPAN_KINDS)))
+        self._counts[trace.handler] = self._counts.get(trace.handler, 0) + 1
+
+    def snapshot(self) -> dict[str, dict]:
+        """{handler: {"count": n, "total_ms": {"p50": ..}, "db_ms": {..}, ...}} over the kept samples."""
+        result = {}
+        for handler, samples in sorted(self._samples.items()):
+            entry: dict = {"count": self._counts[handler]}
+            for position, name in enumerate(("total", *SPAN_KINDS)):
+                values = sorted(sample[position] for sample in samples)
+                entry[f"{name}_ms"] = {f"p{pct}": round(_percentile(values, pct) * 1000, 1) for pct in PERCENTILES}
+            result[handler] = entry
+        return result
+
+    def clear(self) -> None:
+        self._samples.clear()
+        self._counts.clear()
+
+
+latency_stats = LatencyStats(int(env_settings.TRACE_SAMPLE_SIZE))
+
+
+def start_trace(handler: str) -> object:
+    """Starts tracing the current update; returns the token for finish_trace."""
+    return _current_trace.set(UpdateTrace(handler))
+
+
+def set_trace_handler(handler: str) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.handler = handler
+
+
+def finish_trace(token: object) -> UpdateTrace | None:
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return None
+    total = time.perf_counter() - trace.started
+    latency_stats.record(trace, total)
+    total_ms = total * 1000
+    level = logging.INFO if total_ms >= env_settings.TRACE_SLOW_MS else logging.DEBUG
+    if logger.isEnabledFor(level):
+        logger.log(
+            level,
+            "%s %s: total=%.0fms db=%.0fms telegram=%.0fms ical=%.0fms",
+            "Slow update" if level == logging.INFO else "Update",
+            trace.handler,
+            total_ms,
+            trace.spans["db"] * 1000,
+            trace.spans["telegram"] * 1000,
+            trace.spans["ical"] * 1000,
+        )
+    return trace
+
+
+async def log_latency_report() -> None:
+    """Logs per-handler p50/p90/p99 (total) and p90 of each component; scheduled every TRACE_REPORT_MINUTES."""
+    snapshot = latency_stats.snapshot()
+    if not snapshot:
+        return
+    lines = []
+    for handler, entry in snapshot.items():
+        total = entry["total_ms"]
+        lines.append(
+            f"{handler}: n={entry['count']} total p50={total['p50']} p90={total['p90']} p99={total['p99']}ms; "
+            f"p90 db={entry['db_ms']['p90']} telegram={entry['telegram_ms']['p90']} ical={entry['ical_ms']['p90']}ms"
+        )
+    logger.info("Update latency (last %s per handler):\n%s", latency_stats.sample_size, "\n".join(lines))
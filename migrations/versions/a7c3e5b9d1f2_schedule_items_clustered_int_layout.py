@@ -0,0 +1,109 @@
+"""Schedule items: clustered WITHOUT ROWID table with integer dates/times.
+
+Revision ID: a7c3e5b9d1f2
+Revises: e1f4a2b9c0d3
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a7c3e5b9d1f2"
+down_revision = "e1f4a2b9c0d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    op.create_table(
+        "schedule_items_new",
+        sa.Column("chat_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.Integer(), nullable=False),
+        sa.Column("ical_uid", sa.Text(), nullable=False),
+        sa.Column("ical_dtstart", sa.Integer(), nullable=False),
+        sa.Column("end_time", sa.Integer(), nullable=False),
+        sa.Column("room", sa.Text(), nullable=True),
+        sa.Column("subject", sa.Text(), nullable=True),
+        sa.Column("teacher", sa.Text(), nullable=True),
+        sa.Column("source_upload_id", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "date", "start_time", "ical_uid", "ical_dtstart"),
+        sa.UniqueConstraint("chat_id", "ical_uid", "ical_dtstart", name="uq_schedule_ical_key"),
+        sa.ForeignKeyConstraint(["chat_id"], ["settings.chat_id"], name="fk_schedule_items_chat_id_settings"),
+        sa.ForeignKeyConstraint(["source_upload_id"], ["uploads.id"]),
+        sqlite_with_rowid=False,
+    )
+
+    # Dates -> days since 1970-01-01, HH:MM -> minutes, ical_dtstart -> unix seconds.
+    # Legacy rows without iCal keys get a unique 'legacy:<id>' key (the columns are now part of the PK).
+    # Rows whose date/time cannot be parsed are dropped (OR IGNORE); the next iCal sync restores them.
+    conn.execute(
+        sa.text(
+            "INSERT OR IGNORE INTO schedule_items_new ("
+            "chat_id, date, start_time, ical_uid, ical_dtstart, end_time, room, subject, teacher, source_upload_id"
+            ") "
+            "SELECT chat_id, "
+            "CAST(julianday(date) - 2440587.5 AS INTEGER), "
+            "CAST(strftime('%H', '2000-01-01 ' || start_time) AS INTEGER) * 60 "
+            "+ CAST(strftime('%M', '2000-01-01 ' || start_time) AS INTEGER), "
+            "CASE WHEN ical_uid IS NULL OR ical_dtstart IS NULL THEN 'legacy:' || id ELSE ical_uid END, "
+            "CASE WHEN ical_uid IS NULL OR ical_dtstart IS NULL THEN 0 "
+            "ELSE COALESCE(CAST(strftime('%s', ical_dtstart) AS INTEGER), 0) END, "
+            "CAST(strftime('%H', '2000-01-01 ' || end_time) AS INTEGER) * 60 "
+            "+ CAST(strftime('%M', '2000-01-01 ' || end_time) AS INTEGER), "
+            "room, subject, teacher, source_upload_id "
+            "FROM schedule_items"
+        )
+    )
+
+    # Dropping the old table also drops idx_schedule_date, idx_schedule_date_start and idx_schedule_ical_key:
+    # the clustered PK serves date scans and the unique key serves iCal upserts.
+    op.drop_table("schedule_items")
+    op.rename_table("schedule_items_new", "schedule_items")
+
+
+def downgrade():
+    conn = op.get_bind()
+    op.create_table(
+        "schedule_items_old",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Text(), nullable=False),
+        sa.Column("start_time", sa.Text(), nullable=False),
+        sa.Column("end_time", sa.Text(), nullable=False),
+        sa.Column("room", sa.Text(), nullable=True),
+        sa.Column("subject", sa.Text(), nullable=True),
+        sa.Column("teacher", sa.Text(), nullable=True),
+        sa.Column("source_upload_id", sa.Integer(), nullable=True),
+        sa.Column("ical_uid", sa.Text(), nullable=True),
+        sa.Column("ical_dtstart", sa.Text(), nullable=True),
+        sa.Column("chat_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("chat_id", "ical_uid", "ical_dtstart", name="uq_schedule_ical_key"),
+        sa.ForeignKeyConstraint(["chat_id"], ["settings.chat_id"], name="fk_schedule_items_chat_id_settings"),
+        sa.ForeignKeyConstraint(["source_upload_id"], ["uploads.id"]),
+    )
+    # ical_dtstart only kept the instant, so it comes back in UTC ("+00:00"), not in the feed's original offset.
+    conn.execute(
+        sa.text(
+            "INSERT INTO schedule_items_old ("
+            "date, start_time, end_time, room, subject, teacher, source_upload_id, ical_uid, ical_dtstart, chat_id"
+            ") "
+            "SELECT date(date * 86400, 'unixepoch'), "
+            "printf('%02d:%02d', start_time / 60, start_time % 60), "
+            "printf('%02d:%02d', end_time / 60, end_time % 60), "
+            "room, subject, teacher, source_upload_id, "
+            "CASE WHEN ical_uid = '' OR ical_uid LIKE 'legacy:%' THEN NULL ELSE ical_uid END, "
+            "CASE WHEN ical_uid = '' OR ical_uid LIKE 'legacy:%' OR ical_dtstart = 0 THEN NULL "
+            "ELSE strftime('%Y-%m-%dT%H:%M:%S+00:00', ical_dtstart, 'unixepoch') END, "
+            "chat_id "
+            "FROM schedule_items"
+        )
+    )
+    op.drop_table("schedule_items")
+    op.rename_table("schedule_items_old", "schedule_items")
+    op.create_index("idx_schedule_date", "schedule_items", ["chat_id", "date"])
+    op.create_index("idx_schedule_date_start", "schedule_items", ["chat_id", "date", "start_time"])
+    op.create_index("idx_schedule_ical_key", "schedule_items", ["chat_id", "ical_uid", "ical_dtstart"])
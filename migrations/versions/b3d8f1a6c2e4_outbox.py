@@ -0,0 +1,55 @@
+"""Add outbox table for queued scheduled deliveries.
+
+Revision ID: b3d8f1a6c2e4
+Revises: a7c3e5b9d1f2
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _table_exists(conn, name: str) -> bool:
+    inspector = sa.inspect(conn)
+    return name in inspector.get_table_names()
+
+
+def _index_exists(conn, table: str, name: str) -> bool:
+    inspector = sa.inspect(conn)
+    return any(idx["name"] == name for idx in inspector.get_indexes(table))
+
+
+# revision identifiers, used by Alembic.
+revision = "b3d8f1a6c2e4"
+down_revision = "a7c3e5b9d1f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, "outbox"):
+        op.create_table(
+            "outbox",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("chat_id", sa.Integer(), nullable=False),
+            sa.Column("target_date", sa.Text(), nullable=False),
+            sa.Column("kind", sa.Text(), nullable=False),
+            sa.Column("status", sa.Text(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("available_at", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.Text(), nullable=False),
+            sa.Column("updated_at", sa.Text(), nullable=False),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.UniqueConstraint("chat_id", "target_date", "kind", name="uq_outbox"),
+        )
+    if _table_exists(conn, "outbox") and not _index_exists(conn, "outbox", "idx_outbox_status_available"):
+        op.create_index("idx_outbox_status_available", "outbox", ["status", "available_at"])
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, "outbox") and _index_exists(conn, "outbox", "idx_outbox_status_available"):
+        op.drop_index("idx_outbox_status_available", table_name="outbox")
+    if _table_exists(conn, "outbox"):
+        op.drop_table("outbox")
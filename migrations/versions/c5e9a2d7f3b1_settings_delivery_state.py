@@ -0,0 +1,41 @@
+"""Settings: per-chat delivery health state.
+
+Revision ID: c5e9a2d7f3b1
+Revises: b3d8f1a6c2e4
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _column_exists(conn, table: str, name: str) -> bool:
+    inspector = sa.inspect(conn)
+    return any(col["name"] == name for col in inspector.get_columns(table))
+
+
+# revision identifiers, used by Alembic.
+revision = "c5e9a2d7f3b1"
+down_revision = "b3d8f1a6c2e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _column_exists(conn, "settings", "delivery_state"):
+        op.add_column(
+            "settings",
+            sa.Column("delivery_state", sa.Text(), nullable=False, server_default=sa.text("'healthy'")),
+        )
+    if not _column_exists(conn, "settings", "delivery_state_reason"):
+        op.add_column("settings", sa.Column("delivery_state_reason", sa.Text(), nullable=True))
+    if not _column_exists(conn, "settings", "delivery_state_at"):
+        op.add_column("settings", sa.Column("delivery_state_at", sa.Text(), nullable=True))
+
+
+def downgrade():
+    conn = op.get_bind()
+    for name in ("delivery_state_at", "delivery_state_reason", "delivery_state"):
+        if _column_exists(conn, "settings", name):
+            op.drop_column("settings", name)
@@ -0,0 +1,43 @@
+"""Add rendered_messages table for day messages pre-rendered at sync time.
+
+Revision ID: d2f6b8c4e1a9
+Revises: c5e9a2d7f3b1
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _table_exists(conn, name: str) -> bool:
+    inspector = sa.inspect(conn)
+    return name in inspector.get_table_names()
+
+
+# revision identifiers, used by Alembic.
+revision = "d2f6b8c4e1a9"
+down_revision = "c5e9a2d7f3b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, "rendered_messages"):
+        op.create_table(
+            "rendered_messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("chat_id", sa.Integer(), nullable=False),
+            sa.Column("target_date", sa.Text(), nullable=False),
+            sa.Column("chunks", sa.Text(), nullable=False),
+            sa.Column("content_hash", sa.Text(), nullable=False),
+            sa.Column("items_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("rendered_at", sa.Text(), nullable=False),
+            sa.UniqueConstraint("chat_id", "target_date", name="uq_rendered_messages"),
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, "rendered_messages"):
+        op.drop_table("rendered_messages")
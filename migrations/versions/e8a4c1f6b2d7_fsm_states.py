@@ -0,0 +1,46 @@
+"""Add fsm_states table for the persistent FSM storage.
+
+Revision ID: e8a4c1f6b2d7
+Revises: d2f6b8c4e1a9
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _table_exists(conn, name: str) -> bool:
+    inspector = sa.inspect(conn)
+    return name in inspector.get_table_names()
+
+
+def _index_exists(conn, table: str, name: str) -> bool:
+    inspector = sa.inspect(conn)
+    return any(idx["name"] == name for idx in inspector.get_indexes(table))
+
+
+# revision identifiers, used by Alembic.
+revision = "e8a4c1f6b2d7"
+down_revision = "d2f6b8c4e1a9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, "fsm_states"):
+        op.create_table(
+            "fsm_states",
+            sa.Column("key", sa.Text(), primary_key=True),
+            sa.Column("state", sa.Text(), nullable=True),
+            sa.Column("data", sa.Text(), nullable=False, server_default="{}"),
+            sa.Column("updated_at", sa.Text(), nullable=False),
+        )
+    if not _index_exists(conn, "fsm_states", "idx_fsm_states_updated_at"):
+        op.create_index("idx_fsm_states_updated_at", "fsm_states", ["updated_at"])
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, "fsm_states"):
+        op.drop_table("fsm_states")
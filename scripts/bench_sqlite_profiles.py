@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Compares SQLITE_PROFILE values on the bot's own workload:
+
+- sync:  one iCal sync per chat (upload row + upsert of ICAL_SYNC_DAYS days), one transaction each;
+- send:  try_reserve + mark_sent per chat, one commit each (like the minute sender tick);
+- read:  concurrent week reads per chat (like /week in many groups).
+
+Usage: python scripts/bench_sqlite_profiles.py [--chats 200] [--rounds 3] [--profiles durable,balanced,throughput]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.config import SQLITE_PROFILE_NAMES, settings  # noqa: E402
+from app.db.models import Base, ScheduleItem, Settings  # noqa: E402
+from app.db.repos.schedule_repo import ScheduleRepo  # noqa: E402
+from app.db.repos.sendlog_repo import SendLogRepo  # noqa: E402
+from app.db.repos.uploads_repo import UploadsRepo  # noqa: E402
+
+DAYS = 14
+LESSONS_PER_DAY = 5
+START = date(2026, 1, 12)
+
+
+def _items(chat_id: int, round_no: int) -> list[ScheduleItem]:
+    items = []
+    for day in range(DAYS):
+        day_date = (START + timedelta(days=day)).isoformat()
+        for lesson in range(LESSONS_PER_DAY):
+            hour = 8 + lesson * 2
+            items.append(
+                ScheduleItem(
+                    date=day_date,
+                    start_time=f"{hour:02d}:00",
+                    end_time=f"{hour + 1:02d}:30",
+                    subject=f"Subject {lesson} r{round_no}",
+                    room=str(100 + lesson),
+                    teacher="Teacher",
+                    ical_uid=f"{chat_id}-{day}-{lesson}",
+                    ical_dtstart=f"{day_date}T{hour:02d}:00:00+00:00",
+                )
+            )
+    return items
+
+
+async def _bench_profile(profile: str, chats: int, rounds: int, workdir: Path) -> dict[str, float]:
+    db_file = workdir / f"bench_{profile}.db"
+    settings.DB_PATH = f"sqlite+aiosqlite:///{db_file.as_posix()}"
+    settings.SQLITE_PROFILE = profile
+    engine = create_async_engine(settings.DB_PATH)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    results: dict[str, float] = {}
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as session:
+            for chat_id in range(1, chats + 1):
+                session.add(Settings(chat_id=chat_id, mode=1, timezone="UTC", updated_at="2026-01-01T00:00:00"))
+            await session.commit()
+
+        date_from = START.isoformat()
+        date_to = (START + timedelta(days=DAYS - 1)).isoformat()
+
+        started = time.perf_counter()
+        for round_no in range(rounds):
+            for chat_id in range(1, chats + 1):
+                async with session_maker() as session:
+                    upload_id = await UploadsRepo(session).insert_upload(
+                        chat_id=chat_id,
+                        filename="ical",
+                        uploaded_at="2026-01-01T00:00:00",
+                        date_from=date_from,
+                        date_to=date_to,
+                    )
+                    await ScheduleRepo(session).upsert_ical_range(
+                        chat_id, date_from, date_to, _items(chat_id, round_no), upload_id
+                    )
+                    await session.commit()
+        results["sync/s"] = chats * rounds / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for round_no in range(rounds):
+            target_date = (START + timedelta(days=round_no)).isoformat()
+            for chat_id in range(1, chats + 1):
+                async with session_maker() as session:
+                    repo = SendLogRepo(session)
+                    await repo.try_reserve(chat_id, target_date, "morning")
+                    await session.commit()
+                    await repo.mark_sent(chat_id, target_date, "morning", "2026-01-01T07:00:01")
+                    await session.commit()
+        results["send/s"] = chats * rounds / (time.perf_counter() - started)
+
+        async def read_week(chat_id: int) -> None:
+            async with session_maker() as session:
+                await ScheduleRepo(session).get_by_date_range(chat_id, date_from, date_to)
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await asyncio.gather(*(read_week(chat_id) for chat_id in range(1, chats + 1)))
+        results["read/s"] = chats * rounds / (time.perf_counter() - started)
+    finally:
+        await engine.dispose()
+    return results
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--profiles", default=",".join(SQLITE_PROFILE_NAMES))
+    parser.add_argument("--dir", default=None, help="directory for the temporary databases (default: system tmp)")
+    args = parser.parse_args()
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in SQLITE_PROFILE_NAMES]
+    if unknown:
+        print(f"ERROR: unknown profiles: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        print(f"chats={args.chats} rounds={args.rounds} dir={workdir}")
+        print(f"{'profile':<12}{'sync/s':>10}{'send/s':>10}{'read/s':>10}")
+        for profile in profiles:
+            results = await _bench_profile(profile, args.chats, args.rounds, Path(workdir))
+            print(f"{profile:<12}{results['sync/s']:>10.1f}{results['send/s']:>10.1f}{results['read/s']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -43,3 +43,23 @@ async def session(engine):
     async with async_session() as session:
         yield session
         await session.rollback()
+
+
+@pytest.fixture
+def session_maker_modules():
+    """Modules whose session makers the `session_maker` fixture replaces; override it in a test module."""
+    return ()
+
+
+@pytest.fixture
+def session_maker(engine, monkeypatch, session_maker_modules):
+    """
+    Session maker over the in-memory test engine, patched in as `async_session_maker` (and
+    `async_read_session_maker`, if imported) of every module in `session_maker_modules`.
+    """
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    for module in session_maker_modules:
+        for name in ("async_session_maker", "async_read_session_maker"):
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, maker)
+    return maker
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+from app.config import settings as env_settings
+
+
+def test_alembic_migration_schedule_items_clustered_int_layout(monkeypatch, tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    db_file = tmp_path / "migrations_schedule.db"
+
+    db_url = f"sqlite+aiosqlite:///{db_file.resolve().as_posix()}"
+    monkeypatch.setattr(env_settings, "DB_PATH", db_url, raising=False)
+
+    cfg = Config(str(repo_root / "alembic.ini"))
+
+    # TEXT dates/times with three secondary indexes.
+    command.upgrade(cfg, "e1f4a2b9c0d3")
+
+    con = sqlite3.connect(db_file)
+    try:
+        con.execute(
+            "INSERT INTO settings (chat_id, mode, timezone, updated_at) VALUES (7, 0, 'UTC', '2026-01-01T00:00:00')"
+        )
+        con.execute(
+            """
+            INSERT INTO schedule_items (chat_id, date, start_time, end_time, subject, ical_uid, ical_dtstart)
+            VALUES (7, '2025-01-01', '10:00', '11:30', 'iCal', 'uid-1', '2025-01-01T10:00:00+03:00')
+            """
+        )
+        # Two legacy rows in the same slot must both survive (they get distinct synthetic keys).
+        for subject in ("Legacy A", "Legacy B"):
+            con.execute(
+                """
+                INSERT INTO schedule_items (chat_id, date, start_time, end_time, subject, ical_uid, ical_dtstart)
+                VALUES (7, '2025-01-02', '08:30', '10:05', ?, NULL, NULL)
+                """,
+                (subject,),
+            )
+        con.commit()
+    finally:
+        con.close()
+
+    command.upgrade(cfg, "head")
+
+    con = sqlite3.connect(db_file)
+    try:
+        table_sql = con.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='schedule_items'"
+        ).fetchone()[0]
+        assert "WITHOUT ROWID" in table_sql.upper()
+
+        index_names = {
+            row[0]
+            for row in con.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='schedule_items' AND sql IS NOT NULL"
+            )
+        }
+        assert index_names == set()
+
+        rows = con.execute(
+            "SELECT date, start_time, end_time, ical_uid, ical_dtstart, subject FROM schedule_items ORDER BY date, subject"
+        ).fetchall()
+        assert rows[0] == (20089, 600, 690, "uid-1", 1735714800, "iCal")
+        assert [r[:3] for r in rows[1:]] == [(20090, 510, 605), (20090, 510, 605)]
+        assert all(r[3].startswith("legacy:") and r[4] == 0 for r in rows[1:])
+
+        plan = con.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM schedule_items "
+            "WHERE chat_id = 7 AND date >= 20089 AND date <= 20095 ORDER BY date, start_time"
+        ).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+        assert "PRIMARY KEY" in plan_text
+        assert "TEMP B-TREE" not in plan_text
+    finally:
+        con.close()
+
+    command.downgrade(cfg, "e1f4a2b9c0d3")
+
+    con = sqlite3.connect(db_file)
+    try:
+        rows = con.execute(
+            "SELECT date, start_time, end_time, ical_uid, ical_dtstart FROM schedule_items ORDER BY date, subject"
+        ).fetchall()
+        assert rows[0] == ("2025-01-01", "10:00", "11:30", "uid-1", "2025-01-01T07:00:00+00:00")
+        assert rows[1] == ("2025-01-02", "08:30", "10:05", None, None)
+    finally:
+        con.close()
@@ -24,6 +24,7 @@ class DummySettingsRepo:
 
     def __init__(self, session):
         self.ensure_settings = AsyncMock(return_value=SimpleNamespace())
+        self.set_chat_title = AsyncMock(return_value=True)
         DummySettingsRepo.last_instance = self
 
 
@@ -51,11 +52,18 @@ async def test_setup_answers_in_group(monkeypatch):
     monkeypatch.setattr(group_setup, "SettingsRepo", DummySettingsRepo)
     monkeypatch.setattr(group_setup, "SetupTokenRepo", DummySetupTokenRepo)
     monkeypatch.setattr(group_setup, "apply_schedule", lambda _settings: None)
-    monkeypatch.setattr(group_setup, "_build_settings_keyboard", AsyncMock(return_value=None))
-    monkeypatch.setattr(group_setup, "_try_send_private_settings", AsyncMock(return_value=True))
+    build_keyboard = AsyncMock(return_value=None)
+    try_send = AsyncMock(return_value=True)
+    monkeypatch.setattr(group_setup, "_build_settings_keyboard", build_keyboard)
+    monkeypatch.setattr(group_setup, "_try_send_private_settings", try_send)
 
     await group_setup.setup_group(message)
 
+    # The deep-link keyboard is built once and shared with the private message.
+    build_keyboard.assert_awaited_once()
+    try_send.assert_awaited_once_with(message, "token123", None)
+
+    DummySettingsRepo.last_instance.set_chat_title.assert_awaited_once_with(group_id, "Test Group")
     message.answer.assert_awaited_once()
     response_text = message.answer.call_args.args[0]
     assert "Ссылка настроек отправлена" in response_text
@@ -91,9 +99,10 @@ async def test_setup_group_fallback_text(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_settings_keyboard_text(monkeypatch):
-    bot = SimpleNamespace(get_me=AsyncMock(return_value=SimpleNamespace(username="bot")))
+    bot = SimpleNamespace(me=AsyncMock(return_value=SimpleNamespace(username="bot")))
     message = SimpleNamespace(bot=bot)
 
     keyboard = await group_setup._build_settings_keyboard(message, "token123")
 
     assert keyboard.inline_keyboard[0][0].text == "Открыть настройки в личке"
+    assert keyboard.inline_keyboard[0][0].url == "https://t.me/bot?start=setup_token123"
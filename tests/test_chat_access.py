@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
+from aiogram.methods import GetChatMember
+
+from app.bot import chat_access
+from app.bot.chat_access import ChatMemberCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeBot:
+    def __init__(self, statuses: dict[tuple[int, int], object]):
+        self.statuses = statuses
+        self.calls: list[tuple[int, int]] = []
+
+    async def get_chat_member(self, chat_id: int, user_id: int):
+        self.calls.append((chat_id, user_id))
+        status = self.statuses[(chat_id, user_id)]
+        if isinstance(status, Exception):
+            raise status
+        return SimpleNamespace(status=status)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    clock = FakeClock()
+    cache = ChatMemberCache(max_entries=2, ttl=300, negative_ttl=30, clock=clock)
+    monkeypatch.setattr(chat_access, "chat_member_cache", cache)
+    return cache, clock
+
+
+@pytest.mark.asyncio
+async def test_one_lookup_serves_member_and_admin_checks_until_ttl(cache):
+    cache, clock = cache
+    bot = FakeBot({(-1, 10): "administrator"})
+    assert await chat_access.is_user_chat_member(bot, -1, 10)
+    assert await chat_access.is_user_chat_admin(bot, -1, 10)
+    assert await chat_access.is_user_chat_member(bot, -1, 10)
+    assert bot.calls == [(-1, 10)]
+
+    clock.now += 301
+    assert await chat_access.is_user_chat_member(bot, -1, 10)
+    assert len(bot.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_negative_answers_expire_sooner_and_network_errors_are_not_cached(cache):
+    cache, clock = cache
+    not_found = TelegramBadRequest(method=GetChatMember(chat_id=-1, user_id=20), message="user not found")
+    network = TelegramNetworkError(method=GetChatMember(chat_id=-1, user_id=30), message="timeout")
+    bot = FakeBot({(-1, 20): not_found, (-1, 30): network, (-1, 40): "left"})
+
+    for user_id in (20, 30, 40):
+        assert not await chat_access.is_user_chat_member(bot, -1, user_id)
+        assert not await chat_access.is_user_chat_member(bot, -1, user_id)
+    assert bot.calls == [(-1, 20), (-1, 30), (-1, 30), (-1, 40)]
+
+    clock.now += 31
+    assert not await chat_access.is_user_chat_member(bot, -1, 40)
+    assert bot.calls[-1] == (-1, 40) and len(bot.calls) == 5
+
+
+@pytest.mark.asyncio
+async def test_updates_replace_and_drop_entries(cache):
+    cache, clock = cache
+    bot = FakeBot({(-1, 10): "member", (-2, 10): "member"})
+    assert await chat_access.is_user_chat_member(bot, -1, 10)
+    # A chat_member update (user left) is taken as is, without another lookup.
+    cache.put(-1, 10, SimpleNamespace(status="left"))
+    assert not await chat_access.is_user_chat_member(bot, -1, 10)
+    assert bot.calls == [(-1, 10)]
+
+    assert await chat_access.is_user_chat_member(bot, -2, 10)
+    cache.forget(-2)
+    assert await chat_access.is_user_chat_member(bot, -2, 10)
+    assert bot.calls == [(-1, 10), (-2, 10), (-2, 10)]
+
+
+@pytest.mark.asyncio
+async def test_active_chat_loads_data_while_membership_is_checked(cache, monkeypatch):
+    import asyncio
+
+    from app.bot.handlers import common
+
+    started: list[str] = []
+    both_started = asyncio.Event()
+
+    async def slow(name: str, result):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return result
+
+    async def is_member(bot, chat_id, user_id):
+        return await slow("membership", True)
+
+    async def load(chat_id: int):
+        return await slow("overview", {"chat_id": chat_id})
+
+    async def get_data():
+        return {"active_chat_id": -1}
+
+    monkeypatch.setattr(common, "is_user_chat_member", is_member)
+    message = SimpleNamespace(from_user=SimpleNamespace(id=10), bot=None)
+    state = SimpleNamespace(get_data=get_data)
+
+    assert await common.get_active_chat(state, message, load) == (-1, {"chat_id": -1})
+    assert sorted(started) == ["membership", "overview"]
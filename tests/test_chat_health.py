@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy import delete
+
+from app.bot.handlers import group_setup
+from app.db.models import Settings
+from app.db.repos.settings_repo import SettingsRepo
+from app.services import chat_health
+
+CHAT_ID = -100717171
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (chat_health,)
+
+
+@pytest_asyncio.fixture
+async def session_maker(session_maker):
+    async with session_maker() as session:
+        await session.execute(delete(Settings).where(Settings.chat_id == CHAT_ID))
+        session.add(Settings(chat_id=CHAT_ID, mode=1, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+        await session.commit()
+    return session_maker
+
+
+async def _schedulable_ids(maker) -> set[int]:
+    async with maker() as session:
+        rows = await SettingsRepo(session).get_schedulable_settings(chat_health.DELIVERY_UNREACHABLE)
+        return {row.chat_id for row in rows}
+
+
+async def _state(maker) -> tuple[str, str | None]:
+    async with maker() as session:
+        row = await session.get(Settings, CHAT_ID)
+        await session.refresh(row)
+        return row.delivery_state, row.delivery_state_reason
+
+
+def _member(status: str, **extra) -> SimpleNamespace:
+    return SimpleNamespace(status=status, **extra)
+
+
+@pytest.mark.asyncio
+async def test_kicked_chat_is_skipped_until_bot_is_back(session_maker):
+    method = SendMessage(chat_id=CHAT_ID, text="x")
+    exc = TelegramForbiddenError(method=method, message="Forbidden: bot was kicked from the group chat")
+
+    await chat_health.record_delivery_failure(CHAT_ID, exc, "forbidden: kicked")
+    assert await _state(session_maker) == ("unreachable", "forbidden: kicked")
+    assert CHAT_ID not in await _schedulable_ids(session_maker)
+
+    event = SimpleNamespace(
+        chat=SimpleNamespace(id=CHAT_ID),
+        old_chat_member=_member("kicked"),
+        new_chat_member=_member("member"),
+        bot=SimpleNamespace(send_message=_noop),
+    )
+    await group_setup.on_bot_added(event)
+    assert (await _state(session_maker))[0] == "healthy"
+    assert CHAT_ID in await _schedulable_ids(session_maker)
+
+    event.old_chat_member, event.new_chat_member = _member("member"), _member("left")
+    await group_setup.on_bot_added(event)
+    assert (await _state(session_maker))[0] == "unreachable"
+
+
+@pytest.mark.asyncio
+async def test_message_level_errors_only_degrade(session_maker):
+    method = SendMessage(chat_id=CHAT_ID, text="x")
+
+    too_long = TelegramBadRequest(method=method, message="Bad Request: message is too long")
+    await chat_health.record_delivery_failure(CHAT_ID, too_long, "bad_request: message is too long")
+    assert (await _state(session_maker))[0] == "degraded"
+    assert CHAT_ID in await _schedulable_ids(session_maker)
+
+    no_rights = TelegramBadRequest(method=method, message="Bad Request: not enough rights to send text messages to the chat")
+    assert chat_health.is_chat_unreachable_error(no_rights)
+
+    await chat_health.record_delivery_success(CHAT_ID)
+    assert await _state(session_maker) == ("healthy", None)
+
+
+async def _noop(*args, **kwargs):
+    return None
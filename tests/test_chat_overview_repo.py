@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+
+from app.db.models import ScheduleItem, Settings, Upload
+from app.db.repos.chat_overview_repo import ChatOverviewRepo
+from app.services import chat_overview
+
+CHAT_ID = 737373
+
+
+def _lesson(day: str) -> ScheduleItem:
+    return ScheduleItem(
+        chat_id=CHAT_ID,
+        date=day,
+        start_time="08:30",
+        end_time="10:05",
+        subject="Math",
+        room=None,
+        teacher=None,
+        ical_uid=f"overview-{day}",
+    )
+
+
+@pytest.mark.asyncio
+async def test_overview_reads_settings_last_upload_and_coverage_in_one_query(session, engine):
+    repo = ChatOverviewRepo(session)
+    assert await repo.get(CHAT_ID) is None
+
+    session.add(Settings(chat_id=CHAT_ID, mode=2, timezone="UTC", chat_title="Group", updated_at="2025-01-01T00:00:00"))
+    await session.flush()
+    overview = await repo.get(CHAT_ID)
+    assert overview.settings.chat_title == "Group"
+    assert overview.last_upload is None
+    assert (overview.coverage_min, overview.coverage_max) == (None, None)
+
+    session.add_all([_lesson("2025-03-05"), _lesson("2025-03-03"), _lesson("2025-04-01")])
+    session.add(Upload(chat_id=CHAT_ID, uploaded_at="2025-03-01T08:00:00", rows_count=1))
+    session.add(Upload(chat_id=CHAT_ID, uploaded_at="2025-03-02T08:00:00", rows_count=3))
+    await session.flush()
+
+    statements: list[str] = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        overview = await repo.get(CHAT_ID)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert overview.settings.mode == 2
+    assert overview.last_upload.rows_count == 3
+    assert (overview.coverage_min, overview.coverage_max) == ("2025-03-03", "2025-04-01")
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (chat_overview,)
+
+
+@pytest.mark.asyncio
+async def test_overview_is_read_only_until_access_is_confirmed(session_maker):
+    chat_id = CHAT_ID + 1
+
+    # Runs alongside the membership check, so a refused user must not leave a settings row behind.
+    assert await chat_overview.read_chat_overview(chat_id) is None
+    async with session_maker() as session:
+        assert await session.get(Settings, chat_id) is None
+
+    overview = await chat_overview.load_chat_overview(chat_id, None)
+    assert overview.settings.chat_id == chat_id
+    assert overview.last_upload is None
+    async with session_maker() as session:
+        assert await session.get(Settings, chat_id) is not None
+        await session.delete(await session.get(Settings, chat_id))
+        await session.commit()
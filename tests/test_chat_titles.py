@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.bot.middlewares import ChatTitleMiddleware
+from app.db.models import Settings
+from app.db.repos.settings_repo import SettingsRepo
+from app.services import chat_titles
+
+CHAT_ID = -7001
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (chat_titles,)
+
+
+@pytest_asyncio.fixture
+async def session_maker(session_maker, monkeypatch):
+    monkeypatch.setattr(chat_titles, "_seen_titles", {})
+    async with session_maker() as session:
+        await SettingsRepo(session).get_settings(CHAT_ID)
+        await session.commit()
+    return session_maker
+
+
+async def _stored_title(session_maker) -> str | None:
+    async with session_maker() as session:
+        result = await session.execute(select(Settings.chat_title).where(Settings.chat_id == CHAT_ID))
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_group_updates_store_the_title_once(session_maker, monkeypatch):
+    writes: list[tuple[int, str]] = []
+    original = SettingsRepo.set_chat_title
+
+    async def counting_set_chat_title(self, chat_id, title):
+        writes.append((chat_id, title))
+        return await original(self, chat_id, title)
+
+    monkeypatch.setattr(SettingsRepo, "set_chat_title", counting_set_chat_title)
+    middleware = ChatTitleMiddleware()
+
+    async def handler(event, data):
+        return "handled"
+
+    def update(title: str, chat_type: str = "supergroup"):
+        chat = SimpleNamespace(id=CHAT_ID, type=chat_type, title=title)
+        return SimpleNamespace(event=SimpleNamespace(chat=chat))
+
+    assert await middleware(handler, update("Group A"), {}) == "handled"
+    await middleware(handler, update("Group A"), {})
+    await middleware(handler, update("Private", chat_type="private"), {})
+    assert await _stored_title(session_maker) == "Group A"
+    assert writes == [(CHAT_ID, "Group A")]
+
+    # A renamed group (new_chat_title message or chat_member update) is picked up on the next update.
+    await middleware(handler, update("Group B"), {})
+    assert await _stored_title(session_maker) == "Group B"
+
+
+@pytest.mark.asyncio
+async def test_missing_title_is_fetched_once_in_background(session_maker):
+    release = asyncio.Event()
+    calls: list[int] = []
+
+    async def get_chat(chat_id: int):
+        calls.append(chat_id)
+        await release.wait()
+        return SimpleNamespace(title="Fetched")
+
+    bot = SimpleNamespace(get_chat=get_chat)
+    chat_titles.refresh_missing_title(bot, CHAT_ID)
+    chat_titles.refresh_missing_title(bot, CHAT_ID)
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*chat_titles._refresh_tasks.values())
+
+    assert calls == [CHAT_ID]
+    assert await _stored_title(session_maker) == "Fetched"
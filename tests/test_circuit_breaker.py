@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
+from aiogram.methods import GetMe, SendMessage
+
+from app.bot.circuit_breaker import TelegramCircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeBot:
+    """Routes get_me through the breaker like a real aiogram session would."""
+
+    def __init__(self, breaker: TelegramCircuitBreaker):
+        self.breaker = breaker
+        self.network_up = False
+        self.probes = 0
+
+    async def make_request(self, bot, method):
+        if isinstance(method, GetMe):
+            self.probes += 1
+        if not self.network_up:
+            raise TelegramNetworkError(method=method, message="Cannot connect to host")
+        return True
+
+    async def get_me(self):
+        return await self.breaker(self.make_request, self, GetMe())
+
+
+@pytest.mark.asyncio
+async def test_breaker_trips_fails_fast_and_recovers_via_probe():
+    clock = FakeClock()
+    breaker = TelegramCircuitBreaker(
+        failure_threshold=3, backoff_seconds=0.1, backoff_max_seconds=0.1, ramp_seconds=60, clock=clock
+    )
+    bot = FakeBot(breaker)
+    send = SendMessage(chat_id=-100, text="x")
+
+    for _ in range(3):
+        with pytest.raises(TelegramNetworkError):
+            await breaker(bot.make_request, bot, send)
+    assert breaker.is_open
+    assert breaker.concurrency_limit(8) == 0
+
+    # While open, sends never reach the network.
+    calls = 0
+
+    async def counting_request(b, method):
+        nonlocal calls
+        calls += 1
+        return True
+
+    with pytest.raises(TelegramNetworkError):
+        await breaker(counting_request, bot, send)
+    assert calls == 0
+
+    await asyncio.sleep(0.25)
+    assert breaker.is_open
+    assert bot.probes >= 1
+
+    bot.network_up = True
+    await asyncio.wait_for(breaker.wait_closed(), timeout=1)
+    assert not breaker.is_open
+
+    # Delivery ramps back up instead of releasing the whole backlog at once.
+    assert breaker.concurrency_limit(8) == 1
+    clock.now += 30
+    assert breaker.concurrency_limit(8) == 4
+    clock.now += 30
+    assert breaker.concurrency_limit(8) == 8
+
+
+@pytest.mark.asyncio
+async def test_api_errors_reset_the_failure_count():
+    breaker = TelegramCircuitBreaker(failure_threshold=2, backoff_seconds=1, backoff_max_seconds=1, ramp_seconds=0)
+    send = SendMessage(chat_id=-100, text="x")
+
+    async def network_error(bot, method):
+        raise TelegramNetworkError(method=method, message="timeout")
+
+    async def bad_request(bot, method):
+        raise TelegramBadRequest(method=method, message="Bad Request: message is too long")
+
+    with pytest.raises(TelegramNetworkError):
+        await breaker(network_error, None, send)
+    # Telegram answered, so the network is fine even though the request failed.
+    with pytest.raises(TelegramBadRequest):
+        await breaker(bad_request, None, send)
+    with pytest.raises(TelegramNetworkError):
+        await breaker(network_error, None, send)
+    assert not breaker.is_open
@@ -0,0 +1,282 @@
+import asyncio
+from datetime import date
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage
+from sqlalchemy import delete, select
+
+from app.config import settings as env_settings
+from app.db.models import Outbox, SendLog
+from app.db.repos.outbox_repo import OutboxRepo
+from app.db.repos.sendlog_repo import SendLogRepo
+from app.services import delivery_service
+
+CHAT_ID = 616161
+TARGET = date(2025, 3, 3)
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (delivery_service,)
+
+
+@pytest.fixture
+def session_maker(session_maker, monkeypatch):
+    monkeypatch.setattr(delivery_service, "presync_ical", _noop)
+    monkeypatch.setattr(delivery_service, "notify_coverage_gap", _noop)
+    monkeypatch.setattr(env_settings, "OUTBOX_RETRY_BASE_SECONDS", 0, raising=False)
+    monkeypatch.setattr(env_settings, "OUTBOX_MAX_ATTEMPTS", 3, raising=False)
+    return session_maker
+
+
+async def _noop(*args, **kwargs) -> None:
+    return None
+
+
+async def _cleanup(maker) -> None:
+    async with maker() as session:
+        await session.execute(delete(Outbox).where(Outbox.chat_id == CHAT_ID))
+        await session.execute(delete(SendLog).where(SendLog.chat_id == CHAT_ID))
+        await session.commit()
+
+
+async def _state(maker) -> tuple[str, str, int]:
+    async with maker() as session:
+        outbox = (await session.execute(select(Outbox).where(Outbox.chat_id == CHAT_ID))).scalar_one()
+        log = (await session.execute(select(SendLog).where(SendLog.chat_id == CHAT_ID))).scalar_one()
+        return outbox.status, log.status, outbox.attempts
+
+
+async def _claim(maker) -> Outbox:
+    async with maker() as session:
+        (item,) = await OutboxRepo(session).claim_due(1)
+        await session.commit()
+        return item
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_in_place(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+    calls: list[int] = []
+
+    async def flaky_deliver(chat_id, target_date):
+        calls.append(chat_id)
+        if len(calls) == 1:
+            raise TelegramNetworkError(method=SendMessage(chat_id=chat_id, text="x"), message="timeout")
+        return ["item"]
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", flaky_deliver)
+
+    assert await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "morning") is True
+    assert await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "morning") is False
+
+    # Retried in place (the chat's lane waits), so one call ends delivered.
+    assert await delivery_service.process_outbox_item(await _claim(session_maker)) is True
+    assert calls == [CHAT_ID, CHAT_ID]
+    assert await _state(session_maker) == ("ok", "ok", 2)
+    await _cleanup(session_maker)
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_not_retried(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+
+    async def forbidden(chat_id, target_date):
+        raise TelegramForbiddenError(method=SendMessage(chat_id=chat_id, text="x"), message="bot was kicked")
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", forbidden)
+
+    await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "morning")
+    assert await delivery_service.process_outbox_item(await _claim(session_maker)) is False
+    assert await _state(session_maker) == ("error", "error", 1)
+
+    # send_log "error" may be reserved again; the finished outbox row is re-armed.
+    assert await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "morning") is True
+    assert await _state(session_maker) == ("pending", "reserved", 0)
+    await _cleanup(session_maker)
+
+
+@pytest.mark.asyncio
+async def test_item_already_sent_elsewhere_is_not_sent_again(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+    calls: list[int] = []
+
+    async def deliver(chat_id, target_date):
+        calls.append(chat_id)
+        return ["item"]
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", deliver)
+
+    await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "morning")
+    item = await _claim(session_maker)
+    # E.g. a catch-up or /send re-won the stale reservation and delivered it while the row waited.
+    async with session_maker() as session:
+        await SendLogRepo(session).mark_sent(CHAT_ID, TARGET.isoformat(), "morning", "2025-03-03T08:00:00")
+        await session.commit()
+
+    assert await delivery_service.process_outbox_item(item) is False
+    assert calls == []
+    assert await _state(session_maker) == ("ok", "ok", 1)
+    await _cleanup(session_maker)
+
+
+@pytest.mark.asyncio
+async def test_unexpected_lane_error_requeues_then_fails_the_row(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+
+    async def broken_presync(chat_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(delivery_service, "presync_ical", broken_presync)
+    monkeypatch.setattr(env_settings, "OUTBOX_MAX_ATTEMPTS", 2, raising=False)
+    await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "morning")
+
+    # Attempts left: back to "pending" at once instead of staying "sending" until a restart.
+    delivery_service._route(await _claim(session_maker))
+    await delivery_service._lane_tasks[CHAT_ID]
+    assert await _state(session_maker) == ("pending", "reserved", 1)
+
+    # Attempts used up: given up, and send_log is free for the next tick.
+    delivery_service._route(await _claim(session_maker))
+    await delivery_service._lane_tasks[CHAT_ID]
+    assert await _state(session_maker) == ("error", "error", 2)
+    await _cleanup(session_maker)
+
+
+@pytest.mark.asyncio
+async def test_workers_drain_queue(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+    delivered = asyncio.Event()
+
+    async def deliver(chat_id, target_date):
+        delivered.set()
+        return ["item"]
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", deliver)
+
+    await delivery_service.start_delivery_workers(count=2)
+    try:
+        await delivery_service.enqueue_delivery(CHAT_ID, TARGET, "evening")
+        await asyncio.wait_for(delivered.wait(), timeout=5)
+        for _ in range(50):
+            # Results are written in batches; flush instead of waiting for the next interval.
+            await delivery_service.flush_completions()
+            if (await _state(session_maker))[0] == "ok":
+                break
+            await asyncio.sleep(0.05)
+        assert await _state(session_maker) == ("ok", "ok", 1)
+    finally:
+        await delivery_service.stop_delivery_workers()
+        await _cleanup(session_maker)
+
+
+@pytest.mark.asyncio
+async def test_lane_writes_previous_result_before_next_send(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+    monkeypatch.setattr(env_settings, "OUTBOX_FLUSH_SECONDS", 60, raising=False)
+    statuses_at_send: list[dict[str, str]] = []
+
+    async def deliver(chat_id, target_date):
+        async with session_maker() as session:
+            rows = (await session.execute(select(SendLog).where(SendLog.chat_id == CHAT_ID))).scalars()
+            statuses_at_send.append({row.target_date: row.status for row in rows})
+        return ["item"]
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", deliver)
+    await delivery_service.enqueue_deliveries([(CHAT_ID, date(2025, 3, 3), "morning"), (CHAT_ID, date(2025, 3, 4), "morning")])
+
+    await delivery_service.start_delivery_workers(count=1)
+    try:
+        for _ in range(100):
+            if len(statuses_at_send) == 2:
+                break
+            await asyncio.sleep(0.02)
+        # The flusher interval is far away, yet the first result is committed before the second send.
+        assert statuses_at_send[1] == {"2025-03-03": "ok", "2025-03-04": "reserved"}
+    finally:
+        await delivery_service.stop_delivery_workers()
+        await _cleanup(session_maker)
+
+
+@pytest.mark.asyncio
+async def test_lanes_keep_chat_order_and_run_chats_in_parallel(monkeypatch, session_maker):
+    other_chat = CHAT_ID + 1
+    for chat in (CHAT_ID, other_chat):
+        async with session_maker() as session:
+            await session.execute(delete(Outbox).where(Outbox.chat_id == chat))
+            await session.execute(delete(SendLog).where(SendLog.chat_id == chat))
+            await session.commit()
+
+    slow_chat_release = asyncio.Event()
+    sent: list[tuple[int, str]] = []
+
+    async def deliver(chat_id, target_date):
+        if chat_id == other_chat:
+            # A big message stuck in one group must not hold up the other chat.
+            await slow_chat_release.wait()
+        sent.append((chat_id, target_date.isoformat()))
+        return ["item"]
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", deliver)
+
+    await delivery_service.enqueue_delivery(other_chat, TARGET, "morning")
+    for day in (3, 4, 5):
+        await delivery_service.enqueue_delivery(CHAT_ID, date(2025, 3, day), "morning")
+
+    await delivery_service.start_delivery_workers(count=2)
+    try:
+        for _ in range(100):
+            if len(sent) == 3:
+                break
+            await asyncio.sleep(0.02)
+        assert sent == [(CHAT_ID, "2025-03-03"), (CHAT_ID, "2025-03-04"), (CHAT_ID, "2025-03-05")]
+
+        slow_chat_release.set()
+        for _ in range(100):
+            if len(sent) == 4:
+                break
+            await asyncio.sleep(0.02)
+        assert sent[-1] == (other_chat, "2025-03-03")
+    finally:
+        await delivery_service.stop_delivery_workers()
+        for chat in (CHAT_ID, other_chat):
+            async with session_maker() as session:
+                await session.execute(delete(Outbox).where(Outbox.chat_id == chat))
+                await session.execute(delete(SendLog).where(SendLog.chat_id == chat))
+                await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_inflight_send_and_requeues_the_rest(monkeypatch, session_maker):
+    await _cleanup(session_maker)
+    started = asyncio.Event()
+    release = asyncio.Event()
+    sent: list[str] = []
+
+    async def deliver(chat_id, target_date):
+        started.set()
+        await release.wait()
+        sent.append(target_date.isoformat())
+        return ["item"]
+
+    monkeypatch.setattr(delivery_service, "deliver_schedule", deliver)
+
+    for day in (3, 4):
+        await delivery_service.enqueue_delivery(CHAT_ID, date(2025, 3, day), "morning")
+    await delivery_service.start_delivery_workers(count=1)
+    try:
+        await asyncio.wait_for(started.wait(), timeout=5)
+        stop = asyncio.create_task(delivery_service.stop_delivery_workers(timeout=5))
+        await asyncio.sleep(0.05)
+        release.set()
+        await stop
+    finally:
+        await delivery_service.stop_delivery_workers()
+
+    # The send in progress finished and was recorded; the queued one is pending again for the next start.
+    assert sent == ["2025-03-03"]
+    async with session_maker() as session:
+        rows = (await session.execute(select(Outbox).where(Outbox.chat_id == CHAT_ID).order_by(Outbox.id))).scalars()
+        assert [(row.target_date, row.status) for row in rows] == [("2025-03-03", "ok"), ("2025-03-04", "pending")]
+    await _cleanup(session_maker)
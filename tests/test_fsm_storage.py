@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import delete, select, update
+
+from app.bot import fsm_storage
+from app.bot.fsm_storage import SqliteStorage
+from app.db.models import FsmState
+from app.db.repos.fsm_states_repo import FsmStatesRepo
+
+
+class Form(StatesGroup):
+    mode = State()
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (fsm_storage,)
+
+
+@pytest_asyncio.fixture
+async def session_maker(session_maker):
+    async with session_maker() as session:
+        await session.execute(delete(FsmState))
+        await session.commit()
+    return session_maker
+
+
+async def _rows(session_maker) -> dict[str, tuple[str | None, str]]:
+    async with session_maker() as session:
+        result = await session.execute(select(FsmState))
+        return {row.key: (row.state, row.data) for row in result.scalars()}
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched_and_survive_a_restart(session_maker):
+    storage = SqliteStorage(ttl=timedelta(days=30), cache_size=1, flush_seconds=3600)
+    await storage.set_state(_key(1), Form.mode)
+    await storage.update_data(_key(1), {"active_chat_id": -100})
+    await storage.update_data(_key(2), {"active_chat_id": -200})
+    assert await _rows(session_maker) == {}
+    # Unsaved keys are kept even above the cache bound.
+    assert await storage.get_data(_key(1)) == {"active_chat_id": -100}
+
+    assert await storage.flush() == 2
+    rows = await _rows(session_maker)
+    assert rows["1:1:1:::default"] == ("Form:mode", '{"active_chat_id": -100}')
+    assert len(storage._cache) == 1
+
+    await storage.set_state(_key(2), None)
+    await storage.set_data(_key(2), {})
+    await storage.close()
+    assert set(await _rows(session_maker)) == {"1:1:1:::default"}
+
+    restarted = SqliteStorage(ttl=timedelta(days=30), flush_seconds=3600)
+    assert await restarted.get_state(_key(1)) == "Form:mode"
+    assert await restarted.get_data(_key(1)) == {"active_chat_id": -100}
+    assert await restarted.get_data(_key(2)) == {}
+
+
+@pytest.mark.asyncio
+async def test_idle_keys_expire(session_maker):
+    storage = SqliteStorage(ttl=timedelta(days=1), flush_seconds=0)
+    await storage.update_data(_key(3), {"active_chat_id": -300})
+    old = (datetime.now() - timedelta(days=2)).isoformat()
+    async with session_maker() as session:
+        await session.execute(update(FsmState).values(updated_at=old))
+        await session.commit()
+
+    assert await storage.get_data(_key(3)) == {}
+    async with session_maker() as session:
+        deleted = await FsmStatesRepo(session).delete_older_than((datetime.now() - timedelta(days=1)).isoformat(), 10)
+        await session.commit()
+    assert deleted == 1
@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.bot.middlewares import GroupCommandCoalescer
+
+
+def _msg(chat_id: int, text: str, chat_type: str = "supergroup"):
+    return SimpleNamespace(chat=SimpleNamespace(id=chat_id, type=chat_type), text=text)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_reply_once_drops_repeats_within_window():
+    clock = FakeClock()
+    coalescer = GroupCommandCoalescer(window_seconds=10, reply_once=True, clock=clock)
+    handled: list[str] = []
+
+    async def handler(event, data):
+        handled.append(event.text)
+        return "answered"
+
+    assert await coalescer(handler, _msg(-1, "/today"), {}) == "answered"
+    clock.now += 3
+    assert await coalescer(handler, _msg(-1, "/today@rasp_bot"), {}) is None
+    # Other chats, other commands and aliases of other commands are independent.
+    await coalescer(handler, _msg(-2, "/today"), {})
+    await coalescer(handler, _msg(-1, "/week_short"), {})
+    assert await coalescer(handler, _msg(-1, "/weekbrief"), {}) is None
+    # Private chats and non-schedule commands are never coalesced.
+    await coalescer(handler, _msg(5, "/today", chat_type="private"), {})
+    await coalescer(handler, _msg(5, "/today", chat_type="private"), {})
+    await coalescer(handler, _msg(-1, "/status"), {})
+    await coalescer(handler, _msg(-1, "/status"), {})
+
+    clock.now += 10
+    await coalescer(handler, _msg(-1, "/today"), {})
+    assert handled == [
+        "/today",
+        "/today",
+        "/week_short",
+        "/today",
+        "/today",
+        "/status",
+        "/status",
+        "/today",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_without_reply_once_repeats_wait_for_the_first():
+    coalescer = GroupCommandCoalescer(window_seconds=10, reply_once=False, clock=FakeClock())
+    release = asyncio.Event()
+    order: list[str] = []
+
+    async def handler(event, data):
+        order.append(f"start {event.text}")
+        if event.text == "/today":
+            await release.wait()
+        order.append(f"end {event.text}")
+
+    first = asyncio.create_task(coalescer(handler, _msg(-1, "/today"), {}))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(coalescer(handler, _msg(-1, "/today@rasp_bot"), {}))
+    await asyncio.sleep(0)
+    assert order == ["start /today"]
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert order == ["start /today", "end /today", "start /today@rasp_bot", "end /today@rasp_bot"]
+
+
+@pytest.mark.asyncio
+async def test_reply_once_answers_repeats_when_the_first_one_failed():
+    coalescer = GroupCommandCoalescer(window_seconds=10, reply_once=True, clock=FakeClock())
+    release = asyncio.Event()
+    handled: list[str] = []
+
+    async def handler(event, data):
+        handled.append(event.text)
+        if event.text == "/today":
+            await release.wait()
+            raise RuntimeError("Telegram is down")
+        return "answered"
+
+    first = asyncio.create_task(coalescer(handler, _msg(-1, "/today"), {}))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(coalescer(handler, _msg(-1, "/today@rasp_bot"), {}))
+    await asyncio.sleep(0)
+    assert handled == ["/today"]
+
+    release.set()
+    with pytest.raises(RuntimeError):
+        await first
+    # The waiting repeat falls through to the handler instead of being dropped...
+    assert await waiting == "answered"
+    # ...and the window starts over: it now counts as the first answer.
+    assert await coalescer(handler, _msg(-1, "/today@other_bot"), {}) is None
+    assert handled == ["/today", "/today@rasp_bot"]
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+import app.db.connection as conn
+from app.bot.handlers import group_setup
+from app.config import settings as env_settings
+from app.db.models import Base, Settings
+from app.services import ical_sync_service
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import ResponseCache
+
+
+class SentMessage:
+    def __init__(self, chat_id: int, text: str):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.text = text
+        self.edits: list[str] = []
+
+    async def edit_text(self, text: str, **kwargs) -> None:
+        self.edits.append(text)
+
+    async def answer(self, text: str, **kwargs) -> "SentMessage":
+        return SentMessage(self.chat.id, text)
+
+    async def delete(self) -> None:
+        pass
+
+
+class IncomingMessage:
+    def __init__(self, chat_id: int):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.sent: list[SentMessage] = []
+
+    async def answer(self, text: str, **kwargs) -> SentMessage:
+        sent = SentMessage(self.chat.id, text)
+        self.sent.append(sent)
+        return sent
+
+    async def reply(self, text: str, **kwargs) -> SentMessage:
+        return await self.answer(text, **kwargs)
+
+
+def test_ical_staleness_bound(monkeypatch):
+    monkeypatch.setattr(group_setup.env_settings, "ICAL_COMMAND_MAX_AGE_MINUTES", 30, raising=False)
+    assert group_setup._ical_is_stale(None)
+    assert group_setup._ical_is_stale("garbage")
+    assert group_setup._ical_is_stale((datetime.now() - timedelta(minutes=31)).isoformat())
+    assert not group_setup._ical_is_stale((datetime.now() - timedelta(minutes=5)).isoformat())
+
+
+@pytest.mark.asyncio
+async def test_stale_data_answers_first_then_edits_only_on_change(monkeypatch):
+    schedule = {"text": "old"}
+    sync_started = asyncio.Event()
+    finish_sync = asyncio.Event()
+    sync_calls: list[int] = []
+
+    async def fake_render_range(message, *args, **kwargs):
+        async def render() -> list[str]:
+            return [schedule["text"]]
+
+        await group_setup._answer_schedule(message, "https://example.com/a.ics", True, render)
+
+    async def fake_sync(chat_id: int) -> bool:
+        sync_calls.append(chat_id)
+        sync_started.set()
+        await finish_sync.wait()
+        schedule["text"] = "new"
+        return True
+
+    monkeypatch.setattr(group_setup, "sync_ical_schedule", fake_sync)
+
+    message = IncomingMessage(-3001)
+    await fake_render_range(message)
+    # Answered from stored data before the feed was fetched.
+    assert [sent.text for sent in message.sent] == ["old"]
+    await asyncio.wait_for(sync_started.wait(), timeout=1)
+
+    # A second command while the refresh runs does not start another one.
+    second = IncomingMessage(-3001)
+    await fake_render_range(second)
+    assert sync_calls == [-3001]
+
+    finish_sync.set()
+    for _ in range(50):
+        if message.sent[0].edits:
+            break
+        await asyncio.sleep(0.01)
+    assert message.sent[0].edits == ["new"]
+    assert second.sent[0].edits == []
+
+    # Refresh that brings nothing new: no edit.
+    schedule["text"] = "same"
+    finish_sync.clear()
+    third = IncomingMessage(-3001)
+
+    async def unchanged_sync(chat_id: int) -> bool:
+        return True
+
+    monkeypatch.setattr(group_setup, "sync_ical_schedule", unchanged_sync)
+    await fake_render_range(third)
+    await asyncio.sleep(0.05)
+    assert third.sent[0].edits == []
+    assert -3001 not in group_setup._revalidating
+
+
+@pytest.mark.asyncio
+async def test_chat_context_reads_do_not_wait_for_writer(monkeypatch, tmp_path):
+    db_url = f"sqlite+aiosqlite:///{(tmp_path / 'bot.db').resolve().as_posix()}"
+    monkeypatch.setattr(env_settings, "DB_PATH", db_url, raising=False)
+    monkeypatch.setattr(env_settings, "TZ", "Europe/Moscow", raising=False)
+    for name in ("_engine", "_session_maker", "_read_engine", "_read_session_maker"):
+        monkeypatch.setattr(conn, name, None)
+    monkeypatch.setattr(response_cache_module, "response_cache", ResponseCache(max_entries=10))
+
+    try:
+        async with conn.get_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with conn.async_session_maker() as session:
+            session.add(Settings(chat_id=-1, mode=0, timezone="Asia/Tomsk", updated_at="2025-01-01T00:00:00"))
+            await session.commit()
+
+        async with conn.async_session_maker() as writer:
+            # A sync holding the write lock.
+            writer.add(Settings(chat_id=-9, mode=0, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+            await writer.flush()
+
+            tz, _, stale = await asyncio.wait_for(group_setup._resolve_chat_context(-1), timeout=2)
+            assert (tz, stale) == ("Asia/Tomsk", True)
+            # No row: env defaults, and none is created.
+            tz, _, _ = await asyncio.wait_for(group_setup._resolve_chat_context(-2), timeout=2)
+            assert tz == "Europe/Moscow"
+            await writer.commit()
+
+        async with conn.async_session_maker() as session:
+            ids = (await session.execute(select(Settings.chat_id))).scalars().all()
+        assert sorted(ids) == [-9, -1]
+    finally:
+        await conn.dispose_engines()
+
+
+@pytest.mark.asyncio
+async def test_command_answers_while_another_chat_syncs(monkeypatch, tmp_path):
+    db_url = f"sqlite+aiosqlite:///{(tmp_path / 'bot.db').resolve().as_posix()}"
+    monkeypatch.setattr(env_settings, "DB_PATH", db_url, raising=False)
+    monkeypatch.setattr(env_settings, "TZ", "UTC", raising=False)
+    monkeypatch.setattr(env_settings, "SCHEDULE_ICAL_URL", "https://example.com/feed.ics", raising=False)
+    for name in ("_engine", "_session_maker", "_read_engine", "_read_session_maker"):
+        monkeypatch.setattr(conn, name, None)
+    monkeypatch.setattr(response_cache_module, "response_cache", ResponseCache(max_entries=10))
+
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch(url: str) -> str:
+        fetching.set()
+        release.wait(timeout=5)
+        return "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nEND:VCALENDAR\r\n"
+
+    monkeypatch.setattr(ical_sync_service, "fetch_ical", slow_fetch)
+
+    try:
+        async with conn.get_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with conn.async_session_maker() as session:
+            session.add(Settings(chat_id=-1, mode=1, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+            await session.commit()
+
+        sync = asyncio.create_task(ical_sync_service.sync_ical_schedule(-1, force=True))
+        assert await asyncio.to_thread(fetching.wait, 2)
+
+        # Chat -2 has no settings row and no data yet: answered from the DB while -1's feed is still loading.
+        message = IncomingMessage(-2)
+        await asyncio.wait_for(group_setup.group_today(message), timeout=2)
+        assert len(message.sent) == 1
+
+        release.set()
+        await sync
+        await asyncio.gather(*group_setup._background_tasks)
+    finally:
+        release.set()
+        await conn.dispose_engines()
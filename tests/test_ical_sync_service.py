@@ -0,0 +1,73 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+import app.db.connection as conn
+from app.config import settings as env_settings
+from app.db.models import Base, ScheduleItem, Settings
+from app.services import ical_sync_service
+
+CHAT_ID = -818181
+
+
+def _feed(start: datetime) -> str:
+    stamp = start.strftime("%Y%m%dT%H%M%SZ")
+    end = (start + timedelta(hours=1)).strftime("%Y%m%dT%H%M%SZ")
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\n"
+        f"BEGIN:VEVENT\r\nUID:lesson-1\r\nDTSTART:{stamp}\r\nDTEND:{end}\r\nSUMMARY:Math\r\nEND:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_feed_is_fetched_without_holding_the_write_lock(monkeypatch, tmp_path):
+    db_file = tmp_path / "bot.db"
+    monkeypatch.setattr(env_settings, "DB_PATH", f"sqlite+aiosqlite:///{db_file.resolve().as_posix()}", raising=False)
+    monkeypatch.setattr(env_settings, "TZ", "UTC", raising=False)
+    monkeypatch.setattr(env_settings, "SCHEDULE_ICAL_URL", "https://example.com/feed.ics", raising=False)
+    for name in ("_engine", "_session_maker", "_read_engine", "_read_session_maker"):
+        monkeypatch.setattr(conn, name, None)
+
+    lesson_start = datetime.now(timezone.utc).replace(hour=10, minute=0, second=0, microsecond=0)
+    write_lock_free: list[bool] = []
+
+    def fake_fetch(url: str) -> str:
+        # What any other writer (outbox claim, completion flush, FSM flush) would try while the feed loads.
+        other = sqlite3.connect(db_file, timeout=0)
+        try:
+            other.execute("BEGIN IMMEDIATE")
+            other.rollback()
+            write_lock_free.append(True)
+        except sqlite3.OperationalError:
+            write_lock_free.append(False)
+        finally:
+            other.close()
+        return _feed(lesson_start)
+
+    monkeypatch.setattr(ical_sync_service, "fetch_ical", fake_fetch)
+
+    try:
+        async with conn.get_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with conn.async_session_maker() as session:
+            session.add(Settings(chat_id=CHAT_ID, mode=1, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+            await session.commit()
+
+        assert await ical_sync_service.sync_ical_schedule(CHAT_ID, force=True)
+        # A chat without a settings row uses the env feed; the row is created with the sync time.
+        assert await ical_sync_service.sync_ical_schedule(CHAT_ID - 1, force=True)
+        assert write_lock_free == [True, True]
+
+        async with conn.async_session_maker() as session:
+            for chat_id in (CHAT_ID, CHAT_ID - 1):
+                settings = await session.get(Settings, chat_id)
+                assert settings is not None and settings.last_ical_sync_at
+                subjects = (
+                    await session.execute(select(ScheduleItem.subject).where(ScheduleItem.chat_id == chat_id))
+                ).scalars().all()
+                assert subjects == ["Math"]
+    finally:
+        await conn.dispose_engines()
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.config import settings as env_settings
+from app.db.models import Settings
+from app.services import ical_warmup_service
+from app.services.ical_warmup_service import _spread_offset, warmup_due
+
+UTC = ZoneInfo("UTC")
+LEAD = timedelta(minutes=10)
+
+
+def test_warmup_window_is_spread_and_runs_once():
+    chat_id = 4242
+    offset = _spread_offset(chat_id, LEAD)
+    assert timedelta(0) <= offset < LEAD - timedelta(minutes=1)
+    assert _spread_offset(chat_id, LEAD) == offset  # stable across ticks/restarts
+
+    warm_at = datetime(2025, 3, 3, 7, 50, tzinfo=UTC) + offset
+    send_times = [time(8, 0)]
+
+    assert not warmup_due(chat_id, send_times, warm_at - timedelta(seconds=1), None, LEAD)
+    assert warmup_due(chat_id, send_times, warm_at, None, LEAD)
+    # Synced an hour ago: stale, refresh. Synced after the window opened: nothing to do.
+    assert warmup_due(chat_id, send_times, warm_at + timedelta(seconds=30), timedelta(hours=1), LEAD)
+    assert not warmup_due(chat_id, send_times, warm_at + timedelta(seconds=30), timedelta(seconds=10), LEAD)
+    # At the send time the send path takes over.
+    assert not warmup_due(chat_id, send_times, datetime(2025, 3, 3, 8, 0, tzinfo=UTC), None, LEAD)
+
+    # A window that may open before midnight (00:05 send, 10 minute lead).
+    early_warm_at = datetime(2025, 3, 4, 0, 5, tzinfo=UTC) - LEAD + offset
+    assert warmup_due(chat_id, [time(0, 5)], early_warm_at, None, LEAD)
+
+
+@pytest.mark.asyncio
+async def test_schedule_ical_warmups_refreshes_only_due_ical_chats(monkeypatch):
+    monkeypatch.setattr(env_settings, "ICAL_WARMUP_LEAD_MINUTES", 10, raising=False)
+    monkeypatch.setattr(env_settings, "SCHEDULE_ICAL_FALLBACK_ENABLED", False, raising=False)
+    synced: list[int] = []
+
+    async def fake_sync(chat_id: int, force: bool = False, max_age_seconds: int | None = None) -> bool:
+        synced.append(chat_id)
+        return True
+
+    monkeypatch.setattr(ical_warmup_service, "sync_ical_schedule", fake_sync)
+
+    now_local = datetime(2025, 3, 3, 7, 59, 30, tzinfo=UTC)
+    monkeypatch.setattr(ical_warmup_service, "get_local_now", lambda tz: now_local)
+
+    def chat(chat_id: int, morning: str, ical_url: str | None) -> Settings:
+        return Settings(
+            chat_id=chat_id,
+            mode=1,
+            morning_time=morning,
+            timezone="UTC",
+            ical_url=ical_url,
+            ical_enabled=True,
+            last_ical_sync_at=None,
+            updated_at="2025-01-01T00:00:00",
+        )
+
+    all_settings = [
+        chat(1, "08:00", "https://example.com/a.ics"),  # due in 30s: warm up
+        chat(2, "09:00", "https://example.com/b.ics"),  # an hour away
+        chat(3, "08:00", None),  # no feed
+    ]
+    assert ical_warmup_service.schedule_ical_warmups(all_settings) == 1
+    # Still running: the next tick does not start a second fetch.
+    assert ical_warmup_service.schedule_ical_warmups(all_settings) == 0
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert synced == [1]
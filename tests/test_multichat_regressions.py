@@ -70,38 +70,38 @@ async def test_scheduler_updates_last_sent_only_on_success(monkeypatch, engine):
     monkeypatch.setattr(scheduler_service, "get_today", lambda tz: date(2025, 1, 2))
     monkeypatch.setattr(scheduler_service, "get_tomorrow", lambda tz: date(2025, 1, 3))
 
-    async def fake_send_schedule(chat_id: int, target_date: date, kind: str, notify_admin_on_data_gaps: bool = True) -> bool:
-        async with test_session_maker() as session:
-            if kind == "morning":
+    enqueued: list[tuple[int, date, str]] = []
+
+    async def fake_enqueue_deliveries(keys: list[tuple[int, date, str]], available_at=None) -> set:
+        # Simulates the delivery workers finishing: morning succeeds, evening fails.
+        for chat_id, target_date, kind in keys:
+            already_queued = (chat_id, target_date, kind) in enqueued
+            enqueued.append((chat_id, target_date, kind))
+            if already_queued:
+                continue
+            async with test_session_maker() as session:
                 session.add(
                     SendLog(
                         chat_id=chat_id,
                         target_date=target_date.isoformat(),
                         kind=kind,
                         reserved_at="2025-01-02T19:00:00",
-                        sent_at="2025-01-02T19:00:01",
-                        status="ok",
-                        error=None,
+                        sent_at="2025-01-02T19:00:01" if kind == "morning" else None,
+                        status="ok" if kind == "morning" else "error",
+                        error=None if kind == "morning" else "boom",
                     )
                 )
-            else:
-                session.add(
-                    SendLog(
-                        chat_id=chat_id,
-                        target_date=target_date.isoformat(),
-                        kind=kind,
-                        reserved_at="2025-01-02T19:00:00",
-                        sent_at=None,
-                        status="error",
-                        error="boom",
-                    )
-                )
-            await session.commit()
-        return True
+                await session.commit()
+        return set(keys)
 
-    monkeypatch.setattr(scheduler_service, "send_schedule", fake_send_schedule)
+    monkeypatch.setattr(scheduler_service, "enqueue_deliveries", fake_enqueue_deliveries)
+
+    await scheduler_service._run_periodic_sender()
+    assert enqueued == [(777777, date(2025, 1, 2), "morning"), (777777, date(2025, 1, 3), "evening")]
 
+    # Delivery is asynchronous: the next tick records last_sent_* from send_log.
     await scheduler_service._run_periodic_sender()
+    assert len(enqueued) == 3  # the failed evening send is queued again
 
     async with test_session_maker() as session:
         settings = await session.get(Settings, 777777)
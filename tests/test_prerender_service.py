@@ -0,0 +1,57 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.db.models import RenderedMessage, ScheduleItem, Settings
+from app.services.prerender_service import get_day_chunks, refresh_rendered_days, render_day
+
+CHAT_ID = 818181
+
+
+def _lesson(day: str, start: str, subject: str) -> ScheduleItem:
+    return ScheduleItem(
+        chat_id=CHAT_ID,
+        date=day,
+        start_time=start,
+        end_time="10:05",
+        subject=subject,
+        room="1-351",
+        teacher=None,
+        ical_uid=f"{day}-{start}",
+    )
+
+
+@pytest.mark.asyncio
+async def test_sync_stores_changed_days_and_sender_reads_them(session):
+    await session.execute(delete(RenderedMessage).where(RenderedMessage.chat_id == CHAT_ID))
+    await session.execute(delete(ScheduleItem).where(ScheduleItem.chat_id == CHAT_ID))
+    await session.merge(Settings(chat_id=CHAT_ID, mode=1, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+    await session.flush()
+    session.add(_lesson("2025-03-03", "08:30", "Math"))
+    await session.flush()
+
+    # Every day of the window is stored, including days without lessons.
+    assert len(await refresh_rendered_days(session, CHAT_ID, "2025-03-03", "2025-03-05", "UTC")) == 3
+    # Nothing changed: nothing is rewritten.
+    assert await refresh_rendered_days(session, CHAT_ID, "2025-03-03", "2025-03-05", "UTC") == []
+
+    session.add(_lesson("2025-03-04", "10:15", "Physics"))
+    await session.flush()
+    assert await refresh_rendered_days(session, CHAT_ID, "2025-03-03", "2025-03-05", "UTC") == ["2025-03-04"]
+
+    stored = (
+        await session.execute(
+            select(RenderedMessage).where(RenderedMessage.chat_id == CHAT_ID, RenderedMessage.target_date == "2025-03-04")
+        )
+    ).scalar_one()
+    assert stored.items_count == 1
+    assert "Physics" in json.loads(stored.chunks)[0]
+
+    chunks, items_count = await get_day_chunks(session, CHAT_ID, date(2025, 3, 4))
+    assert (chunks, items_count) == (json.loads(stored.chunks), 1)
+
+    # Outside the synced window the message is rendered on the spot.
+    chunks, items_count = await get_day_chunks(session, CHAT_ID, date(2025, 3, 10))
+    assert (chunks, items_count) == (render_day(date(2025, 3, 10), [], "UTC"), 0)
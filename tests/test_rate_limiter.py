@@ -0,0 +1,130 @@
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from app.bot import rate_limiter
+from app.bot.rate_limiter import TelegramRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_queues_reservations_in_order():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+
+    clock.now = 5
+    assert bucket.is_idle()
+    bucket.block_for(3)
+    assert bucket.reserve() == 3
+
+
+@pytest.mark.asyncio
+async def test_group_sends_are_paced_per_chat_and_globally(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.sleep)
+    limiter = TelegramRateLimiter(global_rate=30, group_rate_per_minute=20, private_rate=1, max_retries=3, clock=clock)
+
+    sent_at: list[float] = []
+
+    async def make_request(bot, method):
+        sent_at.append(clock.now)
+        return True
+
+    for _ in range(21):
+        await limiter(make_request, None, SendMessage(chat_id=-100, text="x"))
+
+    # 20 per minute burst, then one every 3 seconds.
+    assert sent_at[19] < 1
+    assert sent_at[20] == pytest.approx(3.0, abs=0.1)
+
+    # Non-message methods are not limited.
+    sleeps_before = len(clock.sleeps)
+    for _ in range(50):
+        await limiter(make_request, None, GetMe())
+    assert len(clock.sleeps) == sleeps_before
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_waited_out_and_retried(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.sleep)
+    limiter = TelegramRateLimiter(global_rate=30, group_rate_per_minute=20, private_rate=1, max_retries=2, clock=clock)
+    method = SendMessage(chat_id=-100, text="x")
+    attempts: list[float] = []
+
+    async def flaky(bot, m):
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise TelegramRetryAfter(method=m, message="Too Many Requests", retry_after=7)
+        return "ok"
+
+    assert await limiter(flaky, None, method) == "ok"
+    assert attempts == [0.0, pytest.approx(7.0)]
+
+    async def always_flood(bot, m):
+        raise TelegramRetryAfter(method=m, message="Too Many Requests", retry_after=1)
+
+    with pytest.raises(TelegramRetryAfter):
+        await limiter(always_flood, None, method)
+
+
+@pytest.mark.asyncio
+async def test_private_chat_reply_burst_is_not_paced(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.sleep)
+    limiter = TelegramRateLimiter(
+        global_rate=30, group_rate_per_minute=20, private_rate=1, private_burst=3, max_retries=3, clock=clock
+    )
+
+    async def make_request(bot, method):
+        return True
+
+    for _ in range(3):
+        await limiter(make_request, None, SendMessage(chat_id=42, text="x"))
+    assert clock.sleeps == []
+
+    await limiter(make_request, None, SendMessage(chat_id=42, text="x"))
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_flood_wait_in_chat_slows_and_then_holds_the_global_bucket():
+    clock = FakeClock()
+    limiter = TelegramRateLimiter(global_rate=2, group_rate_per_minute=60, private_rate=1, max_retries=3, clock=clock)
+
+    # One chat under flood control: that chat waits, everyone else sends at half the global rate.
+    limiter._on_flood_wait(-1, limiter._chat_bucket(-1), 10)
+    assert limiter._chat_bucket(-1).reserve() == pytest.approx(10.0)
+    assert [limiter._global.reserve() for _ in range(3)] == [0.0, 0.0, pytest.approx(1.0)]
+
+    # A second chat flooded while the first wait is running: the limit is bot-wide, every chat waits.
+    clock.now = 5.0
+    limiter._on_flood_wait(-2, limiter._chat_bucket(-2), 10)
+    assert limiter._global.reserve() == pytest.approx(10.0)
+
+
+def test_chat_buckets_are_bounded_and_evicted_least_recently_used(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_MAX_CHAT_BUCKETS", 3)
+    limiter = TelegramRateLimiter(global_rate=30, group_rate_per_minute=20, private_rate=1, clock=FakeClock())
+
+    first = limiter._chat_bucket(1)
+    limiter._chat_bucket(2)
+    limiter._chat_bucket(3)
+    # Chat 1 is used again, so chat 2 is now the least recently used.
+    assert limiter._chat_bucket(1) is first
+    limiter._chat_bucket(4)
+
+    assert list(limiter._chats) == [3, 1, 4]
+    assert limiter._chat_bucket(1) is first
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+import app.db.connection as conn
+from app.config import settings as env_settings
+from app.db.models import Base, Settings
+
+
+def _reset_engines(monkeypatch) -> None:
+    for name in ("_engine", "_session_maker", "_read_engine", "_read_session_maker"):
+        monkeypatch.setattr(conn, name, None)
+
+
+@pytest.mark.asyncio
+async def test_read_session_does_not_wait_for_writer(monkeypatch, tmp_path):
+    db_url = f"sqlite+aiosqlite:///{(tmp_path / 'bot.db').resolve().as_posix()}"
+    monkeypatch.setattr(env_settings, "DB_PATH", db_url, raising=False)
+    _reset_engines(monkeypatch)
+
+    try:
+        async with conn.get_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with conn.async_session_maker() as session:
+            session.add(Settings(chat_id=1, mode=0, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+            await session.commit()
+
+        async with conn.async_session_maker() as writer:
+            # Hold the write lock with an uncommitted row, like a long iCal sync.
+            writer.add(Settings(chat_id=2, mode=0, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+            await writer.flush()
+
+            async def read_ids() -> list[int]:
+                async with conn.async_read_session_maker() as reader:
+                    return list((await reader.execute(select(Settings.chat_id))).scalars().all())
+
+            assert await asyncio.wait_for(read_ids(), timeout=2) == [1]
+            await writer.commit()
+
+        async with conn.async_read_session_maker() as reader:
+            assert (await reader.execute(text("PRAGMA query_only"))).scalar() == 1
+            with pytest.raises(OperationalError):
+                await reader.execute(text("DELETE FROM settings"))
+    finally:
+        await conn._read_engine.dispose()
+        await conn._engine.dispose()
+
+
+def test_read_session_shares_engine_for_memory_db(monkeypatch):
+    monkeypatch.setattr(env_settings, "DB_PATH", "sqlite+aiosqlite:///:memory:", raising=False)
+    _reset_engines(monkeypatch)
+
+    conn._ensure_read_engine_initialized()
+    assert conn._read_engine is conn.get_engine()
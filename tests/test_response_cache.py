@@ -0,0 +1,84 @@
+from datetime import date
+
+import pytest
+
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import ChatContext, ResponseCache, cached_chat_context, cached_render
+
+
+def test_invalidation_drops_only_windows_with_changed_dates():
+    cache = ResponseCache(max_entries=10)
+    today = (1, "range", "UTC", "2025-03-03", "2025-03-03")
+    week = (1, "week", "UTC", "2025-03-03", "2025-03-08")
+    next_week = (1, "week", "UTC", "2025-03-10", "2025-03-15")
+    other_chat = (2, "week", "UTC", "2025-03-03", "2025-03-08")
+    for key in (today, week, next_week, other_chat):
+        cache.put(key, [str(key)], cache.version(key[0]))
+
+    assert cache.invalidate(1, ["2025-03-05"]) == 1
+    assert cache.get(week) is None
+    assert cache.get(today) is not None
+    assert cache.get(next_week) is not None
+    assert cache.get(other_chat) is not None
+
+
+def test_lru_eviction_and_version_guard():
+    cache = ResponseCache(max_entries=2)
+    a, b, c = ((1, "range", "UTC", day, day) for day in ("2025-03-03", "2025-03-04", "2025-03-05"))
+    cache.put(a, ["a"], 0)
+    cache.put(b, ["b"], 0)
+    cache.get(a)  # a is now the most recent
+    cache.put(c, ["c"], 0)
+    assert cache.get(b) is None
+    assert cache.get(a) == ["a"]
+
+    # A render that started before a sync must not store its result after it.
+    version = cache.version(1)
+    cache.invalidate(1, [])
+    cache.put((1, "week", "UTC", "2025-03-03", "2025-03-08"), ["stale"], version)
+    assert cache.get((1, "week", "UTC", "2025-03-03", "2025-03-08")) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_render_skips_db_and_render_on_hit(monkeypatch):
+    cache = ResponseCache(max_entries=10)
+    monkeypatch.setattr(response_cache_module, "response_cache", cache)
+    calls: list[int] = []
+
+    async def render() -> list[str]:
+        calls.append(1)
+        return [f"render {len(calls)}"]
+
+    day = date(2025, 3, 3)
+    assert await cached_render(-1, "range", "UTC", day, day, render) == ["render 1"]
+    assert await cached_render(-1, "range", "UTC", day, day, render) == ["render 1"]
+    assert len(calls) == 1
+
+    cache.invalidate(-1, ["2025-03-03"])
+    assert await cached_render(-1, "range", "UTC", day, day, render) == ["render 2"]
+
+
+@pytest.mark.asyncio
+async def test_chat_context_is_cached_until_settings_or_sync_change(monkeypatch):
+    cache = ResponseCache(max_entries=10)
+    monkeypatch.setattr(response_cache_module, "response_cache", cache)
+    loads: list[int] = []
+
+    async def load() -> ChatContext:
+        loads.append(1)
+        return ChatContext(tz="UTC", ical_url=None, last_ical_sync_at=f"sync {len(loads)}")
+
+    assert (await cached_chat_context(-1, load)).last_ical_sync_at == "sync 1"
+    assert (await cached_chat_context(-1, load)).last_ical_sync_at == "sync 1"
+    assert len(loads) == 1
+
+    cache.invalidate_context(-1)  # settings saved
+    assert (await cached_chat_context(-1, load)).last_ical_sync_at == "sync 2"
+    cache.invalidate(-1, [])  # a sync that changed no dates still moves the sync time
+    assert (await cached_chat_context(-1, load)).last_ical_sync_at == "sync 3"
+
+    # A load that read the settings before they changed must not store its result afterwards.
+    version = cache.version(-2)
+    cache.invalidate_context(-2)
+    cache.put_context(-2, ChatContext(tz="UTC", ical_url=None, last_ical_sync_at=None), version)
+    assert cache.get_context(-2) is None
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings as env_settings
+from app.db.models import ScheduleItem, SendLog, Settings, SetupToken, Upload
+from app.services import retention_service
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (retention_service,)
+
+
+@pytest.mark.asyncio
+async def test_run_retention_prunes_old_rows_in_batches(monkeypatch, session_maker):
+    monkeypatch.setattr(retention_service, "compact_database", lambda: _noop())
+    monkeypatch.setattr(env_settings, "RETENTION_BATCH_SIZE", 2, raising=False)
+    monkeypatch.setattr(env_settings, "RETENTION_SEND_LOG_DAYS", 30, raising=False)
+    monkeypatch.setattr(env_settings, "RETENTION_UPLOADS_DAYS", 30, raising=False)
+    monkeypatch.setattr(env_settings, "RETENTION_SETUP_TOKENS_DAYS", 7, raising=False)
+    monkeypatch.setattr(env_settings, "RETENTION_SCHEDULE_DAYS", 30, raising=False)
+    monkeypatch.setattr(env_settings, "FSM_TTL_DAYS", 30, raising=False)
+
+    chat_id = 515151
+    async with session_maker() as session:
+        session.add(Settings(chat_id=chat_id, mode=0, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+        await session.flush()
+
+        for day in range(1, 6):
+            session.add(
+                SendLog(
+                    chat_id=chat_id,
+                    target_date=f"2025-01-0{day}",
+                    kind="morning",
+                    reserved_at="2025-01-01T00:00:00",
+                    status="ok",
+                )
+            )
+        session.add(
+            SendLog(chat_id=chat_id, target_date="2025-06-01", kind="morning", reserved_at="2025-06-01T00:00:00", status="ok")
+        )
+
+        old_unreferenced = Upload(chat_id=chat_id, filename="ical", uploaded_at="2025-01-01T00:00:00")
+        old_referenced = Upload(chat_id=chat_id, filename="ical", uploaded_at="2025-01-02T00:00:00")
+        latest = Upload(chat_id=chat_id, filename="ical", uploaded_at="2025-01-03T00:00:00")
+        session.add_all([old_unreferenced, old_referenced, latest])
+        await session.flush()
+
+        session.add(
+            ScheduleItem(
+                chat_id=chat_id,
+                date="2025-05-20",
+                start_time="10:00",
+                end_time="11:00",
+                subject="Keep",
+                ical_uid="keep",
+                ical_dtstart="2025-05-20T10:00:00+00:00",
+                source_upload_id=old_referenced.id,
+            )
+        )
+        session.add(
+            ScheduleItem(
+                chat_id=chat_id,
+                date="2025-01-01",
+                start_time="10:00",
+                end_time="11:00",
+                subject="Past",
+                ical_uid="past",
+                ical_dtstart="2025-01-01T10:00:00+00:00",
+                source_upload_id=old_unreferenced.id,
+            )
+        )
+
+        session.add(
+            SetupToken(token="expired", chat_id=chat_id, created_at="2025-01-01T00:00:00", expires_at="2025-01-01T00:20:00")
+        )
+        session.add(
+            SetupToken(
+                token="last-used",
+                chat_id=chat_id,
+                created_by=1,
+                created_at="2025-01-01T00:00:00",
+                expires_at="2025-01-01T00:20:00",
+                used_at="2025-01-01T00:05:00",
+                used_by=1,
+            )
+        )
+        session.add(
+            SetupToken(token="recent", chat_id=chat_id, created_at="2025-05-29T23:40:00", expires_at="2025-05-30T00:00:00")
+        )
+        await session.commit()
+
+    report = await retention_service.run_retention(now=datetime(2025, 6, 1, 4, 30))
+
+    assert report.deleted == {
+        "schedule_items": 1,
+        "rendered_messages": 0,
+        "send_log": 5,
+        "outbox": 0,
+        "uploads": 1,
+        "setup_tokens": 1,
+        "fsm_states": 0,
+    }
+
+    async with session_maker() as session:
+        logs = (await session.execute(select(SendLog.target_date).where(SendLog.chat_id == chat_id))).scalars().all()
+        assert logs == ["2025-06-01"]
+
+        upload_ids = set((await session.execute(select(Upload.id).where(Upload.chat_id == chat_id))).scalars().all())
+        assert upload_ids == {old_referenced.id, latest.id}
+
+        subjects = (await session.execute(select(ScheduleItem.subject).where(ScheduleItem.chat_id == chat_id))).scalars().all()
+        assert subjects == ["Keep"]
+
+        tokens = (await session.execute(select(SetupToken.token).where(SetupToken.chat_id == chat_id))).scalars().all()
+        # The cutoff follows the `now` passed in, not the wall clock.
+        assert sorted(tokens) == ["last-used", "recent"]
+
+
+async def _noop() -> None:
+    return None
@@ -63,3 +63,54 @@ async def test_upsert_ical_range_deletes_legacy_rows_with_null_ical_keys(session
     assert len(rows) == 1
     assert rows[0].ical_uid == "uid-1"
     assert rows[0].subject == "NEW"
+
+
+@pytest.mark.asyncio
+async def test_replace_range_stores_several_rows_without_ical_keys(session):
+    chat_id = -1002
+    session.add(Settings(chat_id=chat_id, mode=0, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+    upload = Upload(chat_id=chat_id, filename="schedule.xlsx", uploaded_at="2025-01-01T00:00:00")
+    session.add(upload)
+    await session.flush()
+
+    repo = ScheduleRepo(session)
+    for _ in range(2):
+        await repo.replace_range(
+            chat_id=chat_id,
+            date_from="2025-01-01",
+            date_to="2025-01-01",
+            items=[
+                ScheduleItem(date="2025-01-01", start_time="09:00", end_time="10:00", subject="A"),
+                ScheduleItem(date="2025-01-01", start_time="09:00", end_time="10:00", subject="B"),
+                ScheduleItem(date="2025-01-01", start_time="11:00", end_time="12:00", subject="C"),
+            ],
+            upload_id=upload.id,
+        )
+        await session.commit()
+
+    rows = await repo.get_by_date(chat_id, "2025-01-01")
+    assert sorted(row.subject for row in rows) == ["A", "B", "C"]
+    assert len({row.ical_uid for row in rows}) == 3
+    assert all(row.ical_uid.startswith("legacy:") and row.ical_dtstart is None for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_ical_dtstart_is_read_back_as_the_same_instant_in_utc(session):
+    chat_id = -1003
+    session.add(Settings(chat_id=chat_id, mode=0, timezone="UTC", updated_at="2025-01-01T00:00:00"))
+    await session.flush()
+    session.add(
+        ScheduleItem(
+            chat_id=chat_id,
+            date="2025-01-01",
+            start_time="10:00",
+            end_time="11:00",
+            ical_uid="uid-msk",
+            ical_dtstart="2025-01-01T10:00:00+03:00",
+        )
+    )
+    await session.commit()
+    session.expunge_all()
+
+    [row] = await ScheduleRepo(session).get_by_date(chat_id, "2025-01-01")
+    assert row.ical_dtstart == "2025-01-01T07:00:00+00:00"
@@ -42,18 +42,18 @@ def test_apply_schedule_registers_periodic_sender_job():
 
 
 @pytest.mark.asyncio
-async def test_run_catchup_mode_0_does_not_send(monkeypatch):
+async def test_run_catchup_mode_0_does_not_queue(monkeypatch):
     settings = _make_settings(0)
 
-    send_mock = AsyncMock(return_value=True)
+    enqueue_mock = AsyncMock(return_value=True)
     alert_mock = AsyncMock()
 
-    monkeypatch.setattr(catchup_service, "send_schedule", send_mock)
+    monkeypatch.setattr(catchup_service, "enqueue_delivery", enqueue_mock)
     monkeypatch.setattr(catchup_service, "alert_admin", alert_mock)
 
     await catchup_service.run_catchup(settings)
 
-    send_mock.assert_not_awaited()
+    enqueue_mock.assert_not_awaited()
     alert_mock.assert_not_awaited()
 
 
@@ -66,10 +66,10 @@ async def test_run_catchup_mode_1_only_morning(monkeypatch):
     monkeypatch.setattr(catchup_service, "get_today", lambda tz: date(2025, 1, 2))
     monkeypatch.setattr(catchup_service, "get_tomorrow", lambda tz: date(2025, 1, 3))
 
-    send_mock = AsyncMock(return_value=True)
+    enqueue_mock = AsyncMock(return_value=True)
     alert_mock = AsyncMock()
 
-    monkeypatch.setattr(catchup_service, "send_schedule", send_mock)
+    monkeypatch.setattr(catchup_service, "enqueue_delivery", enqueue_mock)
     monkeypatch.setattr(catchup_service, "alert_admin", alert_mock)
 
     class DummySessionContext:
@@ -91,8 +91,8 @@ async def test_run_catchup_mode_1_only_morning(monkeypatch):
 
     await catchup_service.run_catchup(settings)
 
-    assert send_mock.await_count == 1
-    _, kwargs = send_mock.await_args
+    assert enqueue_mock.await_count == 1
+    _, kwargs = enqueue_mock.await_args
     assert kwargs["kind"] == "morning"
     assert kwargs["target_date"] == date(2025, 1, 2)
 
@@ -106,10 +106,10 @@ async def test_run_catchup_mode_2_morning_and_evening(monkeypatch):
     monkeypatch.setattr(catchup_service, "get_today", lambda tz: date(2025, 1, 2))
     monkeypatch.setattr(catchup_service, "get_tomorrow", lambda tz: date(2025, 1, 3))
 
-    send_mock = AsyncMock(return_value=True)
+    enqueue_mock = AsyncMock(return_value=True)
     alert_mock = AsyncMock()
 
-    monkeypatch.setattr(catchup_service, "send_schedule", send_mock)
+    monkeypatch.setattr(catchup_service, "enqueue_delivery", enqueue_mock)
     monkeypatch.setattr(catchup_service, "alert_admin", alert_mock)
 
     class DummySessionContext:
@@ -131,7 +131,30 @@ async def test_run_catchup_mode_2_morning_and_evening(monkeypatch):
 
     await catchup_service.run_catchup(settings)
 
-    assert send_mock.await_count == 2
-    calls = [call.kwargs for call in send_mock.await_args_list]
+    assert enqueue_mock.await_count == 2
+    calls = [call.kwargs for call in enqueue_mock.await_args_list]
     assert {"kind": "morning", "target_date": date(2025, 1, 2), "chat_id": 123} in calls
     assert {"kind": "evening", "target_date": date(2025, 1, 3), "chat_id": 123} in calls
+
+
+def test_send_spread_offsets_are_stable_and_bounded(monkeypatch):
+    from datetime import time, timedelta
+
+    from app.config import settings as env_settings
+    from app.services import scheduler_service
+
+    now_local = datetime(2025, 1, 2, 7, 0, 5, tzinfo=ZoneInfo("UTC"))
+
+    monkeypatch.setattr(env_settings, "SEND_SPREAD_SECONDS", 0, raising=False)
+    assert scheduler_service._available_at(-1001, now_local, time(7, 0)) is None
+
+    monkeypatch.setattr(env_settings, "SEND_SPREAD_SECONDS", 300, raising=False)
+    offsets = [scheduler_service._send_offset(chat_id) for chat_id in range(-1000, -1500, -1)]
+    assert all(timedelta(0) <= offset < timedelta(seconds=300) for offset in offsets)
+    # Chats with the same send time are spread over the window, not bunched.
+    assert len({int(offset.total_seconds()) // 60 for offset in offsets}) == 5
+    assert scheduler_service._send_offset(-1001) == offsets[1]
+
+    available_at = datetime.fromisoformat(scheduler_service._available_at(-1001, now_local, time(7, 0)))
+    expected = (now_local.replace(second=0) + offsets[1]).astimezone().replace(tzinfo=None)
+    assert available_at == expected
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+import app.db.connection as conn
+from app.config import settings as env_settings
+
+
+def _alembic_cfg() -> Config:
+    return Config(str(Path(__file__).resolve().parents[1] / "alembic.ini"))
+
+
+def test_migration_head_revisions_match_alembic():
+    heads = ScriptDirectory.from_config(_alembic_cfg()).get_heads()
+    assert conn.migration_head_revisions() == frozenset(heads)
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_skips_alembic_when_at_head(monkeypatch, tmp_path):
+    db_url = f"sqlite+aiosqlite:///{(tmp_path / 'bot.db').resolve().as_posix()}"
+    monkeypatch.setattr(env_settings, "DB_PATH", db_url, raising=False)
+    monkeypatch.setattr(conn, "_engine", None)
+    monkeypatch.setattr(conn, "_session_maker", None)
+
+    calls: list[str] = []
+    real_run_migrations = conn._run_migrations
+
+    def counting_run_migrations() -> None:
+        calls.append("upgrade")
+        real_run_migrations()
+
+    monkeypatch.setattr(conn, "_run_migrations", counting_run_migrations)
+
+    try:
+        await conn.ensure_schema()
+        assert calls == ["upgrade"]
+
+        await conn.ensure_schema()
+        assert calls == ["upgrade"]
+
+        # An older stamp must go through Alembic again.
+        await asyncio.to_thread(command.downgrade, _alembic_cfg(), "e1f4a2b9c0d3")
+        await conn.ensure_schema()
+        assert calls == ["upgrade", "upgrade"]
+    finally:
+        await conn.get_engine().dispose()
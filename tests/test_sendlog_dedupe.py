@@ -102,3 +102,30 @@ async def test_find_stuck_reserved(session):
     ids = [x.chat_id for x in stuck_list]
     assert 1 in ids
     assert 2 not in ids
+
+
+@pytest.mark.asyncio
+async def test_try_reserve_many_returns_won_keys(session):
+    repo = SendLogRepo(session)
+    await repo.try_reserve(5001, "2025-02-01", "morning")
+    await repo.try_reserve(5002, "2025-02-01", "morning")
+    await repo.mark_error(5002, "2025-02-01", "morning", "boom")
+
+    keys = [
+        (5001, "2025-02-01", "morning"),  # fresh reservation: lost
+        (5002, "2025-02-01", "morning"),  # error: re-reserved
+        (5003, "2025-02-01", "morning"),  # new
+        (5003, "2025-02-01", "morning"),  # duplicate in the same batch
+    ]
+    won = await repo.try_reserve_many(keys)
+    assert won == {(5002, "2025-02-01", "morning"), (5003, "2025-02-01", "morning")}
+    assert await repo.try_reserve_many(keys) == set()
+
+    await repo.mark_sent_many([(5002, "2025-02-01", "morning", "2025-02-01T08:00:00")])
+    await repo.mark_error_many([(5003, "2025-02-01", "morning", "forbidden")])
+    statuses = await repo.get_statuses(keys + [(5004, "2025-02-01", "morning")])
+    assert statuses == {
+        (5001, "2025-02-01", "morning"): "reserved",
+        (5002, "2025-02-01", "morning"): "ok",
+        (5003, "2025-02-01", "morning"): "error",
+    }
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.db.models import SendLog
+from app.db.repos.sendlog_repo import SendLogRepo
+from app.services import sender, shutdown_service
+
+CHAT_ID = 929292
+
+
+class FakeSession:
+    closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeBot:
+    def __init__(self):
+        self.session = FakeSession()
+
+
+@pytest.fixture
+def session_maker_modules():
+    return (sender,)
+
+
+@pytest.mark.asyncio
+async def test_shutdown_releases_interrupted_reservations_and_closes_resources(monkeypatch, session_maker):
+    disposed: list[bool] = []
+
+    async def fake_dispose() -> None:
+        disposed.append(True)
+
+    monkeypatch.setattr(shutdown_service, "dispose_engines", fake_dispose)
+
+    async with session_maker() as session:
+        await session.execute(delete(SendLog).where(SendLog.chat_id == CHAT_ID))
+        await SendLogRepo(session).try_reserve(CHAT_ID, "2025-03-03", "manual")
+        await session.commit()
+    # An inline /send was between try_reserve and mark_sent when the container was stopped.
+    monkeypatch.setattr(sender, "_inline_reservations", {(CHAT_ID, "2025-03-03", "manual")})
+
+    bot = FakeBot()
+    await shutdown_service.graceful_shutdown(bot, timeout=1)
+
+    assert bot.session.closed
+    assert disposed == [True]
+    async with session_maker() as session:
+        log = (await session.execute(select(SendLog).where(SendLog.chat_id == CHAT_ID))).scalar_one()
+        assert log.status == "error"
+        # "error" is re-reservable: the next start sends it without waiting for the stale timeout.
+        assert await SendLogRepo(session).try_reserve(CHAT_ID, date(2025, 3, 3).isoformat(), "manual") is True
+        await session.execute(delete(SendLog).where(SendLog.chat_id == CHAT_ID))
+        await session.commit()
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.db.connection as conn
+from app.config import Settings
+from app.config import settings as env_settings
+
+
+def test_sqlite_profile_validation():
+    assert Settings(BOT_TOKEN="x", SQLITE_PROFILE=" Throughput ").SQLITE_PROFILE == "throughput"
+    with pytest.raises(ValidationError):
+        Settings(BOT_TOKEN="x", SQLITE_PROFILE="fast")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("profile", ["durable", "balanced", "throughput"])
+async def test_sqlite_profile_pragmas_applied(monkeypatch, tmp_path, profile):
+    db_file = tmp_path / "profile.db"
+    db_url = f"sqlite+aiosqlite:///{db_file.resolve().as_posix()}"
+    monkeypatch.setattr(env_settings, "DB_PATH", db_url, raising=False)
+    monkeypatch.setattr(env_settings, "SQLITE_PROFILE", profile, raising=False)
+
+    expected = conn.SQLITE_PROFILES[profile]
+    synchronous_codes = {"OFF": 0, "NORMAL": 1, "FULL": 2}
+    temp_store_codes = {"DEFAULT": 0, "FILE": 1, "MEMORY": 2}
+
+    engine = create_async_engine(db_url)
+    try:
+        async with engine.connect() as connection:
+            values = {
+                name: (await connection.exec_driver_sql(f"PRAGMA {name}")).scalar()
+                for name in expected
+            }
+    finally:
+        await engine.dispose()
+
+    assert values["synchronous"] == synchronous_codes[expected["synchronous"]]
+    assert values["temp_store"] == temp_store_codes[expected["temp_store"]]
+    assert values["cache_size"] == expected["cache_size"]
+    assert values["mmap_size"] == expected["mmap_size"]
+    assert values["wal_autocheckpoint"] == expected["wal_autocheckpoint"]
+    assert values["journal_size_limit"] == expected["journal_size_limit"]
+
+    # WAL is the one setting stored in the file, so even a connection without the profile sees it.
+    con = sqlite3.connect(db_file)
+    try:
+        assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        con.close()
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+from sqlalchemy import text
+
+import app.db.connection  # noqa: F401  registers the DB timing listeners
+from app.bot.middlewares import HandlerNameMiddleware, TracingMiddleware
+from app.services import tracing
+from app.services.tracing import LatencyStats, UpdateTrace, span
+
+SLOW_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 20000) SELECT sum(x) FROM c"
+
+
+def test_percentiles_use_nearest_rank():
+    stats = LatencyStats(sample_size=100)
+    for ms in range(1, 101):
+        stats.record(UpdateTrace("h"), ms / 1000)
+    total = stats.snapshot()["h"]["total_ms"]
+    assert total == {"p50": 50.0, "p90": 90.0, "p99": 99.0}
+
+    small = LatencyStats(sample_size=2)
+    for ms in (500, 1, 2):
+        small.record(UpdateTrace("h"), ms / 1000)
+    # Only the last sample_size traces are kept; the count is over all of them.
+    assert small.snapshot()["h"]["count"] == 3
+    assert small.snapshot()["h"]["total_ms"]["p99"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_update_trace_names_handler_and_splits_db_telegram_ical(engine, monkeypatch):
+    stats = LatencyStats(sample_size=10)
+    monkeypatch.setattr(tracing, "latency_stats", stats)
+    router = Router()
+
+    @router.message()
+    async def show_status(message: Message) -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text(SLOW_QUERY))
+        with span("telegram"):
+            await asyncio.sleep(0.02)
+        with span("ical"):
+            await asyncio.sleep(0.01)
+
+    dispatcher = Dispatcher()
+    dispatcher.update.outer_middleware(TracingMiddleware())
+    dispatcher.message.middleware(HandlerNameMiddleware())
+    dispatcher.include_router(router)
+    bot = Bot(token="123456:ABCdefGHIjklMNOpqrSTUvwxYZ")
+    update = Update.model_validate(
+        {
+            "update_id": 1,
+            "message": {"message_id": 1, "date": 1, "chat": {"id": 5, "type": "private"}, "text": "/status"},
+        }
+    )
+    await dispatcher.feed_update(bot, update)
+    edited = update.model_copy(update={"update_id": 2, "message": None, "edited_message": update.message})
+    await dispatcher.feed_update(bot, edited)
+
+    snapshot = stats.snapshot()
+    assert set(snapshot) == {"test_tracing.show_status", "unhandled:edited_message"}
+    entry = snapshot["test_tracing.show_status"]
+    assert entry["count"] == 1
+    assert entry["db_ms"]["p50"] > 0
+    assert entry["telegram_ms"]["p50"] >= 20
+    assert entry["ical_ms"]["p50"] >= 10
+    assert entry["total_ms"]["p50"] >= entry["telegram_ms"]["p50"] + entry["ical_ms"]["p50"]
+    # Outside of an update nothing is recorded.
+    assert tracing.current_trace() is None
+
+
+@pytest.mark.asyncio
+async def test_background_tasks_started_by_an_update_do_not_add_to_its_trace():
+    async def background_ical() -> bool:
+        with span("ical"):
+            await asyncio.sleep(0.02)
+        return tracing.current_trace() is None
+
+    token = tracing.start_trace("group_today")
+    try:
+        assert await tracing.create_untraced_task(background_ical()) is True
+        ical_from_untraced = tracing.current_trace().spans["ical"]
+        # A plain task would keep adding to the update's trace.
+        assert await asyncio.create_task(background_ical()) is False
+    finally:
+        trace = tracing.finish_trace(token)
+
+    assert ical_from_untraced == 0
+    assert trace.spans["ical"] > 0
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.bot.webhook import build_webhook_app, run_webhook
+from app.config import settings as env_settings
+
+SECRET = "s3cret-token"
+
+
+def _update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": -100500, "type": "supergroup", "title": "Group"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Student"},
+            "text": text,
+        },
+    }
+
+
+async def _client(dispatcher: Dispatcher, max_concurrent: int) -> tuple[TestClient, object]:
+    bot = Bot(token="123456:ABCdefGHIjklMNOpqrSTUvwxYZ")
+    app, handler = build_webhook_app(
+        dispatcher, bot, path="/telegram/webhook", secret_token=SECRET, max_concurrent=max_concurrent
+    )
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    return client, handler
+
+
+@pytest.mark.asyncio
+async def test_webhook_checks_secret_and_processes_updates_concurrently():
+    seen: list[str] = []
+    running = 0
+    peak = 0
+    release = asyncio.Event()
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await release.wait()
+        seen.append(message.text)
+        running -= 1
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    client, handler = await _client(dispatcher, max_concurrent=2)
+    try:
+        # A stand-in Telegram without the secret header is rejected.
+        response = await client.post("/telegram/webhook", json=_update(1, "/today"))
+        assert response.status == 401
+
+        headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        first = [await client.post("/telegram/webhook", json=_update(i, f"m{i}"), headers=headers) for i in (2, 3)]
+        assert [r.status for r in first] == [200, 200]
+        # Both slots are busy: the third request is held until one frees up.
+        third = asyncio.create_task(client.post("/telegram/webhook", json=_update(4, "m4"), headers=headers))
+        await asyncio.sleep(0.05)
+        assert not third.done()
+
+        health = await (await client.get("/healthz")).json()
+        assert health["status"] == "ok"
+        assert health["updates_in_flight"] == 2
+        # Latency metrics are not public: they need the webhook secret.
+        assert (await client.get("/metrics")).status == 401
+        metrics = await client.get("/metrics", headers={"Authorization": f"Bearer {SECRET}"})
+        assert "handlers" in await metrics.json()
+
+        release.set()
+        assert (await asyncio.wait_for(third, timeout=2)).status == 200
+        await handler.drain(timeout=2)
+        assert sorted(seen) == ["m2", "m3", "m4"]
+        assert peak == 2
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_mode_refuses_to_start_without_a_secret(monkeypatch):
+    monkeypatch.setattr(env_settings, "WEBHOOK_URL", "https://bot.example.com", raising=False)
+    monkeypatch.setattr(env_settings, "WEBHOOK_SECRET", None, raising=False)
+
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        await run_webhook(Bot(token="123456:ABCdefGHIjklMNOpqrSTUvwxYZ"), Dispatcher(), allowed_updates=[])